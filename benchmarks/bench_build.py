@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for build.py
+
+Generates synthetic Goodreads/Letterboxd RSS, Instapaper and Last.fm JSON,
+and marker-heavy index.html templates at several scales, then times the
+parse, render, and injection functions in build.py against them. Feeds are
+served from a loopback HTTP server so the real fetch code path runs without
+touching the network.
+
+It also times `import build` in a fresh interpreter (from -X importtime),
+so heavy imports creeping back to module level show up as a regression.
+
+Usage:
+    python benchmarks/bench_build.py                          # default scales, table to stdout
+    python benchmarks/bench_build.py --scales 10,100 --repeat 3
+    python benchmarks/bench_build.py --json bench.json        # save results
+    python benchmarks/bench_build.py --baseline bench.json    # compare against a saved run
+    python benchmarks/bench_build.py --baseline bench.json --fail-on-regression
+
+A benchmark regresses when its median is more than --threshold times the
+baseline median (default 1.25). Benchmarks under 0.5 ms in the baseline are
+reported but never counted as regressions — they are too noisy.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+from datetime import datetime, timedelta, timezone
+import email.utils
+import http.server
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import build  # noqa: E402
+
+DEFAULT_SCALES = [10, 100, 1000, 10000]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 1.25
+NOISE_FLOOR_MS = 0.5
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Synthetic inputs
+# ══════════════════════════════════════════════════════════════════
+
+_LOREM = (
+    "A sweeping, intimate story about memory & loss — told across three "
+    "decades with <em>wit</em>, warmth, and more than a few \"unreliable\" narrators. "
+)
+
+
+def _rfc2822(i: int) -> str:
+    when = datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(days=i)
+    return email.utils.format_datetime(when)
+
+
+def goodreads_rss(n: int) -> bytes:
+    """Return a Goodreads shelf RSS document with n items."""
+    items = []
+    for i in range(n):
+        items.append(
+            "<item>"
+            f"<guid>https://www.goodreads.com/review/show/{1000 + i}</guid>"
+            f"<title>Book number {i} &amp; friends</title>"
+            f"<link>https://www.goodreads.com/review/show/{1000 + i}?utm_source=rss</link>"
+            f"<book_id>{5000 + i}</book_id>"
+            f"<author_name>Author {i % 97}</author_name>"
+            f"<user_rating>{i % 6}</user_rating>"
+            f"<book_image_url>https://i.gr-assets.com/images/S/{i}._SY75_.jpg</book_image_url>"
+            f"<book_large_image_url>https://i.gr-assets.com/images/S/{i}._SY475_.jpg</book_large_image_url>"
+            f"<book_description><![CDATA[{_LOREM * 4}]]></book_description>"
+            f"<user_review><![CDATA[{_LOREM if i % 3 == 0 else ''}]]></user_review>"
+            f"<user_read_at>{_rfc2822(i)}</user_read_at>"
+            f"<pubDate>{_rfc2822(i)}</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        "<title>Bench shelf</title>" + "".join(items) + "</channel></rss>"
+    ).encode()
+
+
+def letterboxd_rss(n: int) -> bytes:
+    """Return a Letterboxd diary RSS document with n film items."""
+    items = []
+    for i in range(n):
+        items.append(
+            "<item>"
+            f"<guid>letterboxd-review-{9000 + i}</guid>"
+            f"<title>Film {i}, {1950 + i % 75}</title>"
+            f"<link>https://letterboxd.com/bench/film/film-{i}/</link>"
+            f"<pubDate>{_rfc2822(i)}</pubDate>"
+            f"<letterboxd:filmTitle>Film {i}: The Sequel</letterboxd:filmTitle>"
+            f"<letterboxd:filmYear>{1950 + i % 75}</letterboxd:filmYear>"
+            f"<letterboxd:memberRating>{(i % 10 + 1) / 2}</letterboxd:memberRating>"
+            f"<description><![CDATA[<p>{_LOREM}</p>]]></description>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:letterboxd="https://letterboxd.com"><channel>'
+        "<title>Bench diary</title>" + "".join(items) + "</channel></rss>"
+    ).encode()
+
+
+def instapaper_json(n: int) -> bytes:
+    """Return an Instapaper bookmarks/list response with n bookmarks."""
+    bookmarks = [
+        {
+            "type": "bookmark",
+            "bookmark_id": 100000 + i,
+            "hash": f"h{i:08x}",
+            "title": f"Article {i}: why everything you know about caching is wrong",
+            "url": f"https://example{i % 50}.com/posts/{i}?utm_source=newsletter&id={i}",
+            "description": _LOREM * 3,
+            "time": 1700000000 + i,
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"user": {"type": "user"}, "bookmarks": bookmarks, "highlights": []}).encode()
+
+
+def lastfm_json(n: int) -> bytes:
+    """Return a Last.fm user.getTopTracks response with n tracks."""
+    tracks = [
+        {
+            "name": f"Track {i}",
+            "playcount": str(1000 - i % 1000),
+            "url": f"https://www.last.fm/music/Artist+{i % 40}/_/Track+{i}",
+            "artist": {"name": f"Artist {i % 40}", "url": f"https://www.last.fm/music/Artist+{i % 40}"},
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"toptracks": {"track": tracks, "@attr": {"user": "bench"}}}).encode()
+
+
+def template_html(n_markers: int, body_kb: int = 64) -> str:
+    """Return an index.html-like document with n_markers marker regions."""
+    filler = "<p>" + ("lorem ipsum dolor sit amet " * 40) + "</p>\n"
+    parts = ["<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<!-- updated:start -->\nold\n<!-- updated:end -->\n</head><body>\n"]
+    per = max(1, (body_kb * 1024) // max(1, n_markers) // len(filler))
+    for i in range(n_markers):
+        parts.append(f"<!-- section-{i}:start -->\n<div>old {i}</div>\n<!-- section-{i}:end -->\n")
+        parts.append(filler * per)
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Loopback feed server
+# ══════════════════════════════════════════════════════════════════
+
+class _FeedServer:
+    """Serve {path_prefix: bytes} on 127.0.0.1 — query strings are ignored."""
+
+    def __init__(self):
+        self.routes: dict[str, bytes] = {}
+        routes = self.routes
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def _serve(self):
+                path = self.path.split("?", 1)[0]
+                body = routes.get(path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Runner
+# ══════════════════════════════════════════════════════════════════
+
+def _time(fn, repeat: int) -> dict:
+    fn()  # warm-up: first-call caches (OG base layer, regex compilation) are not what we measure
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "runs": repeat,
+    }
+
+
+def _time_import(repeat: int) -> dict:
+    """Time `import build` in fresh interpreters, from -X importtime's cumulative column."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(repeat + 1):  # first run warms the bytecode cache
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import build"],
+                              cwd=root, capture_output=True, text=True, check=True)
+        last = [line for line in proc.stderr.splitlines() if line.rstrip().endswith("| build")][-1]
+        samples.append(int(last.split("|")[1]) / 1000)
+    samples = samples[1:]
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "runs": repeat,
+    }
+
+
+def run_benchmarks(scales: list[int], repeat: int, log=print) -> dict:
+    """Run every benchmark at every scale and return {name: stats}."""
+    results: dict[str, dict] = {}
+
+    def bench(name: str, fn) -> None:
+        results[name] = _time(fn, repeat)
+        log(f"  {name:<45} {results[name]['median_ms']:>10.3f} ms")
+
+    results["import build"] = _time_import(repeat)
+    log(f"  {'import build':<45} {results['import build']['median_ms']:>10.3f} ms")
+
+    server = _FeedServer()
+    saved = (build.INSTAPAPER_API, build.LASTFM_API)
+    build.INSTAPAPER_API = f"{server.url}/instapaper"
+    build.LASTFM_API = f"{server.url}/lastfm/"
+    tokens = {"oauth_token": "bench", "oauth_token_secret": "bench"}
+    try:
+        for n in scales:
+            log(f"n = {n}")
+            server.routes["/goodreads.rss"] = goodreads_rss(n)
+            server.routes["/letterboxd.rss"] = letterboxd_rss(n)
+            server.routes["/instapaper/api/1.1/bookmarks/list"] = instapaper_json(n)
+            server.routes["/lastfm/"] = lastfm_json(n)
+
+            books = build.fetch_goodreads(f"{server.url}/goodreads.rss")
+            films = build.fetch_letterboxd(f"{server.url}/letterboxd.rss", n)
+            articles = build.fetch_instapaper_starred(tokens, n)
+            tracks = build.fetch_lastfm_top_tracks("bench", "bench", n)
+            tracks = [dataclasses.replace(t, album="Bench Album", bio=_LOREM) for t in tracks]
+            films = [dataclasses.replace(f, poster="https://image.tmdb.org/t/p/w300/x.jpg", director="A. Director",
+                                         synopsis=_LOREM) for f in films]
+
+            bench(f"fetch_goodreads[n={n}]", lambda: build.fetch_goodreads(f"{server.url}/goodreads.rss"))
+            bench(f"fetch_letterboxd[n={n}]", lambda: build.fetch_letterboxd(f"{server.url}/letterboxd.rss", n))
+            seen = frozenset(f.guid for f in films[1:])  # steady state: one new diary entry
+            bench(f"fetch_letterboxd[n={n},incremental]",
+                  lambda: build.fetch_letterboxd(f"{server.url}/letterboxd.rss", n, stop_at=seen))
+            bench(f"fetch_instapaper_starred[n={n}]", lambda: build.fetch_instapaper_starred(tokens, n))
+            bench(f"fetch_lastfm_top_tracks[n={n}]", lambda: build.fetch_lastfm_top_tracks("bench", "bench", n))
+            bench(f"build_book_html[n={n}]", lambda: build.build_book_html(books))
+            bench(f"build_now_reading_html[n={n}]", lambda: build.build_now_reading_html(books))
+            bench(f"build_film_html[n={n}]", lambda: build.build_film_html(films))
+            bench(f"build_article_html[n={n}]", lambda: build.build_article_html(articles))
+            bench(f"build_music_html[n={n}]", lambda: build.build_music_html(tracks))
+
+            doc = template_html(n_markers=min(n, 1000), body_kb=max(64, n // 10))
+            last = min(n, 1000) - 1
+            pattern = build._make_pattern(f"section-{last}")
+            rows = build.build_book_html(books[:5])
+            injected = build.inject(doc, pattern, rows, f"section-{last}")
+            bench(f"inject[markers={min(n, 1000)}]", lambda: build.inject(doc, pattern, rows, f"section-{last}"))
+            bench(f"_content_changed[markers={min(n, 1000)}]", lambda: build._content_changed(doc, injected))
+    finally:
+        build.INSTAPAPER_API, build.LASTFM_API = saved
+        server.close()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        log("  (Pillow not installed — skipping generate_og_image)")
+    else:
+        profile = build.Profile(display_name="Bench Person", job_title="Benchmarker", company="Bench Co",
+                                location="Melbourne")
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "og.png")
+            bench("generate_og_image", lambda: build.generate_og_image(profile, out))
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print a comparison table and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"\n{'benchmark':<45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<45} {'—':>10} {cur['median_ms']:>10.3f} {'new':>7}")
+            continue
+        ratio = cur["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold and base["median_ms"] >= NOISE_FLOOR_MS:
+            regressions.append(name)
+            flag = "  ← regression"
+        print(f"{name:<45} {base['median_ms']:>10.3f} {cur['median_ms']:>10.3f} {ratio:>6.2f}×{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build.py parsers, renderers, and injection.")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated item counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per benchmark (default: %(default)s)")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a previous --json output")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="median ratio above which a benchmark counts as regressed (default: %(default)s)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any benchmark regressed")
+    args = parser.parse_args()
+
+    # Fetchers and renderers print progress; keep the benchmark output readable.
+    stdout = sys.stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_benchmarks([int(s) for s in args.scales.split(",") if s], args.repeat,
+                                 log=lambda *a: print(*a, file=stdout))
+
+    output = {
+        "version": 1,
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+            f.write("\n")
+        print(f"\nWrote {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold}×")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
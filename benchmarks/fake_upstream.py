@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the services build.py fetches from
+
+Emulates the Gravatar, Goodreads, Letterboxd, Instapaper, Last.fm and TMDB
+endpoints build.py calls, serving the synthetic payloads from
+bench_build.py, with per-service latency, error, timeout and truncation
+injection. Point a build at it with `build.py --upstream URL`; runs are
+repeatable for a given --seed.
+
+Usage:
+    python benchmarks/fake_upstream.py                                  # port 8900, no faults
+    python benchmarks/fake_upstream.py --items 200 --latency '*=20..80'
+    python benchmarks/fake_upstream.py --latency goodreads=lognormal:400:0.5 \\
+        --error tmdb=0.2:429 --timeout lastfm=0.05 --truncate letterboxd=0.1 --seed 7
+
+    python build.py --upstream http://127.0.0.1:8900 --summary        # in another shell
+
+SERVICE is one of gravatar, avatar, goodreads, letterboxd, instapaper,
+lastfm, tmdb — or * for all of them. Latency specs (milliseconds):
+    120                 fixed
+    50..400             uniform
+    lognormal:120:0.6   log-normal with median 120 and sigma 0.6
+Error specs are RATE[:STATUS] (default status 503; 429 adds Retry-After).
+A timeout holds the request for --hang seconds (default 30, longer than
+any build.py timeout) before answering. A truncated response ends halfway
+through its body with a matching Content-Length, so RSS/JSON parsing fails
+rather than the transfer. Per-service counts are printed on exit.
+"""
+
+import argparse
+import http.server
+import json
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import urllib.parse
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_build import _LOREM, goodreads_rss, instapaper_json, lastfm_json, letterboxd_rss  # noqa: E402
+
+SERVICES = ("gravatar", "avatar", "goodreads", "letterboxd", "instapaper", "lastfm", "tmdb")
+DEFAULT_PORT = 8900
+DEFAULT_ITEMS = 50
+DEFAULT_HANG = 30.0
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Payloads
+# ══════════════════════════════════════════════════════════════════
+
+def gravatar_json(base_url: str, username: str) -> bytes:
+    """Return a Gravatar /profiles/<username> response whose avatar is served by the stand-in."""
+    return json.dumps({
+        "display_name": f"Fake {username}",
+        "job_title": "Load tester",
+        "company": "Loopback Ltd",
+        "location": "127.0.0.1",
+        "description": _LOREM,
+        "avatar_url": f"{base_url}/avatar/{username}",
+        "profile_url": f"https://gravatar.com/{username}",
+        "links": [{"label": f"Link {i}", "url": f"https://example.com/{i}"} for i in range(4)],
+        "contact_info": {"email": f"{username}@example.com"},
+    }).encode()
+
+
+def avatar_png(size: int) -> bytes:
+    """Return a solid size×size PNG (built by hand so the stand-in does not need Pillow)."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\x3b\x82\xf6" * size for _ in range(size))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+def lastfm_info_json(method: str, query: dict) -> bytes:
+    """Return a Last.fm track.getInfo or artist.getInfo response."""
+    if method == "track.getinfo":
+        return json.dumps({"track": {"album": {"title": f"{query.get('artist', '')} — Album"}}}).encode()
+    return json.dumps({"artist": {"bio": {"summary": f"{_LOREM} <a href=\"#\">Read more on Last.fm</a>"}}}).encode()
+
+
+def tmdb_search_json(title: str) -> bytes:
+    """Return a TMDB /search/movie response with one result."""
+    movie_id = zlib.crc32(title.encode()) % 1000000
+    return json.dumps({"results": [{"id": movie_id, "poster_path": f"/{movie_id}.jpg", "overview": _LOREM * 3}]}).encode()
+
+
+def tmdb_credits_json(movie_id: str) -> bytes:
+    """Return a TMDB /movie/<id>/credits response."""
+    crew = [{"job": "Producer", "name": "P. Roducer"}, {"job": "Director", "name": f"Director {movie_id}"}]
+    return json.dumps({"crew": crew}).encode()
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Fault injection
+# ══════════════════════════════════════════════════════════════════
+
+def parse_latency(spec: str):
+    """Return a function rng → seconds for a latency spec (see module docstring)."""
+    if spec.startswith("lognormal:"):
+        median, sigma = (float(x) for x in spec.split(":")[1:3])
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000
+    if ".." in spec:
+        low, high = (float(x) for x in spec.split(".."))
+        return lambda rng: rng.uniform(low, high) / 1000
+    fixed = float(spec)
+    return lambda rng: fixed / 1000
+
+
+def _per_service(values: list[str], parse) -> dict:
+    """Parse repeated SERVICE=VALUE options into {service: parsed}; * applies to every service."""
+    out = {}
+    for value in values:
+        service, _, rest = value.partition("=")
+        if service != "*" and service not in SERVICES:
+            raise ValueError(f"unknown service {service!r} (expected one of {', '.join(SERVICES)} or *)")
+        for name in (SERVICES if service == "*" else (service,)):
+            out[name] = parse(rest)
+    return out
+
+
+class FakeUpstream:
+    """Serve the stand-in endpoints on 127.0.0.1 in a background thread.
+
+    faults maps a service to {latency, error_rate, error_status,
+    timeout_rate, truncate_rate}; missing keys mean no fault. items is the
+    number of books, films, articles and tracks in each feed. Use as a
+    context manager, or call close().
+    """
+
+    def __init__(self, port: int = 0, items: int = DEFAULT_ITEMS, faults: dict = None, seed: int = 0,
+                 hang: float = DEFAULT_HANG, avatar_size: int = 400):
+        self.items = items
+        self.faults = faults or {}
+        self.hang = hang
+        self.stats = {name: {"requests": 0, "errors": 0, "timeouts": 0, "truncated": 0} for name in SERVICES}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._avatar = avatar_png(avatar_size)
+        self._feeds = {}
+        upstream = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                upstream._handle(self)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._closing.set()  # release requests held by an injected timeout
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _feed(self, name: str, make) -> bytes:
+        if name not in self._feeds:
+            self._feeds[name] = make(self.items)
+        return self._feeds[name]
+
+    def _route(self, path: str, query: dict) -> tuple[str, bytes, str]:
+        """Return (service, body, content type) for a request, or (service, b"", "") when unknown."""
+        parts = path.strip("/").split("/")
+        service = parts[0]
+        if service == "gravatar" and len(parts) == 3 and parts[1] == "profiles":
+            return service, gravatar_json(self.url, parts[2]), "application/json"
+        if parts[0] == "avatar":
+            return service, self._avatar, "image/png"
+        if parts[0] == "goodreads":
+            return service, self._feed("goodreads", goodreads_rss), "application/rss+xml"
+        if parts[0] == "letterboxd":
+            return service, self._feed("letterboxd", letterboxd_rss), "application/rss+xml"
+        if path == "/instapaper/api/1.1/bookmarks/list":
+            return service, self._feed("instapaper", instapaper_json), "application/json"
+        if path == "/instapaper/api/1.1/oauth/access_token":
+            return service, b"oauth_token=upstream&oauth_token_secret=upstream", "text/plain"
+        if parts[0] == "lastfm":
+            method = query.get("method", "").lower()
+            if method == "user.gettoptracks":
+                return service, self._feed("lastfm", lastfm_json), "application/json"
+            return service, lastfm_info_json(method, query), "application/json"
+        if path == "/tmdb/search/movie":
+            return service, tmdb_search_json(query.get("query", "")), "application/json"
+        if parts[0] == "tmdb" and len(parts) == 4 and parts[1] == "movie" and parts[3] == "credits":
+            return service, tmdb_credits_json(parts[2]), "application/json"
+        return service, b"", ""
+
+    def _handle(self, handler) -> None:
+        path, _, qs = handler.path.partition("?")
+        query = dict(urllib.parse.parse_qsl(qs))
+        service, body, content_type = self._route(path, query)
+        if service not in self.stats:
+            handler.send_error(404)
+            return
+        fault = self.faults.get(service, {})
+        with self._lock:  # one RNG, drawn in request order, so a seed replays the same faults
+            delay = fault["latency"](self._rng) if "latency" in fault else 0
+            error = self._rng.random() < fault.get("error_rate", 0)
+            hang = self._rng.random() < fault.get("timeout_rate", 0)
+            truncate = self._rng.random() < fault.get("truncate_rate", 0)
+            stats = self.stats[service]
+            stats["requests"] += 1
+            stats["errors"] += error
+            stats["timeouts"] += hang and not error
+            stats["truncated"] += truncate and not (error or hang)
+
+        if self._closing.wait(delay + (self.hang if hang and not error else 0)):
+            return
+        if not content_type:
+            handler.send_error(404)
+            return
+        if error:
+            status = fault.get("error_status", 503)
+            handler.send_response(status)
+            if status == 429:
+                handler.send_header("Retry-After", "1")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if truncate:
+            body = body[:len(body) // 2]
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stand-ins for the services build.py fetches from.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS,
+                        help="books, films, articles and tracks per feed (default: %(default)s)")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SPEC",
+                        help="response latency in ms: 120, 50..400, or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error", action="append", default=[], metavar="SERVICE=RATE[:STATUS]",
+                        help="fraction of requests answered with STATUS (default 503)")
+    parser.add_argument("--timeout", action="append", default=[], metavar="SERVICE=RATE",
+                        help="fraction of requests held for --hang seconds")
+    parser.add_argument("--truncate", action="append", default=[], metavar="SERVICE=RATE",
+                        help="fraction of responses cut off halfway through the body")
+    parser.add_argument("--hang", type=float, default=DEFAULT_HANG, help="seconds a timed-out request is held")
+    parser.add_argument("--avatar-size", type=int, default=400, help="avatar PNG width/height in px")
+    parser.add_argument("--seed", type=int, default=0, help="fault RNG seed (default: %(default)s)")
+    args = parser.parse_args()
+
+    faults = {name: {} for name in SERVICES}
+    try:
+        for name, latency in _per_service(args.latency, parse_latency).items():
+            faults[name]["latency"] = latency
+        for name, (rate, status) in _per_service(
+                args.error, lambda v: (float(v.split(":")[0]), int(v.split(":")[1]) if ":" in v else 503)).items():
+            faults[name].update(error_rate=rate, error_status=status)
+        for name, rate in _per_service(args.timeout, float).items():
+            faults[name]["timeout_rate"] = rate
+        for name, rate in _per_service(args.truncate, float).items():
+            faults[name]["truncate_rate"] = rate
+    except ValueError as e:
+        parser.error(str(e))
+
+    upstream = FakeUpstream(args.port, args.items, faults, args.seed, args.hang, args.avatar_size)
+    print(f"Fake upstream on {upstream.url} — run: python build.py --upstream {upstream.url}  (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        upstream.close()
+        print(f"{'service':<12} {'requests':>9} {'errors':>7} {'timeouts':>9} {'truncated':>10}")
+        for name, s in upstream.stats.items():
+            print(f"{name:<12} {s['requests']:>9} {s['errors']:>7} {s['timeouts']:>9} {s['truncated']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,14 @@ Fetches data from seven sources and writes them into index.html:
   7. TMDB (via REST API — TMDB_READ_ACCESS_TOKEN env var preferred, TMDB_API_KEY as fallback; for film poster/director data; graceful fallback if unset)
 
 Usage:
-    python build.py              # full build
+    python build.py              # full build (writes build-report.json)
+    python build.py --summary    # full build + per-stage timing table
+    python build.py --profile --trace-memory   # full build under cProfile + tracemalloc (any command)
+    python build.py --sites sites/   # build every profile in sites/<name>/ in parallel
+    python build.py --upstream http://127.0.0.1:8900   # fetch from benchmarks/fake_upstream.py instead
     python build.py auth         # one-time: exchange Instapaper credentials for OAuth tokens
+    python build.py favicons     # regenerate favicon.png, favicon-192.png, favicon.ico
+    python build.py serve        # local preview with live reload, rendered from the last build's data
 
 Setup — site.toml:
     Edit site.toml to set title, description, URL, analytics ID, and feed URLs.
@@ -49,55 +55,64 @@ Setup — TMDB:
     Set TMDB_READ_ACCESS_TOKEN env var (API Read Access Token, v4) — preferred.
     TMDB_API_KEY (v3 api_key) is accepted as a fallback.
     Falls back gracefully if unset — film modals show Letterboxd data only.
+
+Multi-site builds:
+    Each sites/<name>/ holds its own site.toml and index.html template and
+    receives that site's outputs; style.css, favicons and assets/ fall back to
+    the repo's copies. Per-site credentials come from <NAME>_GRAVATAR_API_KEY,
+    <NAME>_INSTAPAPER_OAUTH_TOKEN and <NAME>_INSTAPAPER_OAUTH_TOKEN_SECRET,
+    falling back to the unprefixed variables.
 """
 
-import base64
+import contextlib
+import dataclasses
 from datetime import datetime, timedelta, timezone
-from email.utils import parsedate
+import functools
 import hashlib
-import hmac
 import html
 import json
 import os
 import re
 import sys
+import threading
 import time
-try:
-    import tomllib
-except ModuleNotFoundError:
-    import tomli as tomllib  # pip install tomli (for Python < 3.11)
 import urllib.parse
-import urllib.request
-import uuid
-import xml.etree.ElementTree as ET
+
+# Heavier modules (urllib.request, xml.etree, email.utils, tomllib, Pillow,
+# fontTools) are imported inside the stage that needs them, so importing
+# this module for its helpers — tests, benchmarks, `auth` — stays cheap.
 
 # ── Config (from site.toml) ───────────────────────────────────────
 
-_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_SCRIPT_PATH = os.path.abspath(__file__)
+_SCRIPT_DIR = os.path.dirname(_SCRIPT_PATH)
 _CONFIG_PATH = os.path.join(_SCRIPT_DIR, "site.toml")
 
-with open(_CONFIG_PATH, "rb") as _f:
-    CONFIG = tomllib.load(_f)
 
-SITE_URL = CONFIG["site"]["url"]
+def _input_path(path: str) -> str:
+    """Return path if the site directory has it, else the copy beside build.py (shared by all sites)."""
+    if os.path.exists(path):
+        return path
+    shared = os.path.join(_SCRIPT_DIR, path)
+    return shared if os.path.exists(shared) else path
 
-GOODREADS_RSS = CONFIG["sources"]["goodreads"]["currently_reading_rss"]
-GOODREADS_READ_RSS = CONFIG["sources"]["goodreads"]["read_rss"]
-GOODREADS_READ_LIMIT = CONFIG["sources"]["goodreads"]["read_limit"]
 
-LETTERBOXD_RSS = CONFIG["sources"]["letterboxd"]["rss"]
-LETTERBOXD_LIMIT = CONFIG["sources"]["letterboxd"]["limit"]
+def load_config(path: str = _CONFIG_PATH) -> dict:
+    """Read and parse site.toml. Called by the commands that need it, never at import."""
+    try:
+        import tomllib
+    except ModuleNotFoundError:
+        import tomli as tomllib  # pip install tomli (for Python < 3.11)
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
 
-GRAVATAR_USERNAME = CONFIG["sources"]["gravatar"]["username"]
 GRAVATAR_API_KEY = os.environ.get("GRAVATAR_API_KEY", "")
 
 INSTAPAPER_CONSUMER_KEY = os.environ.get("INSTAPAPER_CONSUMER_KEY", "YOUR_CONSUMER_KEY")
 INSTAPAPER_CONSUMER_SECRET = os.environ.get("INSTAPAPER_CONSUMER_SECRET", "YOUR_CONSUMER_SECRET")
 INSTAPAPER_TOKEN_FILE = ".instapaper_tokens"
-INSTAPAPER_LIMIT = CONFIG["sources"]["instapaper"]["limit"]
-LASTFM_USERNAME = CONFIG["sources"]["lastfm"]["username"]
 LASTFM_API_KEY = os.environ.get("LASTFM_API_KEY", "")
-LASTFM_LIMIT = CONFIG["sources"]["lastfm"]["limit"]
 
 TMDB_API_KEY = os.environ.get("TMDB_READ_ACCESS_TOKEN", "") or os.environ.get("TMDB_API_KEY", "")  # prefer v4 Read Access Token; fallback to v3 api_key
 TMDB_API = "https://api.themoviedb.org/3"
@@ -107,25 +122,510 @@ INDEX_PATH = "index.html"
 STYLE_PATH = "style.css"
 OG_IMAGE_PATH = "og-image.png"
 OG_HASH_PATH = ".og-image-hash"
-SITEMAP_PATH = "sitemap.xml"
+SITEMAP_PATH = "sitemap.xml"                  # sitemap index
+SITEMAP_MAIN_PATH = "sitemap-main.xml"        # the home page
+SITEMAP_ARCHIVE_PATH = "sitemap-archive.xml"  # one <url> per archive page
+ARCHIVE_DIR = "archive"
 FAVICON_ICO_PATH = "favicon.ico"
 FAVICON_PNG_PATH = "favicon.png"
 FAVICON_192_PATH = "favicon-192.png"
 ASSETS_DIR = "assets"
+HASHED_DIR = "static"
+HEADERS_PATH = "_headers"
+SW_PATH = "sw.js"
+
+# Copied to static/<name>.<hash><ext> each build and served as immutable.
+# favicon.ico and sitemap.xml keep fixed URLs — browsers and crawlers request them by name.
+HASHED_ASSETS = [OG_IMAGE_PATH, FAVICON_PNG_PATH, FAVICON_192_PATH, STYLE_PATH]
+HASHED_MAX_AGE = 31536000  # one year
+HTML_MAX_AGE = 300         # five minutes — pushes and the daily build show up quickly
+FIXED_ASSET_MAX_AGE = 86400
+
+CACHE_DIR = ".cache"  # persisted between CI runs via actions/cache
+FONT_CACHE_DIR = os.path.join(CACHE_DIR, "fonts")
+OG_CACHE_DIR = os.path.join(CACHE_DIR, "og")  # OG base layer as base-<theme fingerprint>.png
+FONT_FAMILY = "JetBrains Mono"
+# assets/JetBrainsMono-<face>.ttf → (font-weight, font-style); style.css sets italic on book/film titles
+FONT_FACES = {"Regular": (400, "normal"), "Bold": (700, "normal"), "Italic": (400, "italic")}
+FONT_OPTIONAL_FACES = {"Italic"}  # when its TTF is missing, only this face comes from Google Fonts
+FONT_PRELOAD_FACE = "Regular"
+FONT_SUBSET_OPTIONS = {"hinting": False}  # unhinted roughly halves the WOFF2; part of the cache key
+
+REPORT_PATH = "build-report.json"
+HTTP_RETRIES = 1          # extra attempts for idempotent requests on transient failures
+HTTP_RETRY_BACKOFF = 1.0  # seconds, doubled per attempt
+
+# On-disk GET cache, shared by every site in a multi-site build. Off by default
+# for feeds and APIs; TMDB lookups and avatar images are stable enough to keep.
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+HTTP_CACHE_TTL = 0                # seconds; multi-site builds raise it to MULTI_SITE_HTTP_TTL
+TMDB_CACHE_TTL = 7 * 86400
+IMAGE_CACHE_TTL = 86400
+LASTFM_INFO_CACHE_TTL = 7 * 86400  # track.getInfo albums and artist.getInfo bios rarely change
+MULTI_SITE_HTTP_TTL = 900
+FONT_CACHE_TTL = 30 * 86400  # font subsets unused for this long are pruned (a hit refreshes the entry)
+MULTI_SITE_MAX_JOBS = 8  # builds mostly wait on upstream APIs, so this can exceed the CPU count
+ENRICH_WORKERS = 4       # concurrent enrichment lookups per source; RATE_LIMITERS still pace each host
+ENRICH_QUEUE_SIZE = 8    # parsed items that may wait on enrichment before the parser blocks
+RATE_LIMIT_SHARE = 1.0   # fraction of each [rate_limits] rate this process may use; 1/jobs in multi-site builds
+
+# Env vars a site in a multi-site build can override as <SITE>_<VAR>, e.g. ALEX_INSTAPAPER_OAUTH_TOKEN.
+SITE_SECRET_VARS = ("GRAVATAR_API_KEY", "INSTAPAPER_OAUTH_TOKEN", "INSTAPAPER_OAUTH_TOKEN_SECRET")
+
+PAGE_WEIGHT_HISTORY_PATH = os.path.join(CACHE_DIR, "page-weight.jsonl")
+PAGE_WEIGHT_HISTORY_MAX = 400  # lines kept — a bit over a year of daily builds
+BROTLI_QUALITY = 5  # for page-weight sizes and data/*.br — near what Cloudflare's on-the-fly Brotli serves, unlike q11
+CHECK_DATA_ATTR_MAX = 1024  # bytes per data-* value; renderers cap text at ~400 chars, so more means a missed truncation
+
+HISTORY_DB_PATH = os.path.join(CACHE_DIR, "history.db")
+ARCHIVE_MANIFEST_PATH = os.path.join(CACHE_DIR, "archive.json")
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, "snapshot.json")  # last fetched data, for build.py serve
+SEARCH_DIR = os.path.join(HASHED_DIR, "search")
+SEARCH_CACHE_PATH = os.path.join(CACHE_DIR, "search.json")  # tokens per history item, reused while its data is unchanged
+SEARCH_VERSION = 1      # bump when search_tokens(), _search_doc() or the shard format change, to re-tokenize everything
+SEARCH_MAX_RESULTS = 20
+DATA_DIR = "data"       # data.json, one JSON Feed per section, and manifest.json with their hashes
+DATA_VERSION = 1        # bump on any breaking change to data.json's shape
+OUTPUT_MANIFEST_PATH = os.path.join(CACHE_DIR, "outputs.json")  # sha256 of every deployed file, as of the last build
+# OUTPUT_MANIFEST_PATH as of the last successful deploy — saved by the deploy job, restored before the build
+DEPLOYED_MANIFEST_PATH = os.path.join(CACHE_DIR, "deployed", "outputs.json")
+CHANGED_FILES_PATH = "changed-files.txt"  # "A|M|D path" per file that differs from what is live; empty → nothing to deploy
+# What the deploy uploads — keep in step with "Assemble site files" in .github/workflows/build.yml
+DEPLOY_FILES = [INDEX_PATH, OG_IMAGE_PATH, SITEMAP_PATH, SITEMAP_MAIN_PATH, SITEMAP_ARCHIVE_PATH, FAVICON_PNG_PATH,
+                FAVICON_192_PATH, FAVICON_ICO_PATH, "robots.txt", STYLE_PATH, HEADERS_PATH, SW_PATH]
+DEPLOY_DIRS = [HASHED_DIR, ARCHIVE_DIR, DATA_DIR]
+ARCHIVE_PAGE_SIZE = 50
+FEED_SEEN_MAX = 200     # recently seen GUIDs kept per RSS feed (high-water mark)
+FEED_STATE_VERSION = 1  # bump when fetch_goodreads/fetch_letterboxd output changes, to force a full re-parse
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Build report (timing spans + per-source HTTP accounting)
+# ══════════════════════════════════════════════════════════════════
+
+class BuildReport:
+    """Collect nested timing spans and per-source request stats for one build.
+
+    Spans nest per thread: a span opened inside another becomes its child.
+    Counters are guarded by a lock so fetchers may run on worker threads.
+    """
+
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.spans: list[dict] = []
+        self.sources: dict[str, dict] = {}
+        self.page_weight: dict = {}
+
+    def _stack(self) -> list[dict]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as a span named name."""
+        stack = self._stack()
+        start = time.perf_counter()
+        node = {"name": name, "start_ms": round((start - self._t0) * 1000, 2), "ms": 0.0, "children": []}
+        with self._lock:
+            (stack[-1]["children"] if stack else self.spans).append(node)
+        stack.append(node)
+        try:
+            yield node
+        finally:
+            node["ms"] = round((time.perf_counter() - start) * 1000, 2)
+            stack.pop()
+
+    def _source(self, source: str) -> dict:
+        return self.sources.setdefault(source, {
+            "requests": 0, "bytes": 0, "errors": 0, "retries": 0,
+            "cache_hits": 0, "cache_misses": 0, "rate_wait_ms": 0.0,
+        })
+
+    def record_request(self, source: str, nbytes: int, retries: int = 0, ok: bool = True) -> None:
+        """Count one logical request (including its retries) against source."""
+        with self._lock:
+            s = self._source(source)
+            s["requests"] += 1
+            s["bytes"] += nbytes
+            s["retries"] += retries
+            if not ok:
+                s["errors"] += 1
+
+    def record_cache(self, source: str, hit: bool) -> None:
+        """Count a cache hit or miss against source."""
+        with self._lock:
+            self._source(source)["cache_hits" if hit else "cache_misses"] += 1
+
+    def record_wait(self, source: str, seconds: float) -> None:
+        """Add time spent waiting on a rate limiter to source."""
+        with self._lock:
+            s = self._source(source)
+            s["rate_wait_ms"] = round(s["rate_wait_ms"] + seconds * 1000, 2)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "started": self.started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 2),
+            "spans": self.spans,
+            "sources": self.sources,
+            "page_weight": self.page_weight,
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+    def summary(self) -> str:
+        """Return a plain-text table of spans and per-source stats."""
+        lines = [f"{'stage':<40} {'ms':>10}"]
+
+        def _walk(nodes: list[dict], depth: int) -> None:
+            for n in nodes:
+                lines.append(f"{'  ' * depth + n['name']:<40} {n['ms']:>10.1f}")
+                _walk(n["children"], depth + 1)
+
+        _walk(self.spans, 0)
+        lines.append(f"{'total':<40} {self.to_dict()['total_ms']:>10.1f}")
+        if self.sources:
+            lines.append("")
+            lines.append(f"{'source':<14} {'reqs':>5} {'bytes':>10} {'errors':>6} {'retries':>7} {'hits':>5}"
+                         f" {'misses':>6} {'wait ms':>8}")
+            for name, s in sorted(self.sources.items()):
+                lines.append(
+                    f"{name:<14} {s['requests']:>5} {s['bytes']:>10} {s['errors']:>6} {s['retries']:>7}"
+                    f" {s['cache_hits']:>5} {s['cache_misses']:>6} {s['rate_wait_ms']:>8.0f}"
+                )
+        return "\n".join(lines)
+
+
+# Replaced at the start of each cmd_build(); module-level so fetchers can record into it.
+REPORT = BuildReport()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, up to burst banked.
+
+    reserve() takes a token and returns how long the caller must wait
+    before using it, without sleeping, so one bucket can pace threads
+    (acquire) and asyncio tasks (await acquire_async()) alike. Tokens go
+    negative under contention, which queues later callers behind earlier
+    ones instead of letting them race.
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate) - 1
+            self._updated = now
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> float:
+        """Block until a token is available; return the seconds waited."""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Like acquire(), but yields to the event loop while waiting."""
+        import asyncio
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# host → TokenBucket, from site.toml [rate_limits]; replaced by configure_rate_limits() each build.
+RATE_LIMITERS: dict[str, TokenBucket] = {}
+
+
+def configure_rate_limits(limits: dict, share: float = 1.0) -> None:
+    """Create one bucket per host in limits ({host: {rate, burst}}), scaled by share.
+
+    Raises ValueError naming the host unless rate > 0 and burst >= 1, since a
+    zero or negative rate would otherwise only fail on that host's first request.
+    """
+    global RATE_LIMITERS
+    for host, limit in limits.items():
+        rate, burst = limit.get("rate"), limit.get("burst", 1)
+        if not isinstance(rate, (int, float)) or isinstance(rate, bool) or rate <= 0:
+            raise ValueError(f"[rate_limits] {host!r}: rate must be a number > 0 (requests per second), got {rate!r}")
+        if not isinstance(burst, (int, float)) or isinstance(burst, bool) or burst < 1:
+            raise ValueError(f"[rate_limits] {host!r}: burst must be a number >= 1, got {burst!r}")
+    RATE_LIMITERS = {
+        host: TokenBucket(limit["rate"] * share, limit.get("burst", 1) * share)
+        for host, limit in limits.items()
+    }
+
+
+def _rate_limit(url: str, source: str) -> None:
+    """Wait for url's host bucket, if it has one, recording the wait against source."""
+    bucket = RATE_LIMITERS.get(urllib.parse.urlsplit(url).hostname)
+    if bucket is not None:
+        waited = bucket.acquire()
+        if waited:
+            REPORT.record_wait(source, waited)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Return True for failures worth retrying — timeouts, resets, 429 and 5xx."""
+    import urllib.error
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code == 429 or exc.code >= 500
+    if isinstance(exc, urllib.error.URLError):
+        exc = exc.reason  # DNS failures (socket.gaierror) are not retried
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def _http_fetch(url: str, source: str, headers: dict = None, data: bytes = None,
+                timeout: float = 15, cache_ttl: float = None) -> bytes:
+    """Fetch url and return the response body, recording it in REPORT under source.
+
+    Sends a POST when data is given, otherwise a GET. GETs are retried
+    HTTP_RETRIES times on transient failures; POSTs are not (Instapaper
+    OAuth nonces are single-use). GETs are served from HTTP_CACHE_DIR when
+    a cached copy is younger than cache_ttl (default HTTP_CACHE_TTL); the
+    cache key covers the headers, so authenticated responses never leak
+    between credentials. Every attempt that goes to the network first
+    waits on the host's rate limiter (see configure_rate_limits()).
+    """
+    ttl = HTTP_CACHE_TTL if cache_ttl is None else cache_ttl
+    cache_path = ""
+    if data is None and ttl > 0:
+        key = hashlib.sha256(json.dumps([url, sorted((headers or {}).items())]).encode()).hexdigest()
+        cache_path = os.path.join(HTTP_CACHE_DIR, key[:2], key)
+        try:
+            if time.time() - os.path.getmtime(cache_path) < ttl:
+                with open(cache_path, "rb") as f:
+                    body = f.read()
+                REPORT.record_cache(source, hit=True)
+                return body
+        except OSError:
+            pass
+
+    import urllib.request
+    req = urllib.request.Request(url, data=data, headers=headers or {},
+                                 method="POST" if data is not None else "GET")
+    attempts = 1 + (HTTP_RETRIES if data is None else 0)
+    for attempt in range(attempts):
+        _rate_limit(url, source)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                body = resp.read()
+        except Exception as e:
+            if attempt + 1 < attempts and _is_transient(e):
+                time.sleep(HTTP_RETRY_BACKOFF * (2 ** attempt))
+                continue
+            REPORT.record_request(source, 0, retries=attempt, ok=False)
+            raise
+        REPORT.record_request(source, len(body), retries=attempt)
+        if cache_path:
+            REPORT.record_cache(source, hit=False)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"  # several sites may write the same entry at once
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, cache_path)
+        return body
+
+
+def prune_http_cache(cache_dir: str, max_age: float) -> int:
+    """Delete cached files older than max_age seconds; return how many were removed.
+
+    Used for the HTTP cache and, with FONT_CACHE_TTL, the font subset cache.
+    """
+    removed, cutoff = 0, time.time() - max_age
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:  # another site's build got there first
+                pass
+    return removed
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Item records (what the fetchers return and the renderers read)
+# ══════════════════════════════════════════════════════════════════
+
+class _Record:
+    """to_dict()/from_dict() for the slotted records below — the snapshot, history and feed-state format."""
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Build a record from to_dict() output; unknown keys (e.g. history's first_seen) are ignored."""
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Book(_Record):
+    title: str
+    author: str = "Unknown"
+    rating: int = 0
+    cover: str = ""
+    large_cover: str = ""
+    description: str = ""
+    has_review: bool = False
+    finished: str = ""
+    url: str = ""
+    guid: str = ""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Film(_Record):
+    title: str
+    year: str = ""
+    rating: float | None = None
+    url: str = "#"
+    watched: str = ""
+    guid: str = ""
+    poster: str = ""     # poster, director and synopsis come from TMDB
+    director: str = ""
+    synopsis: str = ""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Article(_Record):
+    title: str = "Untitled"
+    url: str = "#"
+    description: str = ""
+    guid: str = ""
+    hash: str = ""  # Instapaper's content hash, sent back as `have`
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Track(_Record):
+    title: str
+    artist: str = ""
+    plays: int = 0
+    url: str = ""
+    album: str = ""  # album and bio come from Last.fm enrichment
+    bio: str = ""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Profile(_Record):
+    display_name: str = ""
+    job_title: str = ""
+    company: str = ""
+    location: str = ""
+    description: str = ""
+    avatar_url: str = ""
+    profile_url: str = ""
+    links: tuple = ()              # ({label, url}, …) as Gravatar returns them
+    verified_accounts: tuple = ()  # ({url, …}, …)
+    email: str = ""
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Profile":
+        profile = super(Profile, cls).from_dict(data)
+        return dataclasses.replace(profile, links=tuple(profile.links),
+                                   verified_accounts=tuple(profile.verified_accounts))
+
+    @classmethod
+    def from_gravatar(cls, data: dict) -> "Profile":
+        """Build a profile from a Gravatar /profiles response (email lives under contact_info)."""
+        return cls.from_dict({**data, "email": (data.get("contact_info") or {}).get("email", "")})
+
+
+# History/snapshot source → record type
+RECORD_TYPES = {"goodreads-now": Book, "goodreads-read": Book, "letterboxd": Film,
+                "instapaper": Article, "lastfm": Track}
+
+
+def _record_json(obj):
+    """json.dumps(default=...) hook: serialise records through to_dict()."""
+    if isinstance(obj, _Record):
+        return obj.to_dict()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Enrichment pipeline (parse → enrich overlap)
+# ══════════════════════════════════════════════════════════════════
+
+def enrich_pipeline(items, enrich, workers: int = ENRICH_WORKERS, queue_size: int = ENRICH_QUEUE_SIZE) -> list:
+    """Run enrich(item) on a thread pool as items arrive; return the results in input order.
+
+    items is usually a parser generator, so the first lookups overlap
+    parsing the rest. At most queue_size items are queued or in flight at
+    once — beyond that the parser blocks. enrich should handle its own
+    per-item failures; anything it raises is re-raised here once the pool
+    has drained.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    slots = threading.BoundedSemaphore(max(queue_size, workers))
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            slots.acquire()
+            future = pool.submit(enrich, item)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+    return [future.result() for future in futures]
+
+
+# ══════════════════════════════════════════════════════════════════
+#  RSS parsing (shared by Goodreads and Letterboxd)
+# ══════════════════════════════════════════════════════════════════
+
+def _iter_rss_items(body: bytes):
+    """Yield each <item> element as soon as it is parsed, so callers can stop early."""
+    import io
+    import xml.etree.ElementTree as ET
+    for _, el in ET.iterparse(io.BytesIO(body)):
+        if el.tag == "item":
+            yield el
+            el.clear()
+
+
+def _rss_guid(item) -> str:
+    """Return the item's <guid>, falling back to its <link>."""
+    for tag in ("guid", "link"):
+        el = item.find(tag)
+        if el is not None and el.text and el.text.strip():
+            return el.text.strip()
+    return ""
 
 
 # ══════════════════════════════════════════════════════════════════
 #  Goodreads (RSS)
 # ══════════════════════════════════════════════════════════════════
 
-def fetch_goodreads(rss_url: str, limit: int = 0) -> list[dict]:
-    """Return a list of {title, author, rating, cover, large_cover, description, finished, url} dicts from the RSS feed."""
-    req = urllib.request.Request(rss_url, headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        tree = ET.parse(resp)
+def fetch_goodreads(rss_url: str, limit: int = 0, stop_at: frozenset = frozenset()) -> list[Book]:
+    """Return the books in a Goodreads shelf RSS feed, newest first.
+
+    Parsing stops at the first item whose guid is in stop_at (see load_feed_state()).
+    """
+    from email.utils import parsedate
+
+    body = _http_fetch(rss_url, "goodreads", headers={"User-Agent": "Mozilla/5.0"})
 
     books = []
-    for item in tree.findall(".//item"):
+    for item in _iter_rss_items(body):
+        guid = _rss_guid(item)
+        if guid in stop_at:
+            break
         title_el      = item.find("title")
         author_el     = item.find("author_name")
         rating_el     = item.find("user_rating")
@@ -173,11 +673,12 @@ def fetch_goodreads(rss_url: str, limit: int = 0) -> list[dict]:
         else:
             url = _strip_tracking_params(link_el.text.strip()) if link_el is not None and link_el.text else ""
 
-        books.append({
-            "title": title, "author": author, "rating": rating,
-            "cover": cover, "large_cover": large_cover,
-            "description": description, "has_review": has_review, "finished": finished, "url": url,
-        })
+        books.append(Book(
+            title=title, author=author, rating=rating,
+            cover=cover, large_cover=large_cover,
+            description=description, has_review=has_review, finished=finished, url=url,
+            guid=guid,
+        ))
 
         if limit and len(books) >= limit:
             break
@@ -185,20 +686,28 @@ def fetch_goodreads(rss_url: str, limit: int = 0) -> list[dict]:
     return books
 
 
-def build_book_html(books: list[dict]) -> str:
-    """Turn a list of books into panel-row divs."""
+def _link_row(url: str) -> tuple[str, str]:
+    """Open and close tags for a row with no modal: a link to url, or a plain div without one."""
+    if url and url != "#":
+        return (f'<a class="panel-row" href="{html.escape(url, quote=True)}"'
+                f' target="_blank" rel="noopener noreferrer">'), "</a>"
+    return '<div class="panel-row">', "</div>"
+
+
+def build_book_html(books: list[Book], links: bool = False) -> str:
+    """Turn a list of books into panel-row divs (plain links to each book with links=True)."""
     if not books:
         return '                <div class="panel-row"><div class="row-content">Nothing at the moment — check back soon.</div></div>'
     lines = []
     for i, book in enumerate(books):
-        t = html.escape(book["title"])
-        a = html.escape(book["author"])
-        rating = book.get("rating", 0)
+        t = html.escape(book.title)
+        a = html.escape(book.author)
+        rating = book.rating
         idx = f"{i + 1:02d}"
 
         # Data attrs for modal
-        dt = html.escape(book["title"], quote=True)
-        da = html.escape(book["author"], quote=True)
+        dt = html.escape(book.title, quote=True)
+        da = html.escape(book.author, quote=True)
         data = (
             f' role="button" tabindex="0"'
             f' data-modal-type="book"'
@@ -207,36 +716,37 @@ def build_book_html(books: list[dict]) -> str:
         )
         if rating:
             data += f' data-stars="{"★" * rating}"'
-        cover_src = book.get("large_cover") or book.get("cover", "")
+        cover_src = book.large_cover or book.cover
         if cover_src:
             data += f' data-cover="{html.escape(cover_src, quote=True)}"'
-        if book.get("finished"):
-            data += f' data-finished="{html.escape(book["finished"], quote=True)}"'
-        if book.get("description"):
-            data += f' data-description="{html.escape(book["description"], quote=True)}"'
-        if book.get("has_review"):
+        if book.finished:
+            data += f' data-finished="{html.escape(book.finished, quote=True)}"'
+        if book.description:
+            data += f' data-description="{html.escape(book.description, quote=True)}"'
+        if book.has_review:
             data += ' data-has-review="true"'
-        if book.get("url"):
-            data += f' data-url="{html.escape(book["url"], quote=True)}"'
+        if book.url:
+            data += f' data-url="{html.escape(book.url, quote=True)}"'
 
         if rating:
             aria = f' aria-label="Rated {rating} out of 5"'
             stars_html = f'\n                  <span class="row-meta book-stars"{aria}>{"★" * rating}</span>'
         else:
             stars_html = ""
+        open_tag, close_tag = _link_row(book.url) if links else (f'<div class="panel-row"{data}>', "</div>")
         lines.append(
-            f'                <div class="panel-row"{data}>\n'
+            f'                {open_tag}\n'
             f'                  <span class="row-index">{idx}</span>\n'
             f'                  <div class="row-content">\n'
             f'                    <div class="book-title">{t}</div>\n'
             f'                    <div class="book-author">{a}</div>\n'
             f'                  </div>{stars_html}\n'
-            f'                </div>'
+            f'                {close_tag}'
         )
     return "\n".join(lines)
 
 
-def build_now_reading_html(books: list[dict]) -> str:
+def build_now_reading_html(books: list[Book]) -> str:
     """Generate status strip HTML for currently-reading shelf.
 
     0 books  → placeholder comment (section invisible)
@@ -246,15 +756,15 @@ def build_now_reading_html(books: list[dict]) -> str:
     if not books:
         return "            <!-- no books currently reading -->"
 
-    def _title_link(b: dict) -> str:
-        t = html.escape(b["title"])
-        u = html.escape(b.get("url", ""), quote=True)
+    def _title_link(b: Book) -> str:
+        t = html.escape(b.title)
+        u = html.escape(b.url, quote=True)
         if u:
             return f'<a class="status-strip-title" href="{u}" target="_blank" rel="noopener noreferrer">{t}</a>'
         return f'<span class="status-strip-title">{t}</span>'
 
     if len(books) == 1:
-        a = html.escape(books[0]["author"])
+        a = html.escape(books[0].author)
         text = f'{_title_link(books[0])} <span class="status-strip-name">{a}</span>'
     else:
         text = ", ".join(_title_link(b) for b in books)
@@ -274,14 +784,25 @@ def build_now_reading_html(books: list[dict]) -> str:
 LETTERBOXD_NS = {"letterboxd": "https://letterboxd.com"}
 
 
-def fetch_letterboxd(rss_url: str, limit: int) -> list[dict]:
-    """Return a list of {title, year, rating, url, watched} dicts from the RSS feed."""
-    req = urllib.request.Request(rss_url, headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        tree = ET.parse(resp)
+def fetch_letterboxd(rss_url: str, limit: int, stop_at: frozenset = frozenset()) -> list[Film]:
+    """Return the films in a Letterboxd diary RSS feed, newest first.
+
+    Parsing stops at the first item whose guid is in stop_at (see load_feed_state()).
+    """
+    return list(iter_letterboxd(rss_url, limit, stop_at))
+
+
+def iter_letterboxd(rss_url: str, limit: int, stop_at: frozenset = frozenset()):
+    """Yield fetch_letterboxd()'s films one at a time, as each <item> is parsed."""
+    from email.utils import parsedate
+
+    body = _http_fetch(rss_url, "letterboxd", headers={"User-Agent": "Mozilla/5.0"})
 
-    films = []
-    for item in tree.findall(".//item"):
+    count = 0
+    for item in _iter_rss_items(body):
+        guid = _rss_guid(item)
+        if guid in stop_at:
+            break
         # Skip non-film entries (e.g. list updates)
         film_title = item.find("letterboxd:filmTitle", LETTERBOXD_NS)
         if film_title is None or film_title.text is None:
@@ -309,13 +830,12 @@ def fetch_letterboxd(rss_url: str, limit: int) -> list[dict]:
                 except Exception:
                     pass
 
-        films.append({"title": title, "year": year, "rating": rating, "url": url, "watched": watched})
+        yield Film(title=title, year=year, rating=rating, url=url, watched=watched, guid=guid)
 
-        if len(films) >= limit:
+        count += 1
+        if count >= limit:
             break
 
-    return films
-
 
 def _strip_html(text: str) -> str:
     """Strip HTML tags and decode entities from a string."""
@@ -337,12 +857,9 @@ def fetch_tmdb_data(title: str, year: str, api_key: str) -> dict:
     if not api_key:
         return {}
     params = urllib.parse.urlencode({"query": title, "year": year})
-    req = urllib.request.Request(
-        f"{TMDB_API}/search/movie?{params}",
-        headers={"Authorization": f"Bearer {api_key}", "User-Agent": "Mozilla/5.0"},
-    )
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        data = json.loads(resp.read().decode())
+    headers = {"Authorization": f"Bearer {api_key}", "User-Agent": "Mozilla/5.0"}
+    data = json.loads(_http_fetch(f"{TMDB_API}/search/movie?{params}", "tmdb", headers=headers, timeout=10,
+                                  cache_ttl=TMDB_CACHE_TTL).decode())
     results = data.get("results", [])
     if not results:
         return {}
@@ -355,12 +872,8 @@ def fetch_tmdb_data(title: str, year: str, api_key: str) -> dict:
 
     director = ""
     if movie_id:
-        req2 = urllib.request.Request(
-            f"{TMDB_API}/movie/{movie_id}/credits",
-            headers={"Authorization": f"Bearer {api_key}", "User-Agent": "Mozilla/5.0"},
-        )
-        with urllib.request.urlopen(req2, timeout=10) as resp2:
-            credits = json.loads(resp2.read().decode())
+        credits = json.loads(_http_fetch(f"{TMDB_API}/movie/{movie_id}/credits", "tmdb",
+                                         headers=headers, timeout=10, cache_ttl=TMDB_CACHE_TTL).decode())
         for crew_member in credits.get("crew", []):
             if crew_member.get("job") == "Director":
                 director = crew_member.get("name", "")
@@ -373,68 +886,78 @@ def fetch_tmdb_data(title: str, year: str, api_key: str) -> dict:
     }
 
 
-def enrich_films_with_tmdb(films: list[dict], api_key: str) -> list[dict]:
-    """Add poster/director/synopsis to each film dict via TMDB. Failures are skipped."""
+def enrich_films_with_tmdb(films, api_key: str) -> list[Film]:
+    """Return films with poster/director/synopsis filled in from TMDB. Failures are skipped.
+
+    films may be a list or an iter_letterboxd() generator; lookups start as
+    soon as each film is parsed (see enrich_pipeline()).
+    """
     if not api_key:
-        print("  ⚠  TMDB_READ_ACCESS_TOKEN not set — film modals will show Letterboxd data only.")
+        films = list(films)
+        if films:
+            print("  ⚠  TMDB_READ_ACCESS_TOKEN not set — film modals will show Letterboxd data only.")
         return films
-    for film in films:
+
+    def enrich(film: Film) -> Film:
         try:
-            tmdb = fetch_tmdb_data(film["title"], film.get("year", ""), api_key)
-            film.update(tmdb)
-            if tmdb.get("director"):
-                print(f"    TMDB: {film['title']} → dir. {tmdb['director']}")
+            tmdb = fetch_tmdb_data(film.title, film.year, api_key)
+            film = dataclasses.replace(film, **tmdb)
+            if film.director:
+                print(f"    TMDB: {film.title} → dir. {film.director}")
         except Exception as e:
-            print(f"  ⚠  TMDB lookup failed for {film['title']!r}: {e}")
-    return films
+            print(f"  ⚠  TMDB lookup failed for {film.title!r}: {e}")
+        return film
+
+    return enrich_pipeline(films, enrich)
 
 
-def build_film_html(films: list[dict]) -> str:
-    """Turn a list of films into panel-row divs."""
+def build_film_html(films: list[Film], links: bool = False) -> str:
+    """Turn a list of films into panel-row divs (plain links to each film with links=True)."""
     if not films:
         return '                <div class="panel-row"><div class="row-content">Nothing at the moment — check back soon.</div></div>'
     lines = []
     for i, film in enumerate(films):
-        t = html.escape(film["title"])
-        y = html.escape(film["year"]) if film.get("year") else ""
-        stars = _star_rating(film["rating"])
+        t = html.escape(film.title)
+        y = html.escape(film.year) if film.year else ""
+        stars = _star_rating(film.rating)
         idx = f"{i + 1:02d}"
 
         # Data attrs for modal
-        dt = html.escape(film["title"], quote=True)
+        dt = html.escape(film.title, quote=True)
         data = (
             f' role="button" tabindex="0"'
             f' data-modal-type="film"'
             f' data-title="{dt}"'
         )
-        if film.get("year"):
-            data += f' data-year="{html.escape(film["year"], quote=True)}"'
+        if film.year:
+            data += f' data-year="{html.escape(film.year, quote=True)}"'
         if stars:
             data += f' data-stars="{html.escape(stars, quote=True)}"'
-        if film.get("url"):
-            data += f' data-url="{html.escape(film["url"], quote=True)}"'
-        if film.get("poster"):
-            data += f' data-poster="{html.escape(film["poster"], quote=True)}"'
-        if film.get("director"):
-            data += f' data-director="{html.escape(film["director"], quote=True)}"'
-        if film.get("synopsis"):
-            data += f' data-synopsis="{html.escape(film["synopsis"], quote=True)}"'
-        if film.get("watched"):
-            data += f' data-watched="{html.escape(film["watched"], quote=True)}"'
+        if film.url:
+            data += f' data-url="{html.escape(film.url, quote=True)}"'
+        if film.poster:
+            data += f' data-poster="{html.escape(film.poster, quote=True)}"'
+        if film.director:
+            data += f' data-director="{html.escape(film.director, quote=True)}"'
+        if film.synopsis:
+            data += f' data-synopsis="{html.escape(film.synopsis, quote=True)}"'
+        if film.watched:
+            data += f' data-watched="{html.escape(film.watched, quote=True)}"'
 
         if stars:
-            aria = f' aria-label="Rated {film["rating"]} out of 5"'
+            aria = f' aria-label="Rated {film.rating} out of 5"'
             stars_html = f'\n                  <span class="row-meta film-stars"{aria}>{stars}</span>'
         else:
             stars_html = ""
+        open_tag, close_tag = _link_row(film.url) if links else (f'<div class="panel-row"{data}>', "</div>")
         lines.append(
-            f'                <div class="panel-row"{data}>\n'
+            f'                {open_tag}\n'
             f'                  <span class="row-index">{idx}</span>\n'
             f'                  <div class="row-content">\n'
             f'                    <div class="film-title">{t}</div>\n'
             f'                    <div class="film-year">{y}</div>\n'
             f'                  </div>{stars_html}\n'
-            f'                </div>'
+            f'                {close_tag}'
         )
     return "\n".join(lines)
 
@@ -443,27 +966,28 @@ def build_film_html(films: list[dict]) -> str:
 #  Gravatar (REST API)
 # ══════════════════════════════════════════════════════════════════
 
-def fetch_gravatar(username: str, api_key: str = "") -> dict:
+GRAVATAR_API = "https://api.gravatar.com/v3"
+
+
+def fetch_gravatar(username: str, api_key: str = "") -> Profile:
     """Fetch profile data from Gravatar API."""
-    url = f"https://api.gravatar.com/v3/profiles/{username}"
+    url = f"{GRAVATAR_API}/profiles/{username}"
     headers = {"Accept": "application/json"}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
-    req = urllib.request.Request(url, headers=headers)
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read().decode())
+    return Profile.from_gravatar(json.loads(_http_fetch(url, "gravatar", headers=headers).decode()))
 
 
-def build_gravatar_tagline(profile: dict) -> str:
+def build_gravatar_tagline(profile: Profile) -> str:
     """Build a tagline from job_title, company, and location."""
     parts = []
-    if profile.get("job_title"):
-        title = profile["job_title"]
-        if profile.get("company"):
-            title += f' at {profile["company"]}'
+    if profile.job_title:
+        title = profile.job_title
+        if profile.company:
+            title += f' at {profile.company}'
         parts.append(title)
-    if profile.get("location"):
-        parts.append(profile["location"])
+    if profile.location:
+        parts.append(profile.location)
     return " · ".join(parts) if parts else ""
 
 
@@ -472,24 +996,24 @@ def _norm_url(url: str) -> str:
     return url.rstrip("/")
 
 
-def build_jsonld(profile: dict, site_url: str) -> str:
+def build_jsonld(profile: Profile, site_url: str) -> str:
     """Build a JSON-LD Person schema from Gravatar profile data."""
     data = {
         "@context": "https://schema.org",
         "@type": "Person",
-        "name": profile.get("display_name", ""),
+        "name": profile.display_name,
         "url": site_url,
     }
-    if profile.get("job_title"):
-        data["jobTitle"] = profile["job_title"]
-    if profile.get("company"):
-        data["worksFor"] = {"@type": "Organization", "name": profile["company"]}
-    if profile.get("location"):
-        data["homeLocation"] = {"@type": "Place", "name": profile["location"]}
-    if profile.get("description"):
-        data["description"] = profile["description"]
-    if profile.get("avatar_url"):
-        data["image"] = profile["avatar_url"]
+    if profile.job_title:
+        data["jobTitle"] = profile.job_title
+    if profile.company:
+        data["worksFor"] = {"@type": "Organization", "name": profile.company}
+    if profile.location:
+        data["homeLocation"] = {"@type": "Place", "name": profile.location}
+    if profile.description:
+        data["description"] = profile.description
+    if profile.avatar_url:
+        data["image"] = profile.avatar_url
     seen: set[str] = set()
     same_as: list[str] = []
 
@@ -499,75 +1023,166 @@ def build_jsonld(profile: dict, site_url: str) -> str:
             seen.add(key)
             same_as.append(url)
 
-    _add(profile["profile_url"])
-    for link in profile.get("links", []):
+    _add(profile.profile_url)
+    for link in profile.links:
         if link.get("url"):
             _add(link["url"])
-    for acct in profile.get("verified_accounts", []):
+    for acct in profile.verified_accounts:
         if acct.get("url"):
             _add(acct["url"])
     data["sameAs"] = same_as
     return json.dumps(data, indent=2)
 
 
-def generate_og_image(profile: dict, output_path: str):
-    """Generate a 1200x630 OG image with avatar, name, and tagline."""
-    try:
-        from PIL import Image, ImageDraw, ImageFont
-        import io
-    except ImportError:
-        print("  ⚠  Pillow not installed — skipping OG image generation.")
-        return False
+OG_WIDTH, OG_HEIGHT = 1200, 630
+OG_THEME = {
+    "bg": (5, 10, 20),                # #050a14
+    "text_primary": (226, 232, 240),  # #e2e8f0
+    "text_secondary": (100, 116, 139),  # #64748b
+    "accent": (59, 130, 246),         # #3b82f6
+    "url_label": "nicsheehan.com",
+}
 
-    WIDTH, HEIGHT = 1200, 630
-    BG_COLOR = (5, 10, 20)            # #050a14
-    TEXT_PRIMARY = (226, 232, 240)    # #e2e8f0
-    TEXT_SECONDARY = (100, 116, 139)  # #64748b
-    ACCENT = (59, 130, 246)           # #3b82f6
+# Static base layer + fonts, keyed by _og_theme_fingerprint(); the base also persists in OG_CACHE_DIR
+_OG_BASE_CACHE: dict[str, tuple] = {}
 
-    img = Image.new("RGB", (WIDTH, HEIGHT), BG_COLOR)
-    draw = ImageDraw.Draw(img)
 
-    # Borders — 2px top, 4px left (panel accent)
-    draw.rectangle([(0, 0), (WIDTH, 1)], fill=ACCENT)
-    draw.rectangle([(0, 0), (3, HEIGHT)], fill=ACCENT)
+def _og_font_paths(bold: bool) -> list[str]:
+    """Candidate font files for the OG image — assets/ first, then system mono."""
+    weight = "Bold" if bold else "Regular"
+    return [
+        _input_path(os.path.join(ASSETS_DIR, f"JetBrainsMono-{weight}.ttf")),
+        "/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf" if bold
+        else "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+        "/System/Library/Fonts/Courier.ttc",
+    ]
+
+
+def _og_theme_fingerprint() -> str:
+    """Compute SHA-256 fingerprint of everything baked into the OG base layer.
+
+    Covers canvas size, theme colours, the URL label, and the size and
+    content hash of each candidate font file, so editing the theme or
+    swapping a font invalidates the cached base. (Not mtimes — a fresh CI
+    checkout resets them on every run.)
+    """
+    fonts = []
+    for p in _og_font_paths(False) + _og_font_paths(True):
+        try:
+            with open(p, "rb") as f:
+                data = f.read()
+            fonts.append(f"{p}:{len(data)}:{hashlib.sha256(data).hexdigest()}")
+        except OSError:
+            fonts.append(f"{p}:-")
+    content = json.dumps([OG_WIDTH, OG_HEIGHT, OG_THEME, fonts], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _og_base_layer():
+    """Return (base_image, fonts) for the OG image, drawing the base only when the theme changes.
+
+    The base holds the background, accent borders, and URL label — everything
+    that does not depend on profile data. It is kept in memory and as
+    OG_CACHE_DIR/base-<fingerprint>.png, so later builds load it instead of
+    drawing it. Callers must copy() the image before drawing on it.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    key = _og_theme_fingerprint()
+    cached = _OG_BASE_CACHE.get(key)
+    if cached is not None:
+        return cached
 
-    # Load fonts — assets/ first, fall back to system mono
     def load_font(size, bold=False):
-        weight = "Bold" if bold else "Regular"
-        asset = os.path.join(ASSETS_DIR, f"JetBrainsMono-{weight}.ttf")
-        fallbacks = [
-            "/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf" if bold
-            else "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
-            "/System/Library/Fonts/Courier.ttc",
-        ]
-        if os.path.exists(asset):
-            try:
-                return ImageFont.truetype(asset, size)
-            except (OSError, IOError):
-                pass
-        for p in fallbacks:
+        for p in _og_font_paths(bold):
+            if not os.path.exists(p):
+                continue
             try:
                 return ImageFont.truetype(p, size)
             except (OSError, IOError):
                 continue
         return ImageFont.load_default()
 
-    font_name = load_font(54, bold=True)
-    font_tagline = load_font(24)
-    font_url = load_font(20)
+    fonts = {
+        "name": load_font(54, bold=True),
+        "tagline": load_font(24),
+        "url": load_font(20),
+    }
+
+    base_path = os.path.join(OG_CACHE_DIR, f"base-{key[:16]}.png")
+    try:
+        with Image.open(base_path) as cached_base:
+            base = cached_base.convert("RGB")
+        REPORT.record_cache("og-base", hit=True)
+        _OG_BASE_CACHE.clear()
+        _OG_BASE_CACHE[key] = (base, fonts)
+        return base, fonts
+    except OSError:
+        REPORT.record_cache("og-base", hit=False)
+
+    accent = OG_THEME["accent"]
+    base = Image.new("RGB", (OG_WIDTH, OG_HEIGHT), OG_THEME["bg"])
+    draw = ImageDraw.Draw(base)
+
+    # Borders — 2px top, 4px left (panel accent)
+    draw.rectangle([(0, 0), (OG_WIDTH, 1)], fill=accent)
+    draw.rectangle([(0, 0), (3, OG_HEIGHT)], fill=accent)
+
+    # URL label — bottom right
+    url_text = OG_THEME["url_label"]
+    bbox = draw.textbbox((0, 0), url_text, font=fonts["url"])
+    url_w = bbox[2] - bbox[0]
+    draw.text((OG_WIDTH - url_w - 60, OG_HEIGHT - 56), url_text, fill=accent, font=fonts["url"])
+
+    import io
+    buf = io.BytesIO()
+    base.save(buf, "PNG", compress_level=1)
+    write_if_changed(base_path, buf.getvalue())
+    for name in os.listdir(OG_CACHE_DIR):  # bases for old themes or fonts
+        if name.startswith("base-") and name != os.path.basename(base_path):
+            os.remove(os.path.join(OG_CACHE_DIR, name))
+
+    _OG_BASE_CACHE.clear()
+    _OG_BASE_CACHE[key] = (base, fonts)
+    return base, fonts
+
+
+def _encode_og_png(img, output_path: str, encoder: str = "palette", compress_level: int = 6) -> None:
+    """Save the OG image using the configured encoder.
+
+    "palette" — quantize to an adaptive 256-colour palette (smallest file).
+    "zlib"    — truecolour PNG at a fixed zlib level, no optimize pass.
+    """
+    import io
+    if encoder == "palette":
+        from PIL import Image
+        img = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    elif encoder != "zlib":
+        raise ValueError(f"Unknown og_image.encoder {encoder!r} — expected 'palette' or 'zlib'")
+    buf = io.BytesIO()
+    img.save(buf, "PNG", compress_level=compress_level)
+    write_if_changed(output_path, buf.getvalue())
+
+
+def _render_og_image(profile: Profile):
+    """Draw the avatar, name, and tagline onto a copy of the base layer."""
+    from PIL import Image, ImageDraw
+    import io
+
+    base, fonts = _og_base_layer()
+    img = base.copy()
+    draw = ImageDraw.Draw(img)
+    accent = OG_THEME["accent"]
 
     # Download and composite avatar
-    avatar_url = profile.get("avatar_url", "")
+    avatar_url = profile.avatar_url
     avatar_size = 180
-    avatar_x, avatar_y = 100, (HEIGHT - avatar_size) // 2
+    avatar_x, avatar_y = 100, (OG_HEIGHT - avatar_size) // 2
 
     if avatar_url:
         try:
-            req = urllib.request.Request(f"{avatar_url}?s=400",
-                                         headers={"User-Agent": "Mozilla/5.0"})
-            with urllib.request.urlopen(req, timeout=15) as resp:
-                avatar_data = resp.read()
+            avatar_data = _http_fetch(f"{avatar_url}?s=400", "avatar", headers={"User-Agent": "Mozilla/5.0"},
+                                      cache_ttl=IMAGE_CACHE_TTL)
             avatar = Image.open(io.BytesIO(avatar_data)).resize(
                 (avatar_size, avatar_size), Image.LANCZOS
             )
@@ -582,7 +1197,7 @@ def generate_og_image(profile: dict, output_path: str):
             cy = avatar_y + avatar_size // 2
             draw.ellipse(
                 (cx - ring_r, cy - ring_r, cx + ring_r, cy + ring_r),
-                outline=ACCENT, width=3,
+                outline=accent, width=3,
             )
             img.paste(avatar, (avatar_x, avatar_y), mask)
         except Exception as e:
@@ -590,22 +1205,35 @@ def generate_og_image(profile: dict, output_path: str):
 
     # Name and tagline
     text_x = avatar_x + avatar_size + 60
-    name = profile.get("display_name", "")
+    name = profile.display_name
     tagline = build_gravatar_tagline(profile)
 
-    name_y = HEIGHT // 2 - 45
-    draw.text((text_x, name_y), name, fill=TEXT_PRIMARY, font=font_name)
+    name_y = OG_HEIGHT // 2 - 45
+    draw.text((text_x, name_y), name, fill=OG_THEME["text_primary"], font=fonts["name"])
 
     if tagline:
-        draw.text((text_x, name_y + 72), tagline, fill=TEXT_SECONDARY, font=font_tagline)
+        draw.text((text_x, name_y + 72), tagline, fill=OG_THEME["text_secondary"], font=fonts["tagline"])
+    return img
 
-    # URL label — bottom right
-    url_text = "nicsheehan.com"
-    bbox = draw.textbbox((0, 0), url_text, font=font_url)
-    url_w = bbox[2] - bbox[0]
-    draw.text((WIDTH - url_w - 60, HEIGHT - 56), url_text, fill=ACCENT, font=font_url)
 
-    img.save(output_path, "PNG", optimize=True)
+def generate_og_image(profile: Profile, output_path: str, encoder: str = "palette", compress_level: int = 6):
+    """Generate a 1200x630 OG image with avatar, name, and tagline.
+
+    encoder and compress_level come from [og_image] in site.toml — see _encode_og_png().
+    Render and encode times are recorded as og-render / og-encode spans.
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("  ⚠  Pillow not installed — skipping OG image generation.")
+        return False
+
+    with REPORT.span("og-render") as render:
+        img = _render_og_image(profile)
+    with REPORT.span("og-encode") as encode:
+        _encode_og_png(img, output_path, encoder, compress_level)
+    size_kb = os.path.getsize(output_path) / 1024
+    print(f"  OG render {render['ms']:.0f} ms · encode ({encoder}) {encode['ms']:.0f} ms · {size_kb:.1f} KB")
     return True
 
 
@@ -628,18 +1256,17 @@ def _og_inputs_changed(name: str, tagline: str, avatar_url: str, hash_path: str)
 
 def _save_og_hash(name: str, tagline: str, avatar_url: str, hash_path: str) -> None:
     """Write current OG fingerprint to disk."""
-    with open(hash_path, "w") as f:
-        f.write(_og_fingerprint(name, tagline, avatar_url))
+    write_if_changed(hash_path, _og_fingerprint(name, tagline, avatar_url))
 
 
 _NAV_EXCLUDED_DOMAINS = frozenset({"goodreads.com", "letterboxd.com"})
 
 
-def build_gravatar_links_html(profile: dict, email: str = "") -> str:
+def build_gravatar_links_html(profile: Profile, email: str = "") -> str:
     """Build nav link buttons from Gravatar links + optional email.
     Excludes Goodreads and Letterboxd — they have contextual panel footer links instead.
     """
-    links = profile.get("links", [])
+    links = profile.links
     lines = []
     for link in links:
         url = link.get("url", "")
@@ -659,16 +1286,43 @@ def build_gravatar_links_html(profile: dict, email: str = "") -> str:
     return "\n".join(lines)
 
 
+def build_gravatar_regions(profile: Profile, site_url: str) -> dict:
+    """Return {marker tag: html} for every Gravatar-driven region; empty fields are left out."""
+    name = html.escape(profile.display_name)
+    tagline = html.escape(build_gravatar_tagline(profile))
+    bio = profile.description
+    avatar_url = profile.avatar_url
+    regions = {}
+    if avatar_url:
+        regions["gravatar-avatar"] = f'        <img class="avatar" src="{html.escape(avatar_url)}?s=192" alt="{name}" width="72" height="72">'
+    if name:
+        regions["gravatar-name"] = f"        {name}"
+    if tagline:
+        regions["gravatar-tagline"] = f"        {tagline}"
+    if bio:
+        regions["gravatar-bio"] = f"        <p>{html.escape(bio)}</p>"
+    links_html = build_gravatar_links_html(profile, email=profile.email)
+    if links_html:
+        regions["gravatar-links"] = links_html
+    jsonld = build_jsonld(profile, site_url)
+    regions["jsonld"] = f"    <script type=\"application/ld+json\">\n{jsonld}\n    </script>"
+    return regions
+
+
 # ══════════════════════════════════════════════════════════════════
 #  Instapaper (OAuth 1.0a / xAuth)
 # ══════════════════════════════════════════════════════════════════
 
 INSTAPAPER_API = "https://www.instapaper.com"
+INSTAPAPER_SYNC_LIMIT = 500  # bookmarks returned per sync request (the API maximum); the page shows sources.instapaper.limit
 
 
 def _oauth_sign(method: str, url: str, params: dict,
                 consumer_secret: str, token_secret: str = "") -> str:
     """Generate an OAuth 1.0a HMAC-SHA1 signature."""
+    import base64
+    import hmac
+
     sorted_params = urllib.parse.urlencode(sorted(params.items()))
     base_string = "&".join([
         method.upper(),
@@ -684,6 +1338,8 @@ def _oauth_headers(url: str, consumer_key: str, consumer_secret: str,
                    token: str = "", token_secret: str = "",
                    extra_params: dict = None) -> dict:
     """Build an Authorization header for an OAuth 1.0a request."""
+    import uuid
+
     oauth_params = {
         "oauth_consumer_key": consumer_key,
         "oauth_nonce": uuid.uuid4().hex,
@@ -718,9 +1374,7 @@ def instapaper_auth(username: str, password: str) -> dict:
         extra_params=body_params,
     )
     body = urllib.parse.urlencode(body_params).encode()
-    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        result = urllib.parse.parse_qs(resp.read().decode())
+    result = urllib.parse.parse_qs(_http_fetch(url, "instapaper", headers=headers, data=body).decode())
 
     tokens = {
         "oauth_token": result["oauth_token"][0],
@@ -766,51 +1420,79 @@ def _strip_tracking_params(url: str) -> str:
 
 
 
-def fetch_instapaper_starred(tokens: dict) -> list[dict]:
-    """Fetch starred bookmarks from Instapaper. Returns list of {title, url, description} dicts."""
+def _instapaper_bookmarks(tokens: dict, body_params: dict) -> tuple[list[Article], set[str]]:
+    """POST bookmarks/list. Returns (articles, deleted bookmark ids)."""
     url = f"{INSTAPAPER_API}/api/1.1/bookmarks/list"
-    body_params = {
-        "folder_id": "starred",
-        "limit": str(INSTAPAPER_LIMIT),
-    }
     headers = _oauth_headers(
         url, INSTAPAPER_CONSUMER_KEY, INSTAPAPER_CONSUMER_SECRET,
         token=tokens["oauth_token"], token_secret=tokens["oauth_token_secret"],
         extra_params=body_params,
     )
     body = urllib.parse.urlencode(body_params).encode()
-    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode())
+    data = json.loads(_http_fetch(url, "instapaper", headers=headers, data=body).decode())
 
     bookmarks = data.get("bookmarks", data) if isinstance(data, dict) else data
     articles = []
     for item in bookmarks:
         if not isinstance(item, dict) or item.get("type") != "bookmark":
             continue
-        articles.append({
-            "title": item.get("title", "Untitled"),
-            "url": _strip_tracking_params(item.get("url", "#")),
-            "description": item.get("description", ""),
-        })
-    return articles
-
-
-def build_article_html(articles: list[dict]) -> str:
-    """Turn a list of articles into panel-row divs (modal-triggered, no direct links)."""
+        articles.append(Article(
+            title=item.get("title", "Untitled"),
+            url=_strip_tracking_params(item.get("url", "#")),
+            description=item.get("description", ""),
+            guid=str(item.get("bookmark_id", "")),
+            hash=item.get("hash", ""),
+        ))
+    deleted = data.get("delete_ids", "") if isinstance(data, dict) else ""
+    if isinstance(deleted, str):
+        deleted = deleted.split(",")
+    return articles, {str(d).strip() for d in deleted if str(d).strip()}
+
+
+def fetch_instapaper_starred(tokens: dict, limit: int = 25) -> list[Article]:
+    """Fetch starred bookmarks from Instapaper, newest first."""
+    return _instapaper_bookmarks(tokens, {"folder_id": "starred", "limit": str(limit)})[0]
+
+
+def sync_instapaper_starred(tokens: dict, known: list[Article], limit: int = INSTAPAPER_SYNC_LIMIT) -> tuple[list[Article], int, list[Article]]:
+    """Bring a stored starred list up to date. Returns (articles, number changed, unstarred).
+
+    known bookmarks go to the API as `have` (id:hash pairs), so it returns
+    only bookmarks that are new or edited, plus the ids that were unstarred.
+    New bookmarks go first, edited ones are replaced in place, deleted ones
+    are dropped and returned as unstarred so callers can forget them. The
+    list is never trimmed: every known id has to be sent back as `have`, or
+    the API hands older bookmarks back as new on every sync.
+    """
+    body_params = {"folder_id": "starred", "limit": str(limit)}
+    have = ",".join(f"{a.guid}:{a.hash}" if a.hash else a.guid for a in known if a.guid)
+    if have:
+        body_params["have"] = have
+    changed, deleted = _instapaper_bookmarks(tokens, body_params)
+
+    known_ids = {a.guid for a in known}
+    edited = {a.guid: a for a in changed if a.guid in known_ids}
+    merged = [a for a in changed if a.guid not in known_ids]
+    merged += [edited.get(a.guid, a) for a in known if a.guid not in deleted]
+    unstarred = [a for a in known if a.guid in deleted]
+    return merged, len(changed) + len(unstarred), unstarred
+
+
+def build_article_html(articles: list[Article], links: bool = False) -> str:
+    """Turn a list of articles into panel-row divs (modal-triggered, or plain links with links=True)."""
     if not articles:
         return '                <div class="panel-row"><div class="row-content">Nothing yet — check back soon.</div></div>'
     lines = []
     for i, article in enumerate(articles):
-        t = html.escape(article["title"])
-        u = html.escape(article["url"], quote=True)
-        domain = urllib.parse.urlparse(article["url"]).hostname or ""
+        t = html.escape(article.title)
+        u = html.escape(article.url, quote=True)
+        domain = urllib.parse.urlparse(article.url).hostname or ""
         domain = domain.removeprefix("www.")
         source_html = f'\n                    <div class="article-source">{html.escape(domain)}</div>' if domain else ""
         idx = f"{i + 1:02d}"
 
         # Data attrs for modal
-        dt = html.escape(article["title"], quote=True)
+        dt = html.escape(article.title, quote=True)
         data = (
             f' role="button" tabindex="0"'
             f' data-modal-type="article"'
@@ -819,19 +1501,20 @@ def build_article_html(articles: list[dict]) -> str:
         )
         if domain:
             data += f' data-source="{html.escape(domain, quote=True)}"'
-        desc = article.get("description", "")
+        desc = article.description
         if len(desc) > 400:
             desc = desc[:397] + "…"
         if desc:
             data += f' data-description="{html.escape(desc, quote=True)}"'
 
+        open_tag, close_tag = _link_row(article.url) if links else (f'<div class="panel-row"{data}>', "</div>")
         lines.append(
-            f'                <div class="panel-row"{data}>\n'
+            f'                {open_tag}\n'
             f'                  <span class="row-index">{idx}</span>\n'
             f'                  <div class="row-content">\n'
             f'                    <div class="article-title">{t}</div>{source_html}\n'
             f'                  </div>\n'
-            f'                </div>'
+            f'                {close_tag}'
         )
     return "\n".join(lines)
 
@@ -844,8 +1527,13 @@ def build_article_html(articles: list[dict]) -> str:
 LASTFM_API = "https://ws.audioscrobbler.com/2.0/"
 
 
-def fetch_lastfm_top_tracks(username: str, api_key: str, limit: int) -> list[dict]:
-    """Return a list of {title, artist, plays, url} dicts from Last.fm top tracks."""
+def fetch_lastfm_top_tracks(username: str, api_key: str, limit: int) -> list[Track]:
+    """Return this month's top tracks from Last.fm, most played first."""
+    return list(iter_lastfm_top_tracks(username, api_key, limit))
+
+
+def iter_lastfm_top_tracks(username: str, api_key: str, limit: int):
+    """Yield fetch_lastfm_top_tracks()'s tracks one at a time."""
     params = urllib.parse.urlencode({
         "method": "user.getTopTracks",
         "user": username,
@@ -854,20 +1542,15 @@ def fetch_lastfm_top_tracks(username: str, api_key: str, limit: int) -> list[dic
         "api_key": api_key,
         "format": "json",
     })
-    url = f"{LASTFM_API}?{params}"
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode())
+    data = json.loads(_http_fetch(f"{LASTFM_API}?{params}", "lastfm", headers={"User-Agent": "Mozilla/5.0"}).decode())
 
-    tracks = []
     for track in data.get("toptracks", {}).get("track", []):
-        tracks.append({
-            "title": track.get("name", ""),
-            "artist": track.get("artist", {}).get("name", ""),
-            "plays": int(track.get("playcount", 0) or 0),
-            "url": track.get("url", ""),
-        })
-    return tracks
+        yield Track(
+            title=track.get("name", ""),
+            artist=track.get("artist", {}).get("name", ""),
+            plays=int(track.get("playcount", 0) or 0),
+            url=track.get("url", ""),
+        )
 
 
 def fetch_lastfm_track_info(title: str, artist: str, api_key: str) -> dict:
@@ -879,9 +1562,8 @@ def fetch_lastfm_track_info(title: str, artist: str, api_key: str) -> dict:
         "api_key": api_key,
         "format": "json",
     })
-    req = urllib.request.Request(f"{LASTFM_API}?{params}", headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        data = json.loads(resp.read().decode())
+    data = json.loads(_http_fetch(f"{LASTFM_API}?{params}", "lastfm", headers={"User-Agent": "Mozilla/5.0"},
+                                  timeout=10, cache_ttl=LASTFM_INFO_CACHE_TTL).decode())
     album = data.get("track", {}).get("album", {}).get("title", "")
     return {"album": album}
 
@@ -894,9 +1576,8 @@ def fetch_lastfm_artist_info(artist: str, api_key: str) -> dict:
         "api_key": api_key,
         "format": "json",
     })
-    req = urllib.request.Request(f"{LASTFM_API}?{params}", headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        data = json.loads(resp.read().decode())
+    data = json.loads(_http_fetch(f"{LASTFM_API}?{params}", "lastfm", headers={"User-Agent": "Mozilla/5.0"},
+                                  timeout=10, cache_ttl=LASTFM_INFO_CACHE_TTL).decode())
     bio_raw = data.get("artist", {}).get("bio", {}).get("summary", "")
     bio = _strip_html(bio_raw)
     bio = re.sub(r"\s*Read more on Last\.fm\b.*$", "", bio, flags=re.IGNORECASE).strip()
@@ -905,44 +1586,58 @@ def fetch_lastfm_artist_info(artist: str, api_key: str) -> dict:
     return {"bio": bio}
 
 
-def enrich_tracks_with_lastfm(tracks: list[dict], api_key: str) -> list[dict]:
-    """Add album and artist bio to each track dict via Last.fm. Failures are skipped."""
+def enrich_tracks_with_lastfm(tracks, api_key: str) -> list[Track]:
+    """Return tracks with album and artist bio filled in from Last.fm. Failures are skipped.
+
+    tracks may be a list or an iter_lastfm_top_tracks() generator; lookups
+    run on enrich_pipeline() workers, and each artist's bio is fetched once
+    even when several of their tracks are in flight at the same time.
+    """
     if not api_key:
-        return tracks
-    artist_bios: dict[str, str] = {}
-    for track in tracks:
-        artist = track["artist"]
-        try:
-            info = fetch_lastfm_track_info(track["title"], artist, api_key)
-            track.update(info)
-        except Exception as e:
-            print(f"  ⚠  Last.fm track.getInfo failed for {track['title']!r}: {e}")
-        if artist not in artist_bios and artist:
+        return list(tracks)
+    from concurrent.futures import Future
+    artist_bios: dict[str, Future] = {}
+    bios_lock = threading.Lock()
+
+    def artist_bio(artist: str) -> str:
+        with bios_lock:
+            future = artist_bios.get(artist)
+            owner = future is None
+            if owner:
+                future = artist_bios[artist] = Future()
+        if owner:
             try:
-                a_info = fetch_lastfm_artist_info(artist, api_key)
-                artist_bios[artist] = a_info.get("bio", "")
+                future.set_result(fetch_lastfm_artist_info(artist, api_key).get("bio", ""))
             except Exception as e:
                 print(f"  ⚠  Last.fm artist.getInfo failed for {artist!r}: {e}")
-                artist_bios[artist] = ""
-        track["bio"] = artist_bios.get(artist, "")
-    return tracks
+                future.set_result("")
+        return future.result()
+
+    def enrich(track: Track) -> Track:
+        try:
+            track = dataclasses.replace(track, **fetch_lastfm_track_info(track.title, track.artist, api_key))
+        except Exception as e:
+            print(f"  ⚠  Last.fm track.getInfo failed for {track.title!r}: {e}")
+        return dataclasses.replace(track, bio=artist_bio(track.artist) if track.artist else "")
+
+    return enrich_pipeline(tracks, enrich)
 
 
-def build_music_html(tracks: list[dict]) -> str:
-    """Turn a list of tracks into panel-row divs."""
+def build_music_html(tracks: list[Track], links: bool = False) -> str:
+    """Turn a list of tracks into panel-row divs (plain links to each track with links=True)."""
     if not tracks:
         return '                <div class="panel-row"><div class="row-content">Nothing at the moment — check back soon.</div></div>'
     lines = []
     for i, track in enumerate(tracks):
-        t = html.escape(track["title"])
-        a = html.escape(track["artist"])
-        p = track["plays"]
+        t = html.escape(track.title)
+        a = html.escape(track.artist)
+        p = track.plays
         play_word = "play" if p == 1 else "plays"
         idx = f"{i + 1:02d}"
 
         # Data attrs for modal
-        dt = html.escape(track["title"], quote=True)
-        da = html.escape(track["artist"], quote=True)
+        dt = html.escape(track.title, quote=True)
+        da = html.escape(track.artist, quote=True)
         data = (
             f' role="button" tabindex="0"'
             f' data-modal-type="music"'
@@ -950,22 +1645,23 @@ def build_music_html(tracks: list[dict]) -> str:
             f' data-artist="{da}"'
             f' data-plays="{html.escape(str(p), quote=True)}"'
         )
-        if track.get("url"):
-            data += f' data-url="{html.escape(track["url"], quote=True)}"'
-        if track.get("album"):
-            data += f' data-album="{html.escape(track["album"], quote=True)}"'
-        if track.get("bio"):
-            data += f' data-bio="{html.escape(track["bio"], quote=True)}"'
-
+        if track.url:
+            data += f' data-url="{html.escape(track.url, quote=True)}"'
+        if track.album:
+            data += f' data-album="{html.escape(track.album, quote=True)}"'
+        if track.bio:
+            data += f' data-bio="{html.escape(track.bio, quote=True)}"'
+
+        open_tag, close_tag = _link_row(track.url) if links else (f'<div class="panel-row"{data}>', "</div>")
         lines.append(
-            f'                <div class="panel-row"{data}>\n'
+            f'                {open_tag}\n'
             f'                  <span class="row-index">{idx}</span>\n'
             f'                  <div class="row-content">\n'
             f'                    <div class="track-title">{t}</div>\n'
             f'                    <div class="track-artist">{a}</div>\n'
             f'                  </div>\n'
             f'                  <span class="row-meta"><span class="play-count">{p} {play_word}</span></span>\n'
-            f'                </div>'
+            f'                {close_tag}'
         )
     return "\n".join(lines)
 
@@ -974,12 +1670,18 @@ def build_music_html(tracks: list[dict]) -> str:
 #  Meta & analytics (from TOML config)
 # ══════════════════════════════════════════════════════════════════
 
-def build_meta_html(config: dict) -> str:
-    """Generate meta tags block from TOML config."""
+def build_meta_html(config: dict, assets: dict = None, feeds: list[str] = ()) -> str:
+    """Generate meta tags block from TOML config.
+
+    assets maps source filenames to their hashed URLs (see build_asset_manifest);
+    files missing from it fall back to their fixed root URL. feeds are the
+    DATA_SECTIONS slugs that have a JSON Feed on disk (see written_feeds) —
+    each gets an alternate link.
+    """
     site = config["site"]
     social = config["social"]
     url = site["url"]
-    og_image = f"{url}/og-image.png"
+    og_image = f"{url}{_asset_url(assets, OG_IMAGE_PATH)}"
     lines = [
         f'  <title>{html.escape(site["title"])}</title>',
         f'  <meta name="description" content="{html.escape(site["description"])}">',
@@ -990,6 +1692,8 @@ def build_meta_html(config: dict) -> str:
         f'  <meta property="og:type" content="{html.escape(social["og_type"])}">',
         f'  <meta property="og:url" content="{html.escape(url)}/">',
     ]
+    lines += [f'  <link rel="alternate" type="application/feed+json" title="{html.escape(heading)}"'
+              f' href="/{DATA_DIR}/{slug}.json">' for slug, (_, heading) in DATA_SECTIONS.items() if slug in feeds]
     return "\n".join(lines)
 
 
@@ -999,6 +1703,429 @@ def build_analytics_html(config: dict) -> str:
     return f'  <script data-goatcounter="https://{gc}.goatcounter.com/count" async src="//gc.zgo.at/count.js"></script>'
 
 
+# ══════════════════════════════════════════════════════════════════
+#  Output files (atomic, write-avoiding) & deploy manifest
+# ══════════════════════════════════════════════════════════════════
+
+def write_if_changed(path: str, data) -> bool:
+    """Write data (str or bytes) to path unless it already holds exactly those bytes; return whether it wrote.
+
+    Writes go to a temp file that is renamed over path, so readers (and a
+    build killed mid-write) never see a partial file. Unchanged files keep
+    their mtime.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"  # several sites' builds may share an output
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def _read_manifest(path: str) -> dict | None:
+    """Return the JSON manifest at path, or None if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def build_output_manifest(manifest_path: str, files: list[str], dirs: list[str], deployed_path: str = "") -> list[str]:
+    """Hash every deployed file into manifest_path and return what differs from the live site.
+
+    The live site is deployed_path — the manifest as of the last successful
+    deploy — when it exists, else the last build's manifest (local builds,
+    or before the first deploy has recorded one). Comparing against what was
+    deployed, not what was built, means a build whose deploy failed is
+    deployed again next time. Changes are "A path" (added), "M path"
+    (modified) or "D path" (deleted), sorted by path. A file whose size and
+    mtime match its last-build entry keeps the recorded hash without being
+    read again.
+    """
+    old = _read_manifest(manifest_path) or {}
+    paths = [p for p in files if os.path.isfile(p)]
+    for d in dirs:
+        for root, _, names in os.walk(d):
+            paths += [os.path.join(root, n) for n in names if not n.endswith(".tmp")]
+
+    new = {}
+    for path in paths:
+        key = path.replace(os.sep, "/")
+        st = os.stat(path)
+        entry = old.get(key)
+        if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            with open(path, "rb") as f:
+                entry = {"sha256": hashlib.sha256(f.read()).hexdigest(), "size": st.st_size,
+                         "mtime_ns": st.st_mtime_ns}
+        new[key] = entry
+
+    live = _read_manifest(deployed_path) if deployed_path else None
+    if live is None:
+        live = old
+    changes = [("A" if key not in live else "M", key) for key, entry in new.items()
+               if key not in live or live[key]["sha256"] != entry["sha256"]]
+    changes += [("D", key) for key in live if key not in new]
+    write_if_changed(manifest_path, json.dumps(new, indent=1, sort_keys=True))
+    return [f"{status} {key}" for status, key in sorted(changes, key=lambda c: c[1])]
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Static assets & cache headers
+# ══════════════════════════════════════════════════════════════════
+
+def _short_hash(data: bytes) -> str:
+    """Return a 10-char content hash for cache-busting filenames."""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _asset_url(assets: dict, path: str) -> str:
+    """Return the public URL for an asset — hashed if in the manifest, else /path."""
+    return (assets or {}).get(path, f"/{path}")
+
+
+def build_asset_manifest(paths: list[str], out_dir: str) -> dict:
+    """Copy each asset to out_dir/<stem>.<hash><ext> and return {path: url}.
+
+    Copies are only written when missing, so unchanged assets cost a hash and
+    a stat. Older hashed copies of the same assets are removed from out_dir.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    keep = set()
+    for path in paths:
+        if not os.path.exists(_input_path(path)):
+            continue
+        with open(_input_path(path), "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(os.path.basename(path))
+        hashed_name = f"{stem}.{_short_hash(data)}{ext}"
+        hashed_path = os.path.join(out_dir, hashed_name)
+        if not os.path.exists(hashed_path):
+            write_if_changed(hashed_path, data)
+        keep.add(hashed_name)
+        manifest[path] = f"/{out_dir}/{hashed_name}"
+    stale = re.compile(r"^(?:%s)\.[0-9a-f]{10}\.\w+$" % "|".join(
+        re.escape(os.path.splitext(os.path.basename(p))[0]) for p in paths
+    ))
+    for name in os.listdir(out_dir):
+        if name not in keep and stale.match(name):
+            os.remove(os.path.join(out_dir, name))
+    return manifest
+
+
+def build_icons_html(assets: dict) -> str:
+    """Generate favicon link tags pointing at the hashed favicon files."""
+    return "\n".join([
+        f'  <link rel="icon" type="image/png" href="{html.escape(_asset_url(assets, FAVICON_PNG_PATH))}" sizes="48x48">',
+        f'  <link rel="apple-touch-icon" href="{html.escape(_asset_url(assets, FAVICON_192_PATH))}">',
+    ])
+
+
+def build_headers(hashed_dir: str) -> str:
+    """Generate a Cloudflare Pages _headers file.
+
+    Hashed assets never change under the same URL, so they are cached for a
+    year and marked immutable. HTML and fixed-name files get short TTLs, and
+    sw.js is always revalidated so a new build is picked up immediately.
+    """
+    rules = [
+        (f"/{hashed_dir}/*", f"public, max-age={HASHED_MAX_AGE}, immutable"),
+        ("/", f"public, max-age={HTML_MAX_AGE}, must-revalidate"),
+        ("/index.html", f"public, max-age={HTML_MAX_AGE}, must-revalidate"),
+        (f"/{SW_PATH}", "no-cache"),
+        (f"/{ARCHIVE_DIR}/*", f"public, max-age={HTML_MAX_AGE}, must-revalidate"),
+        (f"/{DATA_DIR}/*", f"public, max-age={HTML_MAX_AGE}, must-revalidate"),
+        (f"/{SITEMAP_PATH}", f"public, max-age={FIXED_ASSET_MAX_AGE}"),
+        (f"/{SITEMAP_MAIN_PATH}", f"public, max-age={FIXED_ASSET_MAX_AGE}"),
+        (f"/{SITEMAP_ARCHIVE_PATH}", f"public, max-age={FIXED_ASSET_MAX_AGE}"),
+        (f"/{FAVICON_ICO_PATH}", f"public, max-age={FIXED_ASSET_MAX_AGE}"),
+        ("/robots.txt", f"public, max-age={FIXED_ASSET_MAX_AGE}"),
+    ]
+    blocks = [f"{path}\n  Cache-Control: {value}" for path, value in rules]
+    return "\n\n".join(blocks) + "\n"
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Self-hosted web fonts (subset from assets/)
+# ══════════════════════════════════════════════════════════════════
+
+# Fallback when fontTools is unavailable — the original Google Fonts block.
+GOOGLE_FONTS_HTML = (
+    '  <link rel="preconnect" href="https://fonts.googleapis.com">\n'
+    '  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n'
+    '  <link href="https://fonts.googleapis.com/css2?family=JetBrains+Mono:ital,wght@0,400;0,700;1,400&display=swap" rel="stylesheet">'
+)
+# Self-hosted Regular/Bold without assets/JetBrainsMono-Italic.ttf — real italics rather than synthesised ones.
+GOOGLE_FONTS_ITALIC_HTML = (
+    '  <link href="https://fonts.googleapis.com/css2?family=JetBrains+Mono:ital,wght@1,400&display=swap" rel="stylesheet">'
+)
+
+_JS_ESCAPE_RE = re.compile(r"\\(?:x([0-9a-fA-F]{2})|u([0-9a-fA-F]{4}))")
+
+
+def collect_glyphs(html_src: str) -> str:
+    """Return the sorted set of characters the page can render, as a string.
+
+    Covers text, attribute values (modal data-* payloads), CSS content, and
+    \\xNN / \\uNNNN escapes in inline scripts. Printable ASCII is always
+    included so runtime text (the now-playing strip) still renders in the
+    web font.
+    """
+    text = html.unescape(html_src)
+    chars = set(text)
+    for m in _JS_ESCAPE_RE.finditer(text):
+        chars.add(chr(int(m.group(1) or m.group(2), 16)))
+    chars.update(chr(c) for c in range(0x20, 0x7F))
+    return "".join(sorted(c for c in chars if c.isprintable()))
+
+
+def _prune_hashed(out_dir: str, stems: list[str], ext: str, keep: set[str]) -> None:
+    """Remove out_dir/<stem>.<hash><ext> files that are not in keep."""
+    pattern = re.compile(r"^(?:%s)\.[0-9a-f]{10}%s$" % (
+        "|".join(re.escape(s) for s in stems), re.escape(ext)))
+    for name in os.listdir(out_dir):
+        if name not in keep and pattern.match(name):
+            os.remove(os.path.join(out_dir, name))
+
+
+def subset_font(font_path: str, glyphs: str, cache_dir: str) -> bytes:
+    """Return a WOFF2 subset of font_path covering glyphs.
+
+    Results are cached in cache_dir keyed by the font bytes, glyph set, and
+    FONT_SUBSET_OPTIONS, so the subsetter only runs when one of them changes.
+    Entries for other glyph sets are kept — sites in a multi-site build share
+    cache_dir — and a hit refreshes the entry's mtime, so prune_http_cache()
+    with FONT_CACHE_TTL drops only subsets nobody has used lately.
+    """
+    with open(font_path, "rb") as f:
+        font_data = f.read()
+    settings = json.dumps(FONT_SUBSET_OPTIONS, sort_keys=True)
+    key = hashlib.sha256(font_data + glyphs.encode() + settings.encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{os.path.basename(font_path)}.{key}.woff2")
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        os.utime(cache_path)
+        REPORT.record_cache("fonts", hit=True)
+        return data
+    except FileNotFoundError:  # a miss, or pruned by another site's build since
+        REPORT.record_cache("fonts", hit=False)
+
+    import io
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    for name, value in FONT_SUBSET_OPTIONS.items():
+        setattr(options, name, value)
+    font = subset.load_font(font_path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=glyphs)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    subset.save_font(font, buf, options)
+    data = buf.getvalue()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{cache_path}.{os.getpid()}.tmp"  # several sites may write the same entry at once
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, cache_path)
+    return data
+
+
+def build_font_assets(html_src: str, out_dir: str) -> dict:
+    """Subset each JetBrains Mono face to the page's glyphs and write hashed WOFF2 files.
+
+    Returns {face: url}. Returns {} if fontTools/brotli are not installed
+    or a required font file is missing, in which case the caller keeps
+    Google Fonts; a missing FONT_OPTIONAL_FACES face is just left out.
+    """
+    try:
+        import brotli  # noqa: F401 — required by fontTools for WOFF2
+        from fontTools import subset  # noqa: F401
+    except ImportError:
+        print("  ⚠  fontTools/brotli not installed — keeping Google Fonts.")
+        return {}
+
+    glyphs = collect_glyphs(html_src)
+    os.makedirs(out_dir, exist_ok=True)
+    urls, keep = {}, set()
+    for face in FONT_FACES:
+        font_path = _input_path(os.path.join(ASSETS_DIR, f"JetBrainsMono-{face}.ttf"))
+        if not os.path.exists(font_path):
+            if face in FONT_OPTIONAL_FACES:
+                print(f"  ⚠  Font not found at {font_path} — loading the {face} face from Google Fonts.")
+                continue
+            print(f"  ⚠  Font not found at {font_path} — keeping Google Fonts.")
+            return {}
+        data = subset_font(font_path, glyphs, FONT_CACHE_DIR)
+        name = f"JetBrainsMono-{face}.{_short_hash(data)}.woff2"
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            write_if_changed(path, data)
+        keep.add(name)
+        urls[face] = f"/{out_dir}/{name}"
+        print(f"  {font_path} → {urls[face]} ({len(glyphs)} glyphs, {len(data) / 1024:.1f} KB)")
+    _prune_hashed(out_dir, [f"JetBrainsMono-{face}" for face in FONT_FACES], ".woff2", keep)
+    return urls
+
+
+def build_fonts_html(font_urls: dict) -> str:
+    """Generate a preload link and inline @font-face block for self-hosted fonts."""
+    if not font_urls:
+        return GOOGLE_FONTS_HTML
+    lines = []
+    preload = font_urls.get(FONT_PRELOAD_FACE)
+    if preload:
+        lines.append(f'  <link rel="preload" href="{html.escape(preload)}" as="font" type="font/woff2" crossorigin>')
+    lines.append("  <style>")
+    for face, (weight, style) in FONT_FACES.items():
+        if face in font_urls:
+            lines.append(
+                f'@font-face {{ font-family: "{FONT_FAMILY}"; font-style: {style}; font-weight: {weight};'
+                f' font-display: swap; src: url("{html.escape(font_urls[face])}") format("woff2"); }}'
+            )
+    lines.append("  </style>")
+    if "Italic" not in font_urls:
+        lines.append(GOOGLE_FONTS_ITALIC_HTML)
+    return "\n".join(lines)
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Service worker
+# ══════════════════════════════════════════════════════════════════
+
+_SW_TEMPLATE = """\
+// Generated by build.py — do not edit.
+const BUILD_ID = %(build_id)s;
+const PRECACHE = %(precache)s;
+const CACHE = "site-" + BUILD_ID;
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(caches.open(CACHE).then((c) => c.addAll(["/", ...PRECACHE])).then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(keys.filter((k) => k !== CACHE).map((k) => caches.delete(k))))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener("fetch", (event) => {
+  const req = event.request;
+  const url = new URL(req.url);
+  if (req.method !== "GET" || url.origin !== self.location.origin) return;
+
+  // Hashed assets never change — cache first.
+  if (url.pathname.startsWith("/%(hashed_dir)s/")) {
+    event.respondWith(caches.match(req).then((hit) => hit || fetch(req)));
+    return;
+  }
+
+  // The page — stale-while-revalidate.
+  if (url.pathname === "/" || url.pathname === "/index.html") {
+    event.respondWith(caches.open(CACHE).then((cache) =>
+      cache.match("/").then((hit) => {
+        const update = fetch(req).then((res) => {
+          if (res.ok) cache.put("/", res.clone());
+          return res;
+        });
+        if (hit) {
+          event.waitUntil(update.catch(() => {}));
+          return hit;
+        }
+        return update;
+      })
+    ));
+  }
+});
+"""
+
+
+def _build_id(html_src: str) -> str:
+    """Return the build timestamp from the updated block's data-built attribute."""
+    m = re.search(r'data-built="([^"]+)"', html_src)
+    return m.group(1) if m else ""
+
+
+def build_service_worker(build_id: str, precache: list[str]) -> str:
+    """Generate sw.js with a precache manifest keyed to build_id.
+
+    A new build id gives the worker a new cache name, so the previous
+    build's cache is dropped on activate.
+    """
+    return _SW_TEMPLATE % {
+        "build_id": json.dumps(build_id),
+        "precache": json.dumps(sorted(precache)),
+        "hashed_dir": HASHED_DIR,
+    }
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Resource hints (preconnect / dns-prefetch)
+# ══════════════════════════════════════════════════════════════════
+
+# Subresource attributes worth warming a connection for. src is fetched on
+# page load (avatar, analytics script), and so is data-goatcounter — count.js
+# sends its beacon there on every view. data-cover/data-poster URLs only load
+# when a modal opens.
+_HINT_ATTR_RE = re.compile(r'\b(src|data-cover|data-poster|data-goatcounter)="((?:https?:)?//[^"/?#\s]+)')
+_EAGER_HINT_ATTRS = frozenset({"src", "data-goatcounter"})
+
+
+def collect_hint_origins(html_src: str, site_url: str, fetch_urls: list[str] = ()) -> list[dict]:
+    """Return the third-party origins referenced by the rendered page, ranked.
+
+    Each entry is {origin, eager, crossorigin, count}. fetch_urls are origins
+    the page fetch()es on load (CORS, so hinted with crossorigin). Eager
+    origins rank ahead of modal-only ones; ties break on reference count.
+    """
+    own = urllib.parse.urlparse(site_url).netloc
+    origins: dict[str, dict] = {}
+
+    def _add(url: str, eager: bool, crossorigin: bool = False) -> None:
+        parsed = urllib.parse.urlparse(url if "://" in url else f"https:{url}")
+        if not parsed.netloc or parsed.netloc == own:
+            return
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        entry = origins.setdefault(origin, {"origin": origin, "eager": False, "crossorigin": False, "count": 0})
+        entry["eager"] |= eager
+        entry["crossorigin"] |= crossorigin
+        entry["count"] += 1
+
+    for m in _HINT_ATTR_RE.finditer(html_src):
+        _add(m.group(2), m.group(1) in _EAGER_HINT_ATTRS)
+    for url in fetch_urls:
+        if url:
+            _add(url, True, crossorigin=True)
+    return sorted(origins.values(), key=lambda o: (not o["eager"], -o["count"], o["origin"]))
+
+
+def build_hints_html(origins: list[dict], limit: int) -> str:
+    """Render ranked origins as preconnect (eager) or dns-prefetch (modal-only) links."""
+    lines = []
+    for o in origins[:limit]:
+        href = html.escape(o["origin"], quote=True)
+        if o["eager"]:
+            co = " crossorigin" if o["crossorigin"] else ""
+            lines.append(f'  <link rel="preconnect" href="{href}"{co}>')
+        else:
+            lines.append(f'  <link rel="dns-prefetch" href="{href}">')
+    return "\n".join(lines) if lines else "  <!-- no third-party origins -->"
+
+
 # ══════════════════════════════════════════════════════════════════
 #  HTML injection
 # ══════════════════════════════════════════════════════════════════
@@ -1018,55 +2145,1113 @@ def _content_changed(old_src: str, new_src: str) -> bool:
     return _strip_updated_block(old_src) != _strip_updated_block(new_src)
 
 
+@functools.lru_cache(maxsize=None)
 def _make_pattern(tag: str) -> re.Pattern:
+    """Return the compiled start/end marker pattern for tag (compiled on first use)."""
     return re.compile(
         rf"(<!-- {tag}:start -->)\n.*?\n(\s*<!-- {tag}:end -->)",
         re.DOTALL,
     )
 
-META_PATTERN = _make_pattern("meta")
-ANALYTICS_PATTERN = _make_pattern("analytics")
-JSONLD_PATTERN = _make_pattern("jsonld")
-GRAVATAR_LINKS_PATTERN = _make_pattern("gravatar-links")
-GRAVATAR_AVATAR_PATTERN = _make_pattern("gravatar-avatar")
-GRAVATAR_NAME_PATTERN = _make_pattern("gravatar-name")
-GRAVATAR_TAGLINE_PATTERN = _make_pattern("gravatar-tagline")
-GRAVATAR_BIO_PATTERN = _make_pattern("gravatar-bio")
-GOODREADS_PATTERN = _make_pattern("goodreads")
-GOODREADS_NOW_PATTERN = _make_pattern("goodreads-now")
-GOODREADS_READ_PATTERN = _make_pattern("goodreads-read")
-LETTERBOXD_PATTERN = _make_pattern("letterboxd")
-INSTAPAPER_PATTERN = _make_pattern("instapaper")
-MUSIC_PATTERN = _make_pattern("music")
-UPDATED_PATTERN = _make_pattern("updated")
-STYLE_PATTERN = _make_pattern("style")
-
 
 def inject(html_src: str, pattern: re.Pattern, new_content: str, label: str) -> str:
-    """Replace content between start/end markers."""
-    replacement = rf"\1\n{new_content}\n\2"
-    result, count = pattern.subn(replacement, html_src)
+    """Replace content between start/end markers.
+
+    new_content is inserted verbatim — backslashes in it (CSS escapes like
+    content: "\\2014") are not treated as group references.
+    """
+    with REPORT.span(f"inject:{label}"):
+        result, count = pattern.subn(lambda m: f"{m.group(1)}\n{new_content}\n{m.group(2)}", html_src)
     if count == 0:
         print(f"WARNING: Could not find <!-- {label}:start/end --> markers in index.html")
     return result
 
 
-def update_sitemap(path: str, last_mod: datetime) -> None:
-    """Write lastmod date into sitemap.xml."""
+def update_sitemap(path: str, last_mod: datetime, site_url: str) -> None:
+    """Write the home page sitemap with last_mod — the date the page content last changed."""
     lastmod_str = last_mod.strftime("%Y-%m-%d")
     content = (
         '<?xml version="1.0" encoding="UTF-8"?>\n'
         '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
         '  <url>\n'
-        f'    <loc>{SITE_URL}/</loc>\n'
+        f'    <loc>{site_url}/</loc>\n'
         f'    <lastmod>{lastmod_str}</lastmod>\n'
         '    <changefreq>daily</changefreq>\n'
         '  </url>\n'
         '</urlset>\n'
     )
+    if write_if_changed(path, content):
+        print(f"  Updated {path} with lastmod {lastmod_str}")
+
+
+def write_sitemap_index(path: str, site_url: str, sitemaps: list[tuple[str, str]]) -> None:
+    """Write a sitemap index listing (sitemap path, lastmod date) pairs."""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for loc, lastmod in sitemaps:
+        lines += ["  <sitemap>", f"    <loc>{site_url}/{loc}</loc>", f"    <lastmod>{lastmod}</lastmod>", "  </sitemap>"]
+    lines.append("</sitemapindex>")
+    write_if_changed(path, "\n".join(lines) + "\n")
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Archive pages (paginated history, per section)
+# ══════════════════════════════════════════════════════════════════
+
+# slug → (history source, row renderer, heading); archive pages have no modal script, so rows render as plain links
+ARCHIVE_SECTIONS = {
+    "books": ("goodreads-read", build_book_html, "Books read"),
+    "films": ("letterboxd", build_film_html, "Films watched"),
+    "reads": ("instapaper", build_article_html, "Reads I recommend"),
+    "music": ("lastfm", build_music_html, "Tracks I've had on repeat"),
+}
+
+_ARCHIVE_HEAD = """\
+<!DOCTYPE html>
+<html lang="%(lang)s">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>%(heading)s — archive</title>
+  <link rel="canonical" href="%(canonical)s">
+  <link rel="stylesheet" href="%(style_url)s">
+</head>
+<body>
+  <main id="main-content">
+    <section class="panel" aria-labelledby="archive-label">
+      <div class="panel-header">
+        <div class="panel-heading">
+          <h1 class="panel-label" id="archive-label">%(heading)s</h1>
+          <p class="section-source"><a href="/">nicsheehan.com</a></p>
+        </div>
+        <span class="panel-count">%(span)s</span>
+      </div>
+      <div class="panel-body">
+"""
+
+_ARCHIVE_FOOT = """\
+      </div>
+      <footer class="panel-footer">
+        <nav aria-label="Archive pages">%(nav)s</nav>
+      </footer>
+    </section>
+  </main>
+</body>
+</html>
+"""
+
+
+def _archive_url(slug: str, page: int, last: int) -> str:
+    """Page numbers count up from the oldest items, so only the newest page moves; it lives at /archive/<slug>/."""
+    return f"/{ARCHIVE_DIR}/{slug}/" if page == last else f"/{ARCHIVE_DIR}/{slug}/{page}/"
+
+
+def _write_stream(path: str, chunks, unless_hash: str = "") -> tuple[str, bool]:
+    """Write an iterable of str chunks to path without joining them; return (sha256, written).
+
+    The chunks are hashed first: if they hash to unless_hash and path
+    exists, nothing is written (path keeps its mtime). Otherwise they go to
+    a temp file that replaces path atomically.
+    """
+    chunks = [chunk.encode("utf-8") for chunk in chunks]
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    if digest.hexdigest() == unless_hash and os.path.exists(path):
+        return unless_hash, False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.writelines(chunks)
+    os.replace(tmp, path)
+    return digest.hexdigest(), True
+
+
+def _archive_page_stats(conn, source: str, page_size: int) -> list[tuple]:
+    """Return (page, item count, newest last_seen, first_seen, item_id) per page, oldest page first.
+
+    The last two are the page's first row, for keyset pagination. Answered
+    from the items_first_seen index alone — item data is not read.
+    """
+    rows = conn.execute(
+        "SELECT page, COUNT(*), MAX(last_seen),"
+        "       MIN(CASE WHEN pos = 0 THEN first_seen END), MIN(CASE WHEN pos = 0 THEN item_id END)"
+        " FROM (SELECT (rn - 1) / :size + 1 AS page, (rn - 1) % :size AS pos, first_seen, item_id, last_seen"
+        "       FROM (SELECT ROW_NUMBER() OVER (ORDER BY first_seen, item_id) AS rn, first_seen, item_id, last_seen"
+        "             FROM items WHERE source = :source))"
+        " GROUP BY page ORDER BY page",
+        {"size": page_size, "source": source},
+    )
+    return rows.fetchall()
+
+
+def render_archive_page(slug: str, items: list, page: int, last: int, first_number: int,
+                        style_url: str, site_url: str, lang: str = "en"):
+    """Yield the HTML for one archive page in chunks. items are newest first."""
+    source, render_rows, heading = ARCHIVE_SECTIONS[slug]
+    nav = []
+    if page < last:
+        nav.append(f'<a href="{_archive_url(slug, page + 1, last)}" rel="prev">← Newer</a>')
+    if page > 1:
+        nav.append(f'<a href="{_archive_url(slug, page - 1, last)}" rel="next">Older →</a>')
+    yield _ARCHIVE_HEAD % {
+        "lang": html.escape(lang),
+        "heading": html.escape(heading),
+        "canonical": html.escape(site_url + _archive_url(slug, page, last), quote=True),
+        "style_url": html.escape(style_url, quote=True),
+        "span": f"#{first_number}–{first_number + len(items) - 1}",
+    }
+    yield render_rows(items, links=True) + "\n"
+    yield _ARCHIVE_FOOT % {"nav": " ".join(nav)}
+
+
+def build_archive(conn, out_dir: str, manifest_path: str, site_url: str, style_url: str,
+                  lang: str = "en", page_size: int = ARCHIVE_PAGE_SIZE) -> list[tuple[str, str]]:
+    """Render paginated archive pages for every ARCHIVE_SECTIONS source in the history store.
+
+    Pages are keyed in manifest_path by a cheap fingerprint (item count,
+    newest last_seen, navigation, stylesheet, build.py itself); a page is
+    only re-rendered when that changes, and only rewritten when the
+    rendered HTML differs. Only one page of items is in memory at a time.
+    Pages that no longer exist are deleted. Returns [(url, lastmod)] for
+    the sitemap.
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    with open(_SCRIPT_PATH, "rb") as f:
+        code_hash = hashlib.sha256(f.read()).hexdigest()
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    pages, new_manifest, rendered, written = [], {}, 0, 0
+    for slug, (source, _, _) in ARCHIVE_SECTIONS.items():
+        stats = _archive_page_stats(conn, source, page_size)
+        last = len(stats)
+        for page, count, newest, first_seen, first_id in stats:
+            url = _archive_url(slug, page, last)
+            path = os.path.join(out_dir, slug, *([] if page == last else [str(page)]), "index.html")
+            key = hashlib.sha256(
+                f"{code_hash}|{style_url}|{site_url}|{lang}|{page_size}|{count}|{newest}|"
+                f"{page == last}|{page == last - 1}".encode()
+            ).hexdigest()
+            entry = manifest.get(url)
+            if entry and entry["key"] == key and os.path.exists(path):
+                new_manifest[url] = entry
+            else:
+                rows = conn.execute(
+                    "SELECT data FROM items WHERE source = ? AND (first_seen, item_id) >= (?, ?)"
+                    " ORDER BY first_seen, item_id LIMIT ?",
+                    (source, first_seen, first_id, page_size),
+                )
+                items = [RECORD_TYPES[source].from_dict(json.loads(data)) for (data,) in rows][::-1]
+                chunks = render_archive_page(slug, items, page, last, (page - 1) * page_size + 1,
+                                             style_url, site_url, lang)
+                digest, changed = _write_stream(path, chunks, unless_hash=entry["hash"] if entry else "")
+                rendered += 1
+                written += changed
+                lastmod = today if changed else entry["lastmod"]
+                new_manifest[url] = {"key": key, "hash": digest, "lastmod": lastmod}
+            pages.append((url, new_manifest[url]["lastmod"]))
+
+    removed = 0
+    for url in set(manifest) - set(new_manifest):
+        path = os.path.join(out_dir, *url.strip("/").split("/")[1:], "index.html")
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+
+    write_if_changed(manifest_path, json.dumps(new_manifest, sort_keys=True))
+    print(f"  Archive: {len(pages)} page(s) · {rendered} rendered · {written} written · {removed} removed")
+    return pages
+
+
+def write_archive_sitemap(path: str, site_url: str, pages: list[tuple[str, str]]) -> None:
+    """Stream a urlset with one <url> (and its own lastmod) per archive page."""
+    def chunks():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for url, lastmod in pages:
+            yield f"  <url>\n    <loc>{site_url}{url}</loc>\n    <lastmod>{lastmod}</lastmod>\n  </url>\n"
+        yield "</urlset>\n"
+    write_if_changed(path, "".join(chunks()))
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Search index (client-side, over the history store)
+# ══════════════════════════════════════════════════════════════════
+#
+#  Every archived item gets a doc id (oldest first, so ids never move) and
+#  its title, author, director and artist words go into an inverted index.
+#  The index is split into one shard per first character of the term; a
+#  shard holds its terms sorted and front-coded ([shared prefix length,
+#  suffix, delta-coded doc ids]) plus the result rows of the docs it
+#  references. The browser fetches the small shard map, then only the
+#  shards for the words typed. All files are content-hashed under
+#  static/search/, so a new item only changes the shards its words land in.
+
+_SEARCH_WORD_RE = re.compile(r"[^\W_]+")
+
+_SEARCH_JS = """\
+// Generated by build.py — do not edit.
+(function () {
+  var input = document.getElementById("site-search-q");
+  var list = document.getElementById("site-search-results");
+  if (!input || !list) return;
+  var LABELS = %(labels)s;
+  var MAX = %(max)d;
+  var shards = {};
+  var seq = 0;
+  var ready = getJSON(input.dataset.index);
+
+  function getJSON(url) {
+    return fetch(url).then(function (r) {
+      if (!r.ok) throw new Error(r.status);
+      return r.json();
+    });
+  }
+
+  // Must match search_tokens() in build.py.
+  function words(text) {
+    return text.normalize("NFKD").replace(/\\p{M}/gu, "").toLowerCase().match(/[\\p{L}\\p{N}]+/gu) || [];
+  }
+
+  function decode(shard) {
+    var prev = "";
+    var terms = shard.terms.map(function (t) {
+      var id = 0;
+      prev = prev.slice(0, t[0]) + t[1];
+      return [prev, t[2].map(function (gap) { return (id += gap); })];
+    });
+    return { terms: terms, docs: shard.docs };
+  }
+
+  function loadShard(map, word) {
+    var key = /[a-z0-9]/.test(word[0]) ? word[0] : "_";
+    if (!shards[key]) {
+      shards[key] = map.shards[key] ? getJSON(map.shards[key]).then(decode) : Promise.resolve({ terms: [], docs: {} });
+    }
+    return shards[key];
+  }
+
+  // Doc ids of every term starting with prefix (terms are sorted).
+  function lookup(shard, prefix) {
+    var lo = 0, hi = shard.terms.length, ids = new Set();
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (shard.terms[mid][0] < prefix) lo = mid + 1; else hi = mid;
+    }
+    for (var i = lo; i < shard.terms.length && shard.terms[i][0].startsWith(prefix); i++) {
+      shard.terms[i][1].forEach(function (id) { ids.add(id); });
+    }
+    return ids;
+  }
+
+  // Every word must match (as a prefix); newest items first.
+  function search(query) {
+    var ws = words(query);
+    return ready.then(function (map) {
+      return Promise.all(ws.map(function (w) {
+        return loadShard(map, w).then(function (shard) { return { shard: shard, ids: lookup(shard, w) }; });
+      }));
+    }).then(function (hits) {
+      var ids = Array.from(hits[0].ids).filter(function (id) {
+        return hits.every(function (h) { return h.ids.has(id); });
+      });
+      ids.sort(function (a, b) { return b - a; });
+      return ids.slice(0, MAX).map(function (id) { return hits[0].shard.docs[id]; });
+    });
+  }
+
+  function render(docs, query) {
+    list.textContent = "";
+    if (!docs.length) {
+      var none = document.createElement("li");
+      none.className = "site-search-empty";
+      none.textContent = "No matches for \u201c" + query.trim() + "\u201d";
+      list.appendChild(none);
+    }
+    docs.forEach(function (d) {
+      var li = document.createElement("li");
+      var section = document.createElement("span");
+      section.className = "site-search-section";
+      section.textContent = LABELS[d[0]] || d[0];
+      var title = document.createElement(d[3] && d[3] !== "#" ? "a" : "span");
+      title.className = "site-search-title";
+      title.textContent = d[1];
+      if (d[3] && d[3] !== "#") {
+        title.href = d[3];
+        title.target = "_blank";
+        title.rel = "noopener noreferrer";
+      }
+      li.append(section, " ", title);
+      if (d[2]) {
+        var byline = document.createElement("span");
+        byline.className = "site-search-byline";
+        byline.textContent = d[2];
+        li.append(" ", byline);
+      }
+      list.appendChild(li);
+    });
+  }
+
+  function run() {
+    var query = input.value, n = ++seq;
+    if (!words(query).length) {
+      list.textContent = "";
+      return;
+    }
+    search(query).then(function (docs) {
+      if (n === seq) render(docs, query);
+    }).catch(function () {
+      if (n === seq) list.textContent = "Search is unavailable right now.";
+    });
+  }
+
+  input.addEventListener("input", run);
+  run();
+})();
+"""
+
+
+def search_tokens(*texts: str) -> list[str]:
+    """Return the distinct lowercase, accent-folded words in texts (search.js folds queries the same way)."""
+    import unicodedata
+    words = []
+    for text in texts:
+        folded = "".join(c for c in unicodedata.normalize("NFKD", text or "") if not unicodedata.combining(c))
+        words.extend(_SEARCH_WORD_RE.findall(folded.lower()))
+    return list(dict.fromkeys(words))
+
+
+def _byline(item) -> str:
+    """The line shown under an item's title: author, year · director, artist, or the article's domain."""
+    if isinstance(item, Book):
+        return item.author
+    if isinstance(item, Film):
+        return " · ".join(filter(None, (item.year, item.director)))
+    if isinstance(item, Track):
+        return item.artist
+    return (urllib.parse.urlparse(item.url).hostname or "").removeprefix("www.")
+
+
+def _search_doc(slug: str, item) -> tuple[list, list[str]]:
+    """Return (result row [slug, title, byline, url], tokens) for one archived item."""
+    if isinstance(item, Book):
+        tokens = search_tokens(item.title, item.author)
+    elif isinstance(item, Film):
+        tokens = search_tokens(item.title, item.director)
+    elif isinstance(item, Track):
+        tokens = search_tokens(item.title, item.artist)
+    else:
+        tokens = search_tokens(item.title)
+    return [slug, item.title, _byline(item), item.url], tokens
+
+
+def _search_shard_key(term: str) -> str:
+    return term[0] if term[0] in "abcdefghijklmnopqrstuvwxyz0123456789" else "_"
+
+
+def encode_search_shard(terms: dict, docs: list) -> str:
+    """Serialise one shard: {term: ascending doc ids} front-coded, plus the rows of the docs it references.
+
+    Terms are sorted, and prefix lengths counted, in UTF-16 code units —
+    the way search.js compares and slices strings.
+    """
+    rows, prev, referenced = [], "", set()
+    for term in sorted(terms, key=lambda t: t.encode("utf-16-be")):
+        common = os.path.commonprefix([prev, term])
+        ids = terms[term]
+        rows.append([len(common.encode("utf-16-le")) // 2, term[len(common):],
+                     [b - a for a, b in zip([0] + ids, ids)]])
+        referenced.update(ids)
+        prev = term
+    return json.dumps({"v": SEARCH_VERSION, "terms": rows, "docs": {str(i): docs[i] for i in sorted(referenced)}},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def build_search_index(conn, out_dir: str, cache_path: str) -> dict:
+    """Write the sharded search index for every ARCHIVE_SECTIONS item in the history store.
+
+    Items whose stored data is unchanged reuse their tokens from
+    cache_path instead of being re-tokenized. Shards, the shard map and
+    search.js are content-hashed and only written when missing; stale
+    files in out_dir are removed. Returns {"index": url, "script": url}.
+    """
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        cache = {}
+    cached = cache.get("items", {}) if cache.get("version") == SEARCH_VERSION else {}
+    slugs = {source: slug for slug, (source, _, _) in ARCHIVE_SECTIONS.items()}
+
+    items, docs, shards, tokenized = {}, [], {}, 0
+    rows = conn.execute(
+        "SELECT source, item_id, data FROM items WHERE source IN (%s) ORDER BY first_seen, source, item_id"
+        % ",".join("?" * len(slugs)), list(slugs),
+    )
+    for source, item_id, data in rows:
+        key = f"{source}|{item_id}"
+        digest = _short_hash(data.encode("utf-8"))
+        entry = cached.get(key)
+        if not entry or entry[0] != digest:
+            doc, tokens = _search_doc(slugs[source], RECORD_TYPES[source].from_dict(json.loads(data)))
+            entry = [digest, doc, tokens]
+            tokenized += 1
+        items[key] = entry
+        doc_id = len(docs)
+        docs.append(entry[1])
+        for token in entry[2]:
+            shards.setdefault(_search_shard_key(token), {}).setdefault(token, []).append(doc_id)
+
+    os.makedirs(out_dir, exist_ok=True)
+    keep, written = set(), 0
+
+    def put(stem: str, ext: str, text: str) -> str:
+        nonlocal written
+        data = text.encode("utf-8")
+        name = f"{stem}.{_short_hash(data)}{ext}"
+        if not os.path.exists(os.path.join(out_dir, name)):
+            written += write_if_changed(os.path.join(out_dir, name), data)
+        keep.add(name)
+        return f"/{out_dir.replace(os.sep, '/')}/{name}"
+
+    shard_urls = {key: put(key, ".json", encode_search_shard(terms, docs)) for key, terms in sorted(shards.items())}
+    urls = {
+        "index": put("index", ".json", json.dumps({"v": SEARCH_VERSION, "docs": len(docs), "shards": shard_urls},
+                                                  separators=(",", ":"))),
+        "script": put("search", ".js", _SEARCH_JS % {
+            "labels": json.dumps({slug: heading for slug, (_, _, heading) in ARCHIVE_SECTIONS.items()}),
+            "max": SEARCH_MAX_RESULTS,
+        }),
+    }
+    for name in os.listdir(out_dir):
+        if name not in keep:
+            os.remove(os.path.join(out_dir, name))
+
+    write_if_changed(cache_path, json.dumps({"version": SEARCH_VERSION, "items": items}, ensure_ascii=False))
+    print(f"  Search: {len(docs)} item(s) · {tokenized} tokenized · {len(shard_urls)} shard(s) · {written} written")
+    return urls
+
+
+def build_search_html(urls: dict) -> str:
+    """Generate the search form; search.js is only fetched when the box is first focused."""
+    return (
+        '            <form class="site-search" role="search" onsubmit="return false">\n'
+        '              <label class="site-search-label" for="site-search-q">Search the archive</label>\n'
+        '              <input class="site-search-input" id="site-search-q" type="search" autocomplete="off"'
+        ' spellcheck="false" placeholder="title, author, director or artist"'
+        f' data-index="{html.escape(urls["index"], quote=True)}">\n'
+        '              <ol class="site-search-results" id="site-search-results" aria-live="polite"></ol>\n'
+        '            </form>\n'
+        "            <script>document.getElementById('site-search-q').addEventListener('focus',function(){"
+        "var s=document.createElement('script');"
+        f"s.src={json.dumps(urls['script'])};"
+        "document.head.appendChild(s);},{once:true});</script>"
+    )
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Data feeds (data.json + a JSON Feed per section)
+# ══════════════════════════════════════════════════════════════════
+
+# section → (snapshot source, heading); a section's items are exactly what its panel shows
+DATA_SECTIONS = {
+    "reading": ("goodreads-now", "Currently reading"),
+    "books": ("goodreads-read", "Books read"),
+    "films": ("letterboxd", "Films watched"),
+    "reads": ("instapaper", "Reads I recommend"),
+    "music": ("lastfm", "Tracks I've had on repeat"),
+}
+
+
+def _data_sections(snapshot: dict, config: dict) -> dict:
+    """Return {section: records} for the sections the snapshot has data for, trimmed to what the page shows."""
+    sections = {}
+    for slug, (source, _) in DATA_SECTIONS.items():
+        if source in snapshot:
+            items = snapshot[source]
+            sections[slug] = items[:config["sources"]["instapaper"]["limit"]] if source == "instapaper" else items
+    return sections
+
+
+def build_data_json(sections: dict) -> dict:
+    """Return data.json: every section's records, each with a stable id (the history store's item id)."""
+    return {
+        "version": DATA_VERSION,
+        "sections": {slug: [{"id": _history_id(item.to_dict()), **item.to_dict()} for item in items]
+                     for slug, items in sections.items()},
+    }
+
+
+def _feed_item(item) -> dict:
+    """Map one record onto a JSON Feed item; the full record rides along as the _record extension."""
+    data = item.to_dict()
+    body = {Book: "description", Film: "synopsis", Article: "description", Track: "bio"}[type(item)]
+    entry = {"id": _history_id(data), "title": item.title}
+    if item.url and item.url != "#":
+        entry["url"] = item.url
+    if _byline(item):
+        entry["summary"] = _byline(item)
+    entry["content_text"] = data[body] or _byline(item) or item.title
+    image = getattr(item, "large_cover", "") or getattr(item, "cover", "") or getattr(item, "poster", "")
+    if image:
+        entry["image"] = image
+    entry["_record"] = data
+    return entry
+
+
+def build_json_feed(slug: str, items: list, config: dict) -> dict:
+    """Return a JSON Feed 1.1 document for one section."""
+    site = config["site"]
+    return {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": f"{site['title']} — {DATA_SECTIONS[slug][1]}",
+        "home_page_url": f"{site['url']}/",
+        "feed_url": f"{site['url']}/{DATA_DIR}/{slug}.json",
+        "language": site.get("lang", "en"),
+        "items": [_feed_item(item) for item in items],
+    }
+
+
+def write_data_feeds(snapshot: dict, config: dict, out_dir: str) -> list[str]:
+    """Write data.json and one JSON Feed per section, each with .gz (and .br, if brotli is installed) copies.
+
+    out_dir/manifest.json maps each file to its sha256 and size, so a
+    consumer can poll the manifest and fetch only what changed. Files whose
+    content is unchanged are not rewritten. Returns the paths written.
+    """
+    import gzip
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            old = json.load(f)["files"]
+    except (FileNotFoundError, ValueError, KeyError):
+        old = {}
+
+    sections = _data_sections(snapshot, config)
+    docs = {"data.json": build_data_json(sections)}
+    docs.update({f"{slug}.json": build_json_feed(slug, items, config) for slug, items in sections.items()})
+
+    files, written = {}, []
+    for name, doc in docs.items():
+        path = os.path.join(out_dir, name)
+        text = json.dumps(doc, ensure_ascii=False, separators=(",", ":")) + "\n"
+        previous = old.get(name, {}).get("sha256", "")
+        digest, changed = _write_stream(path, [text], unless_hash=previous)
+        data = text.encode("utf-8")
+        variants = [(".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", lambda: brotli.compress(data, quality=BROTLI_QUALITY)))
+        for ext, compress in variants:
+            if (changed or not os.path.exists(path + ext)) and write_if_changed(path + ext, compress()):
+                written.append(path + ext)
+        if changed:
+            written.append(path)
+        files[name] = {"sha256": digest, "bytes": len(data)}
+    for name in set(old) - set(files):  # a section that no longer has data
+        for ext in ("", ".gz", ".br"):
+            if os.path.exists(os.path.join(out_dir, name + ext)):
+                os.remove(os.path.join(out_dir, name + ext))
+
+    manifest = json.dumps({"version": DATA_VERSION, "files": files}, indent=1, sort_keys=True) + "\n"
+    if write_if_changed(manifest_path, manifest):
+        written.append(manifest_path)
+    return written
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Page weight & budgets
+# ══════════════════════════════════════════════════════════════════
+
+_MARKER_REGION_RE = re.compile(r"<!-- ([a-z0-9-]+):start -->\n(.*?)\n\s*<!-- \1:end -->", re.DOTALL)
+_INLINE_STYLE_RE = re.compile(r"<style>(.*?)</style>", re.DOTALL)
+_INLINE_SCRIPT_RE = re.compile(r"<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>", re.DOTALL)
+
+
+def written_feeds(out_dir: str = DATA_DIR) -> list[str]:
+    """Return the DATA_SECTIONS slugs whose JSON Feed exists in out_dir, in section order."""
+    return [slug for slug in DATA_SECTIONS if os.path.exists(os.path.join(out_dir, f"{slug}.json"))]
+
+
+def _sizes(text: str, with_brotli: bool = True) -> dict:
+    """Return raw, gzip, and Brotli byte counts for text (brotli is None when skipped or without the module)."""
+    import gzip
+    data = text.encode("utf-8")
+    br = None
+    if with_brotli:
+        try:
+            import brotli
+            br = len(brotli.compress(data, quality=BROTLI_QUALITY))
+        except ImportError:
+            pass
+    return {"raw": len(data), "gzip": len(gzip.compress(data, compresslevel=9, mtime=0)), "brotli": br}
+
+
+def measure_page_weight(html_src: str, budgets: dict = None) -> dict:
+    """Measure the document, each marker region, and inline CSS/JS.
+
+    Returns {name: {raw, gzip, brotli}} with names "document", "inline-css",
+    "inline-js", and one entry per <!-- tag:start/end --> marker. Every entry
+    gets raw and gzip (the weight history records gzip per region); Brotli,
+    the slow one, is measured only for the document and for names with a
+    [budgets.brotli] entry.
+    """
+    brotli_names = {"document", *(budgets or {}).get("brotli", {})}
+    parts = {
+        "document": html_src,
+        "inline-css": "".join(_INLINE_STYLE_RE.findall(html_src)),
+        "inline-js": "".join(_INLINE_SCRIPT_RE.findall(html_src)),
+    }
+    parts.update((m.group(1), m.group(2)) for m in _MARKER_REGION_RE.finditer(html_src))
+    return {name: _sizes(text, name in brotli_names) for name, text in parts.items()}
+
+
+def check_budgets(weights: dict, budgets: dict) -> list[str]:
+    """Return a message for every measured size over its budget.
+
+    budgets mirrors [budgets] in site.toml: {metric: {name: max_bytes}},
+    where metric is raw, gzip, or brotli.
+    """
+    over = []
+    for metric in ("raw", "gzip", "brotli"):
+        for name, limit in budgets.get(metric, {}).items():
+            size = weights.get(name, {}).get(metric)
+            if size is not None and size > limit:
+                over.append(f"{name} {metric} {size:,} B > budget {limit:,} B (+{size - limit:,})")
+    return over
+
+
+def append_weight_history(path: str, build_id: str, weights: dict, max_lines: int) -> None:
+    """Append one JSON line of gzip sizes per region, keeping the last max_lines."""
+    entry = {"built": build_id, "document": weights["document"],
+             "gzip": {k: v["gzip"] for k, v in weights.items() if k != "document"}}
+    lines = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+    lines = (lines + [json.dumps(entry, sort_keys=True)])[-max_lines:]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
-        f.write(content)
-    print(f"  Updated {path} with lastmod {lastmod_str}")
+        f.write("\n".join(lines) + "\n")
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Output check (build.py check — fast, in-process)
+# ══════════════════════════════════════════════════════════════════
+#
+#  A single html.parser pass over each rendered page, catching renderer
+#  mistakes in milliseconds at build time instead of minutes later in the
+#  deploy job's html5validator. Every element must be closed explicitly
+#  (except void elements), which the template and build_*_html already do.
+
+_VOID_ELEMENTS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                            "source", "track", "wbr"})
+_MARKER_COMMENT_RE = re.compile(r" ([a-z0-9-]+):(start|end) ")
+
+
+def _html_checker(label: str):
+    """Return an html.parser.HTMLParser that collects problems in label's markup."""
+    from html.parser import HTMLParser
+
+    class Checker(HTMLParser):
+        def __init__(self):
+            super().__init__(convert_charrefs=True)
+            self.problems = []
+            self.open = []       # [(tag, line)] — elements not yet closed
+            self.markers = []    # [(name, line, len(self.open) at :start)]
+            self.ids = {}        # id → line first seen
+            self.labelledby = []  # [(id, line)] — checked against self.ids once the page is parsed
+            self.jsonld = None   # text of the ld+json script being read, else None
+
+        def problem(self, msg):
+            self.problems.append(f"{label}:{self.getpos()[0]}: {msg}")
+
+        def handle_starttag(self, tag, attrs):
+            attrs = dict(attrs)
+            line = self.getpos()[0]
+            if tag not in _VOID_ELEMENTS:
+                self.open.append((tag, line))
+            if attrs.get("id") is not None:
+                if attrs["id"] in self.ids:
+                    self.problem(f"duplicate id \"{attrs['id']}\" (first on line {self.ids[attrs['id']]})")
+                else:
+                    self.ids[attrs["id"]] = line
+            for ref in (attrs.get("aria-labelledby") or "").split():
+                self.labelledby.append((ref, line))
+            if tag == "img" and attrs.get("alt") is None:
+                self.problem(f"<img> without alt ({attrs.get('src') or 'no src'})")
+            if tag == "nav" and not (attrs.get("aria-label") or attrs.get("aria-labelledby")):
+                self.problem("<nav> without aria-label")
+            if attrs.get("target") == "_blank" and "noopener" not in (attrs.get("rel") or "").split():
+                self.problem(f"target=_blank without rel=noopener ({attrs.get('href') or 'no href'})")
+            for name, value in attrs.items():
+                if name.startswith("data-") and value and len(value.encode("utf-8")) > CHECK_DATA_ATTR_MAX:
+                    self.problem(f"{name} is {len(value.encode('utf-8')):,} B (> {CHECK_DATA_ATTR_MAX:,} B)")
+            if tag == "script" and attrs.get("type") == "application/ld+json":
+                self.jsonld = ""
+
+        def handle_endtag(self, tag):
+            if tag in _VOID_ELEMENTS:
+                return
+            if tag == "script" and self.jsonld is not None:
+                try:
+                    data = json.loads(self.jsonld)
+                    if not isinstance(data, dict) or "@context" not in data:
+                        self.problem("JSON-LD has no @context")
+                except ValueError as e:
+                    self.problem(f"invalid JSON-LD: {e}")
+                self.jsonld = None
+            if not any(t == tag for t, _ in self.open):
+                self.problem(f"stray </{tag}>")
+                return
+            while self.open:
+                open_tag, line = self.open.pop()
+                if open_tag == tag:
+                    break
+                self.problem(f"<{open_tag}> from line {line} not closed before </{tag}>")
+
+        def handle_data(self, data):
+            if self.jsonld is not None:
+                self.jsonld += data
+
+        def handle_comment(self, data):
+            m = _MARKER_COMMENT_RE.fullmatch(data)
+            if not m:
+                return
+            name, edge = m.groups()
+            if edge == "start":
+                self.markers.append((name, self.getpos()[0], len(self.open)))
+            elif not self.markers or self.markers[-1][0] != name:
+                self.problem(f"<!-- {name}:end --> without a matching start"
+                             + (f" (inside {self.markers[-1][0]}, line {self.markers[-1][1]})" if self.markers else ""))
+            else:
+                _, line, depth = self.markers.pop()
+                if len(self.open) != depth:
+                    self.problem(f"{name} region (from line {line}) leaves "
+                                 + (", ".join(f"<{t}>" for t, _ in self.open[depth:]) + " open"
+                                    if len(self.open) > depth else "elements outside it closed"))
+
+        def close(self):
+            super().close()
+            for name, line, _ in self.markers:
+                self.problems.append(f"{label}:{line}: <!-- {name}:start --> never ended")
+            for tag, line in self.open:
+                self.problems.append(f"{label}:{line}: <{tag}> never closed")
+            for ref, line in self.labelledby:
+                if ref not in self.ids:
+                    self.problems.append(f"{label}:{line}: aria-labelledby=\"{ref}\" matches no id")
+
+    return Checker()
+
+
+def check_html(src: str, label: str = INDEX_PATH) -> list[str]:
+    """Return a "label:line: problem" message for everything wrong in one page.
+
+    Checks marker balance, that each marker region closes exactly what it
+    opens, unique ids, alt / aria-label / rel=noopener where required,
+    JSON-LD parsing, and data-* sizes against CHECK_DATA_ATTR_MAX.
+    """
+    checker = _html_checker(label)
+    checker.feed(src)
+    checker.close()
+    return checker.problems
+
+
+def check_outputs(index_src: str | None = None) -> tuple[list[str], int]:
+    """Check index.html (index_src if given, else the file) and every archive page.
+
+    Returns (problems, pages checked).
+    """
+    import glob
+    if index_src is None:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            index_src = f.read()
+    problems = check_html(index_src, INDEX_PATH)
+    pages = sorted(glob.glob(os.path.join(ARCHIVE_DIR, "**", "index.html"), recursive=True))
+    for path in pages:
+        with open(path, "r", encoding="utf-8") as f:
+            problems += check_html(f.read(), path)
+    return problems, 1 + len(pages)
+
+
+def print_check(problems: list[str], pages: int, ms: float) -> None:
+    """Print check_outputs() results: one ✓ line, or a ⚠ line per problem."""
+    if not problems:
+        print(f"Check: {pages} page(s) OK ✓ ({ms:.0f} ms)")
+        return
+    print(f"Check: {len(problems)} problem(s) in {pages} page(s) ({ms:.0f} ms)")
+    for msg in problems:
+        print(f"  ⚠  {msg}")
+
+
+# ══════════════════════════════════════════════════════════════════
+#  History store (every fetched item, across builds)
+# ══════════════════════════════════════════════════════════════════
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    source     TEXT NOT NULL,
+    item_id    TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL,
+    PRIMARY KEY (source, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_first_seen ON items (source, first_seen, item_id, last_seen);
+CREATE INDEX IF NOT EXISTS items_last_seen ON items (source, last_seen);
+CREATE TABLE IF NOT EXISTS feeds (
+    feed    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    seen    TEXT NOT NULL,
+    items   TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+"""
+
+
+def open_history(path: str):
+    """Open (creating if needed) the SQLite history store in WAL mode."""
+    import sqlite3
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe; a lost tail is refetched next build
+    conn.executescript(_HISTORY_SCHEMA)
+    return conn
+
+
+def _history_id(item: dict) -> str:
+    """Stable id for an item: its URL, or title plus author/artist/year when it has none."""
+    url = item.get("url", "")
+    if url and url != "#":
+        return url
+    return "|".join(str(item.get(k, "")) for k in ("title", "author", "artist", "year"))
+
+
+def record_history(conn, source: str, items: list, seen_at: str) -> int:
+    """Upsert records under source in one transaction; return how many were new.
+
+    New items get first_seen = last_seen = seen_at; known items keep their
+    first_seen and have data and last_seen refreshed.
+    """
+    rows = []
+    for item in items:
+        data = item.to_dict()
+        rows.append((source, _history_id(data), json.dumps(data, sort_keys=True, ensure_ascii=False), seen_at, seen_at))
+    with conn:
+        before = conn.execute("SELECT COUNT(*) FROM items WHERE source = ?", (source,)).fetchone()[0]
+        conn.executemany(
+            "INSERT INTO items (source, item_id, data, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, item_id) DO UPDATE SET data = excluded.data, last_seen = excluded.last_seen",
+            rows,
+        )
+        after = conn.execute("SELECT COUNT(*) FROM items WHERE source = ?", (source,)).fetchone()[0]
+    return after - before
+
+
+def forget_history(conn, source: str, items: list, keep: list = ()) -> int:
+    """Delete records under source (e.g. unstarred bookmarks); return how many went.
+
+    Items sharing an id with something in keep stay, so a URL starred twice
+    survives one of its bookmarks being removed.
+    """
+    kept = {_history_id(item.to_dict()) for item in keep}
+    ids = {_history_id(item.to_dict()) for item in items} - kept
+    with conn:
+        cur = conn.executemany("DELETE FROM items WHERE source = ? AND item_id = ?", [(source, i) for i in sorted(ids)])
+    return cur.rowcount
+
+
+def query_history(conn, source: str, since: str = "") -> list[dict]:
+    """Return items first seen under source on or after since (ISO date), newest first.
+
+    e.g. query_history(conn, "letterboxd", "2026-01-01") → films logged this year.
+    """
+    rows = conn.execute(
+        "SELECT data, first_seen, last_seen FROM items WHERE source = ? AND first_seen >= ? "
+        "ORDER BY first_seen DESC",
+        (source, since),
+    )
+    return [{**json.loads(data), "first_seen": first, "last_seen": last} for data, first, last in rows]
+
+
+def load_feed_state(conn, feed: str, limit: int, record: type) -> dict:
+    """Return the high-water mark for an append-only RSS feed: {seen, items}.
+
+    seen is the set of recently parsed GUIDs (pass it to the fetcher as
+    stop_at); items is the rendered list from the last build, already
+    enriched, as record instances. Returns an empty state — meaning parse everything — when conn
+    is None, the feed is unknown, FEED_STATE_VERSION changed, or fewer than
+    limit items were stored (e.g. the limit was raised).
+    """
+    empty = {"seen": frozenset(), "items": []}
+    if conn is None:
+        return empty
+    row = conn.execute("SELECT version, seen, items FROM feeds WHERE feed = ?", (feed,)).fetchone()
+    if row is None or row[0] != FEED_STATE_VERSION:
+        return empty
+    items = [record.from_dict(item) for item in json.loads(row[2])]
+    if len(items) < limit:
+        return empty
+    return {"seen": frozenset(json.loads(row[1])), "items": items}
+
+
+def merge_feed_items(new_items: list, old_items: list, limit: int) -> list:
+    """Put newly parsed items ahead of the stored ones, dropping duplicates, up to limit."""
+    merged, guids = [], set()
+    for item in new_items + old_items:
+        if item.guid in guids:
+            continue
+        guids.add(item.guid)
+        merged.append(item)
+    return merged[:limit]
+
+
+def save_feed_state(conn, feed: str, items: list, seen: frozenset, updated: str) -> None:
+    """Store items plus the GUIDs seen so far (newest first, capped at FEED_SEEN_MAX)."""
+    if conn is None:
+        return
+    row = conn.execute("SELECT seen FROM feeds WHERE feed = ?", (feed,)).fetchone()
+    ordered = [item.guid for item in items if item.guid]
+    ordered += [g for g in (json.loads(row[0]) if row else []) if g in seen]
+    ordered = list(dict.fromkeys(ordered))[:FEED_SEEN_MAX]
+    with conn:
+        conn.execute(
+            "INSERT INTO feeds (feed, version, seen, items, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (feed) DO UPDATE SET version = excluded.version, seen = excluded.seen, "
+            "items = excluded.items, updated = excluded.updated",
+            (feed, FEED_STATE_VERSION, json.dumps(ordered), json.dumps(items, default=_record_json, ensure_ascii=False), updated),
+        )
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Preview server (build.py serve)
+# ══════════════════════════════════════════════════════════════════
+
+# Reconnects after a restart (build.py edited) reload too, so the page never goes stale.
+LIVE_RELOAD_SCRIPT = (
+    '<script>(function(){var es=new EventSource("/__reload"),lost=false;'
+    "es.onmessage=function(){location.reload();};es.onerror=function(){lost=true;};"
+    "es.onopen=function(){if(lost)location.reload();};})();</script>"
+)
+PREVIEW_POLL_INTERVAL = 0.1  # seconds between mtime checks of the watched files
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> dict:
+    """Return the last data each source fetched, or {} if there is none.
+
+    That is {source: records, "gravatar": Profile, "fetched_at": {source: ISO timestamp}}.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    snapshot = {source: [RECORD_TYPES[source].from_dict(item) for item in items]
+                for source, items in data.items() if source in RECORD_TYPES}
+    if data.get("gravatar"):
+        snapshot["gravatar"] = Profile.from_dict(data["gravatar"])
+    if data.get("fetched_at"):
+        snapshot["fetched_at"] = data["fetched_at"]
+    return snapshot
+
+
+def save_snapshot(path: str, data: dict, fetched_at: str = "") -> None:
+    """Merge data into the snapshot at path, stamping its sources with fetched_at.
+
+    Sources missing from data keep their last value and timestamp.
+    """
+    old = load_snapshot(path)
+    stamps = {**old.get("fetched_at", {}), **{source: fetched_at for source in data}}
+    write_if_changed(path, json.dumps({**old, **data, "fetched_at": stamps}, default=_record_json,
+                                      ensure_ascii=False))
+
+
+def render_preview(src: str, config: dict, snapshot: dict, css: str = None) -> str:
+    """Re-render index.html's content regions from a snapshot, without fetching anything.
+
+    Regions with no data in the snapshot, and the stages that depend on a
+    full build (hints, fonts, timestamp), keep what index.html already has.
+    css, when given, replaces the inline <style> block.
+    """
+    sources = config["sources"]
+    lang = config["site"].get("lang", "en")
+    src = re.sub(r'<html\b[^>]*>', f'<html lang="{html.escape(lang)}">', src, count=1)
+    regions = {"analytics": build_analytics_html(config), "meta": build_meta_html(config, feeds=written_feeds())}
+    if snapshot.get("gravatar"):
+        regions.update(build_gravatar_regions(snapshot["gravatar"], config["site"]["url"]))
+    if "goodreads-now" in snapshot:
+        regions["goodreads"] = build_book_html(snapshot["goodreads-now"])
+        regions["goodreads-now"] = build_now_reading_html(snapshot["goodreads-now"])
+    if "goodreads-read" in snapshot:
+        regions["goodreads-read"] = build_book_html(snapshot["goodreads-read"])
+    if "letterboxd" in snapshot:
+        regions["letterboxd"] = build_film_html(snapshot["letterboxd"])
+    if "instapaper" in snapshot:
+        regions["instapaper"] = build_article_html(snapshot["instapaper"][:sources["instapaper"]["limit"]])
+    if "lastfm" in snapshot:
+        regions["music"] = build_music_html(snapshot["lastfm"])
+    if css is not None:
+        regions["style"] = f"  <style>\n{css}  </style>"
+    for tag, region_html in regions.items():
+        src = inject(src, _make_pattern(tag), region_html, tag)
+    return src
+
+
+def _watched_mtimes() -> dict:
+    """Return {path: mtime} for every input build.py serve reacts to."""
+    paths = [INDEX_PATH, _input_path(STYLE_PATH), _CONFIG_PATH, _SCRIPT_PATH]
+    if os.path.isdir(ASSETS_DIR):
+        paths += [os.path.join(ASSETS_DIR, name) for name in sorted(os.listdir(ASSETS_DIR))]
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+    return mtimes
+
+
+# ══════════════════════════════════════════════════════════════════
+#  Freshness windows & last-known-good data
+# ══════════════════════════════════════════════════════════════════
+#
+#  The snapshot doubles as the last-known-good store: it holds each
+#  source's last successfully fetched records and when they were fetched.
+#  A source whose data is younger than its [freshness] max_age is not
+#  fetched at all; a source whose fetch fails is rendered from that data
+#  instead of leaving the previous build's HTML in place.
+
+def _age_seconds(stamp: str, now: datetime) -> float:
+    then = datetime.strptime(stamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return (now - then).total_seconds()
+
+
+def source_data(source: str, fetch, last_good: dict, max_age: float, now: datetime) -> tuple:
+    """Return (data, status) for one source.
+
+    status is "fresh" when last_good's data for source is younger than
+    max_age seconds (fetch is not called), "fetched" when fetch() succeeds,
+    or "stale" when it raises and last_good has data to fall back on.
+    Without last-known-good data the fetch error propagates.
+    """
+    stamp = last_good.get("fetched_at", {}).get(source, "")
+    if source in last_good and stamp and max_age > 0 and _age_seconds(stamp, now) < max_age:
+        REPORT.record_cache(source, hit=True)
+        return last_good[source], "fresh"
+    try:
+        return fetch(), "fetched"
+    except Exception as e:
+        if source not in last_good:
+            raise
+        print(f"  ⚠  {source} fetch failed: {e} — rendering last-known-good data from {stamp or 'an earlier build'}")
+        return last_good[source], "stale"
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -1100,93 +3285,154 @@ def cmd_auth():
     print("Done ✓")
 
 
-def cmd_build():
-    """Main build: fetch both sources and update index.html."""
-    with open(INDEX_PATH, "r", encoding="utf-8") as f:
-        src = f.read()
+def cmd_build(config: dict, summary: bool = False):
+    """Main build: fetch all sources and update index.html.
+
+    config is the parsed site.toml (see load_config()). Each stage is timed
+    into REPORT, which is written to build-report.json at the end (and
+    printed as a table when summary is True).
+    """
+    global REPORT
+    REPORT = BuildReport()
+
+    sources = config["sources"]
+    site_url = config["site"]["url"]
+    goodreads_rss = sources["goodreads"]["currently_reading_rss"]
+    budgets = config.get("budgets", {})
+    hints_limit = config.get("hints", {}).get("limit", 6)
+    og_config = config.get("og_image", {})
+    fetched = {}  # source → normalized items, recorded in the history store at the end
+    snapshot = {}  # what the preview server (build.py serve) renders from — see SNAPSHOT_PATH
+    started = datetime.now(timezone.utc)
+    fetched_at = started.strftime("%Y-%m-%dT%H:%M:%SZ")
+    configure_rate_limits(config.get("rate_limits", {}), RATE_LIMIT_SHARE)
+
+    # Each source's last successful fetch: reused while younger than its [freshness] max_age, and
+    # rendered in place of a failed fetch.
+    freshness = config.get("freshness", {})
+    last_good = load_snapshot(SNAPSHOT_PATH)
+
+    def get(source: str, fetch, span: str = ""):
+        """Return (data, status) for source via source_data(), timing the fetch under span."""
+        def timed():
+            with REPORT.span(span or f"fetch:{source}"):
+                return fetch()
+        data, status = source_data(source, timed, last_good, freshness.get(source, {}).get("max_age", 0), started)
+        if status == "fresh":
+            print(f"  Reusing {source} data fetched at {last_good['fetched_at'][source]}"
+                  f" (max_age {freshness[source]['max_age']}s).")
+        return data, status
+
+    # The history store also holds the RSS high-water marks; without it every feed is parsed in full.
+    try:
+        history = open_history(HISTORY_DB_PATH)
+    except Exception as e:
+        history = None
+        print(f"  ⚠  History store unavailable: {e} — parsing feeds in full")
+
+    with REPORT.span("read-template"):
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            src = f.read()
 
     # ── <html lang> (from site.toml) ──
-    lang = CONFIG["site"].get("lang", "en")
+    lang = config["site"].get("lang", "en")
     src = re.sub(r'<html\b[^>]*>', f'<html lang="{html.escape(lang)}">', src, count=1)
-    print(f"  Injecting lang={lang}\u2026")
-
-    # ── Meta tags (from site.toml) ──
-    print("Injecting meta tags from site.toml…")
-    src = inject(src, META_PATTERN, build_meta_html(CONFIG), "meta")
+    print(f"  Injecting lang={lang}…")
 
     # ── Analytics (from site.toml) ──
     print("Injecting analytics from site.toml…")
-    src = inject(src, ANALYTICS_PATTERN, build_analytics_html(CONFIG), "analytics")
+    src = inject(src, _make_pattern("analytics"), build_analytics_html(config), "analytics")
 
     # ── Gravatar ──
     print("Fetching Gravatar profile…")
     try:
-        profile = fetch_gravatar(GRAVATAR_USERNAME, GRAVATAR_API_KEY)
-        name = html.escape(profile.get("display_name", ""))
-        tagline = html.escape(build_gravatar_tagline(profile))
-        bio = profile.get("description", "")
-        avatar_url = profile.get("avatar_url", "")
-        if avatar_url:
-            avatar_html = f'        <img class="avatar" src="{html.escape(avatar_url)}?s=192" alt="{name}" width="72" height="72">'
-            src = inject(src, GRAVATAR_AVATAR_PATTERN, avatar_html, "gravatar-avatar")
-        if name:
-            src = inject(src, GRAVATAR_NAME_PATTERN, f"        {name}", "gravatar-name")
-        if tagline:
-            src = inject(src, GRAVATAR_TAGLINE_PATTERN, f"        {tagline}", "gravatar-tagline")
-        if bio:
-            bio_html = f"        <p>{html.escape(bio)}</p>"
-            src = inject(src, GRAVATAR_BIO_PATTERN, bio_html, "gravatar-bio")
-        contact_email = profile.get("contact_info", {}).get("email", "")
-        links_html = build_gravatar_links_html(profile, email=contact_email)
-        if links_html:
-            src = inject(src, GRAVATAR_LINKS_PATTERN, links_html, "gravatar-links")
-        jsonld = build_jsonld(profile, SITE_URL)
-        src = inject(src, JSONLD_PATTERN, f"    <script type=\"application/ld+json\">\n{jsonld}\n    </script>", "jsonld")
-        print(f"  Name: {name}, tagline: {tagline}, links: {len(profile.get('links', []))}")
+        profile, status = get("gravatar", lambda: fetch_gravatar(sources["gravatar"]["username"], GRAVATAR_API_KEY))
+        if status == "fetched":
+            snapshot["gravatar"] = profile
+        with REPORT.span("render:gravatar"):
+            for tag, region_html in build_gravatar_regions(profile, site_url).items():
+                src = inject(src, _make_pattern(tag), region_html, tag)
+        print(f"  Name: {profile.display_name}, tagline: {build_gravatar_tagline(profile)},"
+              f" links: {len(profile.links)}")
 
         # ── OG image ──
-        _name = profile.get("display_name", "")
-        _tagline = build_gravatar_tagline(profile)
-        _avatar = profile.get("avatar_url", "")
-        if _og_inputs_changed(_name, _tagline, _avatar, OG_HASH_PATH):
-            print("Generating OG image…")
-            if generate_og_image(profile, OG_IMAGE_PATH):
-                _save_og_hash(_name, _tagline, _avatar, OG_HASH_PATH)
-                print(f"  Saved {OG_IMAGE_PATH}")
-        else:
-            print("OG image inputs unchanged — skipping regeneration.")
+        with REPORT.span("og-image"):
+            _name = profile.display_name
+            _tagline = build_gravatar_tagline(profile)
+            _avatar = profile.avatar_url
+            if _og_inputs_changed(_name, _tagline, _avatar, OG_HASH_PATH):
+                REPORT.record_cache("og-image", hit=False)
+                print("Generating OG image…")
+                if generate_og_image(profile, OG_IMAGE_PATH, og_config.get("encoder", "palette"),
+                                     og_config.get("compress_level", 6)):
+                    _save_og_hash(_name, _tagline, _avatar, OG_HASH_PATH)
+                    print(f"  Saved {OG_IMAGE_PATH}")
+            else:
+                REPORT.record_cache("og-image", hit=True)
+                print("OG image inputs unchanged — skipping regeneration.")
     except Exception as e:
         print(f"  ⚠  Gravatar fetch failed: {e} — keeping existing content")
 
     # ── Goodreads ──
-    if "YOUR_USER_ID" in GOODREADS_RSS:
+    if "YOUR_USER_ID" in goodreads_rss:
         print("⚠  Skipping Goodreads — update sources.goodreads in site.toml first.")
     else:
         print("Fetching Goodreads RSS…")
         try:
-            books = fetch_goodreads(GOODREADS_RSS)
+            books, status = get("goodreads-now", lambda: fetch_goodreads(goodreads_rss))
             print(f"  Found {len(books)} book(s) on currently-reading shelf.")
-            src = inject(src, GOODREADS_PATTERN, build_book_html(books), "goodreads")
-            src = inject(src, GOODREADS_NOW_PATTERN, build_now_reading_html(books), "goodreads-now")
-
-            print("Fetching Goodreads read shelf…")
-            read_books = fetch_goodreads(GOODREADS_READ_RSS, limit=GOODREADS_READ_LIMIT)
+            if status == "fetched":
+                fetched["goodreads-now"] = books
+            with REPORT.span("render:goodreads-now"):
+                src = inject(src, _make_pattern("goodreads"), build_book_html(books), "goodreads")
+                src = inject(src, _make_pattern("goodreads-now"), build_now_reading_html(books), "goodreads-now")
+
+            # The read shelf only grows, so parse up to the high-water mark and reuse the rest.
+            def fetch_read_shelf() -> list[Book]:
+                print("Fetching Goodreads read shelf…")
+                read_rss, read_limit = sources["goodreads"]["read_rss"], sources["goodreads"]["read_limit"]
+                read_feed = f"goodreads-read:{read_rss}"
+                state = load_feed_state(history, read_feed, read_limit, Book)
+                new_books = fetch_goodreads(read_rss, limit=read_limit, stop_at=state["seen"])
+                read_books = merge_feed_items(new_books, state["items"], read_limit)
+                REPORT.record_cache("goodreads-read", hit=not new_books)
+                save_feed_state(history, read_feed, read_books, state["seen"], fetched_at)
+                print(f"  {len(new_books)} new book(s) on read shelf.")
+                return read_books
+
+            read_books, status = get("goodreads-read", fetch_read_shelf)
             print(f"  Found {len(read_books)} book(s) on read shelf.")
-            src = inject(src, GOODREADS_READ_PATTERN, build_book_html(read_books), "goodreads-read")
+            if status == "fetched":
+                fetched["goodreads-read"] = read_books
+            with REPORT.span("render:goodreads-read"):
+                src = inject(src, _make_pattern("goodreads-read"), build_book_html(read_books), "goodreads-read")
         except Exception as e:
             print(f"  ⚠  Goodreads fetch failed: {e} — keeping existing content")
 
     # ── Letterboxd ──
-    if "YOUR_USERNAME" in LETTERBOXD_RSS:
+    if "YOUR_USERNAME" in sources["letterboxd"]["rss"]:
         print("⚠  Skipping Letterboxd — update sources.letterboxd in site.toml first.")
     else:
-        print("Fetching Letterboxd RSS…")
+        print("Fetching Letterboxd RSS and enriching new films via TMDB…")
         try:
-            films = fetch_letterboxd(LETTERBOXD_RSS, LETTERBOXD_LIMIT)
-            print(f"  Found {len(films)} recent film(s).")
-            print("Enriching films via TMDB…")
-            films = enrich_films_with_tmdb(films, TMDB_API_KEY)
-            src = inject(src, LETTERBOXD_PATTERN, build_film_html(films), "letterboxd")
+            def fetch_films() -> list[Film]:
+                film_rss, film_limit = sources["letterboxd"]["rss"], sources["letterboxd"]["limit"]
+                film_feed = f"letterboxd:{film_rss}"
+                state = load_feed_state(history, film_feed, film_limit, Film)
+                # Each film goes to TMDB as soon as it is parsed, overlapping the rest of the parse
+                new_films = enrich_films_with_tmdb(iter_letterboxd(film_rss, film_limit, stop_at=state["seen"]),
+                                                   TMDB_API_KEY)
+                print(f"  Found {len(new_films)} new film(s).")
+                films = merge_feed_items(new_films, state["items"], film_limit)
+                REPORT.record_cache("letterboxd", hit=not new_films)
+                save_feed_state(history, film_feed, films, state["seen"], fetched_at)
+                return films
+
+            films, status = get("letterboxd", fetch_films, "fetch+enrich:letterboxd")
+            if status == "fetched":
+                fetched["letterboxd"] = films
+            with REPORT.span("render:letterboxd"):
+                src = inject(src, _make_pattern("letterboxd"), build_film_html(films), "letterboxd")
         except Exception as e:
             print(f"  ⚠  Letterboxd fetch failed: {e} — keeping existing content")
 
@@ -1199,9 +3445,22 @@ def cmd_build():
     else:
         print("Fetching Instapaper starred articles…")
         try:
-            articles = fetch_instapaper_starred(tokens)
-            print(f"  Found {len(articles)} starred article(s).")
-            src = inject(src, INSTAPAPER_PATTERN, build_article_html(articles), "instapaper")
+            def fetch_starred() -> list[Article]:
+                state = load_feed_state(history, "instapaper:starred", 0, Article)
+                starred, changed, unstarred = sync_instapaper_starred(tokens, state["items"])
+                REPORT.record_cache("instapaper", hit=not changed)
+                save_feed_state(history, "instapaper:starred", starred, frozenset(), fetched_at)
+                if history is not None and unstarred:
+                    forget_history(history, "instapaper", unstarred, keep=starred)
+                print(f"  Found {len(starred)} starred article(s) ({changed} changed since last sync).")
+                return starred
+
+            starred, status = get("instapaper", fetch_starred)
+            if status == "fetched":
+                fetched["instapaper"] = starred
+            articles = starred[:sources["instapaper"]["limit"]]
+            with REPORT.span("render:instapaper"):
+                src = inject(src, _make_pattern("instapaper"), build_article_html(articles), "instapaper")
         except Exception as e:
             print(f"  ⚠  Instapaper fetch failed: {e} — keeping existing content")
 
@@ -1209,23 +3468,86 @@ def cmd_build():
     if not LASTFM_API_KEY:
         print("⚠  Skipping Last.fm — set LASTFM_API_KEY env var first.")
     else:
-        print("Fetching Last.fm top tracks…")
+        print("Fetching Last.fm top tracks and enriching them via Last.fm…")
         try:
-            tracks = fetch_lastfm_top_tracks(LASTFM_USERNAME, LASTFM_API_KEY, LASTFM_LIMIT)
+            tracks, status = get("lastfm", lambda: enrich_tracks_with_lastfm(
+                iter_lastfm_top_tracks(sources["lastfm"]["username"], LASTFM_API_KEY, sources["lastfm"]["limit"]),
+                LASTFM_API_KEY), "fetch+enrich:lastfm")
             print(f"  Found {len(tracks)} top track(s).")
-            print("Enriching tracks via Last.fm…")
-            tracks = enrich_tracks_with_lastfm(tracks, LASTFM_API_KEY)
-            src = inject(src, MUSIC_PATTERN, build_music_html(tracks), "music")
+            if status == "fetched":
+                fetched["lastfm"] = tracks
+            with REPORT.span("render:music"):
+                src = inject(src, _make_pattern("music"), build_music_html(tracks), "music")
         except Exception as e:
             print(f"  ⚠  Last.fm fetch failed: {e} — keeping existing content")
 
+    waits = [f"{s['rate_wait_ms']:.0f} ms for {name}" for name, s in sorted(REPORT.sources.items())
+             if s["rate_wait_ms"]]
+    if waits:
+        print(f"Rate limits: waited {', '.join(waits)}.")
+
+    # ── History store + search index (before the write, so the page points at this build's index) ──
+    if history is not None:
+        try:
+            with REPORT.span("history"):
+                new = {source: record_history(history, source, items, fetched_at) for source, items in fetched.items()}
+            print(f"History: {sum(new.values())} new item(s) across {len(new)} source(s) → {HISTORY_DB_PATH}")
+            print("Building search index…")
+            with REPORT.span("search"):
+                search_urls = build_search_index(history, SEARCH_DIR, SEARCH_CACHE_PATH)
+            src = inject(src, _make_pattern("search"), build_search_html(search_urls), "search")
+        except Exception as e:
+            print(f"  ⚠  History/search update failed: {e}")
+
+    # ── Hashed assets + cache headers ──
+    print("Hashing static assets…")
+    with REPORT.span("assets"):
+        assets = build_asset_manifest(HASHED_ASSETS, HASHED_DIR)
+        for path, url in assets.items():
+            print(f"  {path} → {url}")
+        if write_if_changed(HEADERS_PATH, build_headers(HASHED_DIR)):
+            print(f"  Wrote {HEADERS_PATH}")
+        src = inject(src, _make_pattern("icons"), build_icons_html(assets), "icons")
+
+    # ── Snapshot for the preview server (sources that failed keep their last data) ──
+    with REPORT.span("snapshot"):
+        save_snapshot(SNAPSHOT_PATH, {**snapshot, **fetched}, fetched_at)
+        snapshot = load_snapshot(SNAPSHOT_PATH)
+
+    # ── data.json + JSON Feeds (before the meta tags, which link only the feeds that exist) ──
+    with REPORT.span("data"):
+        data_written = write_data_feeds(snapshot, config, DATA_DIR)
+    print(f"  {DATA_DIR}/: data.json + {len(_data_sections(snapshot, config))} JSON Feed(s),"
+          f" {len(data_written)} file(s) written")
+
+    # ── Meta tags (from site.toml) ──
+    print("Injecting meta tags from site.toml…")
+    src = inject(src, _make_pattern("meta"), build_meta_html(config, assets, written_feeds(DATA_DIR)), "meta")
+
+    # ── Resource hints (from rendered content) ──
+    with REPORT.span("hints"):
+        hint_origins = collect_hint_origins(src, site_url, [sources.get("nowplaying", {}).get("worker_url", "")])
+        src = inject(src, _make_pattern("hints"), build_hints_html(hint_origins, hints_limit), "hints")
+    print(f"Injected {min(len(hint_origins), hints_limit)} of {len(hint_origins)} resource hint(s).")
+
     # ── Inline CSS ──
-    if os.path.exists(STYLE_PATH):
+    if os.path.exists(_input_path(STYLE_PATH)):
         print("Inlining style.css…")
-        with open(STYLE_PATH, "r", encoding="utf-8") as f:
-            css = f.read()
-        style_html = f"  <style>\n{css}  </style>"
-        src = inject(src, STYLE_PATTERN, style_html, "style")
+        with REPORT.span("inline-css"):
+            with open(_input_path(STYLE_PATH), "r", encoding="utf-8") as f:
+                css = f.read()
+            style_html = f"  <style>\n{css}  </style>"
+            src = inject(src, _make_pattern("style"), style_html, "style")
+
+    # ── Self-hosted fonts (subset to the rendered glyphs) ──
+    print("Subsetting web fonts…")
+    with REPORT.span("fonts"):
+        try:
+            font_urls = build_font_assets(src, HASHED_DIR)
+        except Exception as e:
+            print(f"  ⚠  Font subsetting failed: {e} — keeping Google Fonts.")
+            font_urls = {}
+        src = inject(src, _make_pattern("fonts"), build_fonts_html(font_urls), "fonts")
 
     # ── Last build timestamp + countdown ──
     now = datetime.now(timezone.utc)
@@ -1240,25 +3562,351 @@ def cmd_build():
         f'<span class="next-update" data-next="{next_iso}"></span>'
         f'</p>'
     )
-    src = inject(src, UPDATED_PATTERN, updated_html, "updated")
+    src = inject(src, _make_pattern("updated"), updated_html, "updated")
     print(f"  Timestamp: {updated_str} · next build: {next_iso}")
 
-    # ── Sitemap ──
-    update_sitemap(SITEMAP_PATH, now)
-
     # ── Write ──
-    try:
-        with open(INDEX_PATH, "r", encoding="utf-8") as f:
-            old_src = f.read()
-    except FileNotFoundError:
-        old_src = ""
-
-    if _content_changed(old_src, src):
-        with open(INDEX_PATH, "w", encoding="utf-8") as f:
-            f.write(src)
-        print(f"Updated {INDEX_PATH} ✓")
+    with REPORT.span("write"):
+        try:
+            with open(INDEX_PATH, "r", encoding="utf-8") as f:
+                old_src = f.read()
+        except FileNotFoundError:
+            old_src = ""
+
+        if _content_changed(old_src, src):
+            write_if_changed(INDEX_PATH, src)
+            print(f"Updated {INDEX_PATH} ✓")
+        else:
+            print(f"No feed content changed — skipping {INDEX_PATH} write (timestamp preserved).")
+            src = old_src
+
+    # ── Service worker (keyed to the build the page actually shows) ──
+    with REPORT.span("service-worker"):
+        precache = [_asset_url(assets, p) for p in (FAVICON_PNG_PATH, FAVICON_192_PATH) if p in assets]
+        precache += list(font_urls.values())
+        sw_written = write_if_changed(SW_PATH, build_service_worker(_build_id(src) or built_iso, precache))
+    print(f"  {'Wrote' if sw_written else 'Unchanged:'} {SW_PATH} ({len(precache)} precached asset(s))")
+
+    # ── Page weight + budgets ──
+    with REPORT.span("page-weight"):
+        weights = measure_page_weight(src, budgets)
+        over_budget = check_budgets(weights, budgets)
+        append_weight_history(PAGE_WEIGHT_HISTORY_PATH, _build_id(src) or built_iso, weights,
+                              PAGE_WEIGHT_HISTORY_MAX)
+    REPORT.page_weight = weights
+    doc = weights["document"]
+    print(f"Page weight: {doc['raw'] / 1024:.1f} KB raw · {doc['gzip'] / 1024:.1f} KB gzip"
+          + (f" · {doc['brotli'] / 1024:.1f} KB brotli" if doc["brotli"] is not None else ""))
+    for msg in over_budget:
+        print(f"  ⚠  Over budget: {msg}")
+
+    # ── Archive pages ──
+    archive_pages = []
+    if history is not None:
+        try:
+            print("Building archive pages…")
+            with REPORT.span("archive"):
+                archive_pages = build_archive(history, ARCHIVE_DIR, ARCHIVE_MANIFEST_PATH, site_url,
+                                              _asset_url(assets, STYLE_PATH), lang)
+        except Exception as e:
+            print(f"  ⚠  Archive update failed: {e}")
+        finally:
+            history.close()
+
+    # ── Sitemaps (dated by the page's last content change, so a no-op build leaves them alone) ──
+    with REPORT.span("sitemap"):
+        page_built = datetime.strptime(_build_id(src) or built_iso, "%Y-%m-%dT%H:%M:%SZ")
+        update_sitemap(SITEMAP_MAIN_PATH, page_built, site_url)
+        sitemaps = [(SITEMAP_MAIN_PATH, page_built.strftime("%Y-%m-%d"))]
+        if archive_pages:
+            write_archive_sitemap(SITEMAP_ARCHIVE_PATH, site_url, archive_pages)
+            sitemaps.append((SITEMAP_ARCHIVE_PATH, max(lastmod for _, lastmod in archive_pages)))
+        write_sitemap_index(SITEMAP_PATH, site_url, sitemaps)
+    print(f"  {SITEMAP_PATH}: {len(sitemaps)} sitemap(s), {1 + len(archive_pages)} URL(s)")
+
+    # ── Output manifest + changed-file list for the deploy ──
+    with REPORT.span("outputs"):
+        changes = build_output_manifest(OUTPUT_MANIFEST_PATH, DEPLOY_FILES, DEPLOY_DIRS, DEPLOYED_MANIFEST_PATH)
+        write_if_changed(CHANGED_FILES_PATH, "".join(f"{change}\n" for change in changes))
+    if changes:
+        print(f"Outputs: {len(changes)} file(s) to deploy → {CHANGED_FILES_PATH}")
     else:
-        print(f"No feed content changed — skipping {INDEX_PATH} write (timestamp preserved).")
+        print("Outputs: every deployed file is unchanged — nothing to deploy.")
+
+    # ── Output check (the deploy job's html5validator + Stylelint only run once this passes) ──
+    start = time.perf_counter()
+    with REPORT.span("check"):
+        problems, checked = check_outputs(src)
+    print_check(problems, checked, (time.perf_counter() - start) * 1000)
+
+    # ── Build report ──
+    REPORT.write(REPORT_PATH)
+    print(f"  Wrote {REPORT_PATH} ({REPORT.to_dict()['total_ms']:.0f} ms)")
+    if summary:
+        print()
+        print(REPORT.summary())
+
+    if over_budget and budgets.get("fail", False):
+        print(f"✗ {len(over_budget)} page-weight budget(s) exceeded — failing build ([budgets] fail = true).")
+        sys.exit(1)
+    if problems:
+        print(f"✗ {len(problems)} markup problem(s) in the rendered pages — failing build.")
+        sys.exit(1)
+
+
+def cmd_check():
+    """Check the built index.html and archive pages without rebuilding (see check_html)."""
+    start = time.perf_counter()
+    problems, checked = check_outputs()
+    print_check(problems, checked, (time.perf_counter() - start) * 1000)
+    if problems:
+        sys.exit(1)
+
+
+def use_upstream(base_url: str, config: dict) -> None:
+    """Point every API and feed URL at a stand-in server (see benchmarks/fake_upstream.py).
+
+    Rewrites the *_API constants and the feed URLs in config, replaces
+    credentials with dummies (real secrets never reach the stand-in), and
+    turns the on-disk HTTP cache and the [freshness] windows off so every
+    run measures the fetch layer. The RSS high-water marks in
+    .cache/history.db still apply — delete it to time full parses.
+    """
+    global GRAVATAR_API, INSTAPAPER_API, LASTFM_API, TMDB_API, TMDB_IMG
+    global GRAVATAR_API_KEY, INSTAPAPER_CONSUMER_KEY, INSTAPAPER_CONSUMER_SECRET, LASTFM_API_KEY, TMDB_API_KEY
+    global HTTP_CACHE_TTL, TMDB_CACHE_TTL, IMAGE_CACHE_TTL, LASTFM_INFO_CACHE_TTL
+    base_url = base_url.rstrip("/")
+    GRAVATAR_API = f"{base_url}/gravatar"
+    INSTAPAPER_API = f"{base_url}/instapaper"
+    LASTFM_API = f"{base_url}/lastfm/"
+    TMDB_API = f"{base_url}/tmdb"
+    TMDB_IMG = f"{base_url}/tmdb-img"
+    sources = config["sources"]
+    sources["goodreads"]["currently_reading_rss"] = f"{base_url}/goodreads/currently-reading.rss"
+    sources["goodreads"]["read_rss"] = f"{base_url}/goodreads/read.rss"
+    sources["letterboxd"]["rss"] = f"{base_url}/letterboxd/rss/"
+    GRAVATAR_API_KEY = LASTFM_API_KEY = TMDB_API_KEY = "upstream"
+    INSTAPAPER_CONSUMER_KEY = INSTAPAPER_CONSUMER_SECRET = "upstream"
+    os.environ["INSTAPAPER_OAUTH_TOKEN"] = os.environ["INSTAPAPER_OAUTH_TOKEN_SECRET"] = "upstream"
+    HTTP_CACHE_TTL = TMDB_CACHE_TTL = IMAGE_CACHE_TTL = LASTFM_INFO_CACHE_TTL = 0
+    config["freshness"] = {}
+    print(f"Using stand-in upstream at {base_url} (HTTP cache off, dummy credentials)")
+
+
+def discover_sites(sites_dir: str) -> list[str]:
+    """Return the absolute paths of the site profiles under sites_dir (subdirectories with a site.toml and index.html)."""
+    sites = []
+    for name in sorted(os.listdir(sites_dir)):
+        path = os.path.abspath(os.path.join(sites_dir, name))
+        if os.path.isfile(os.path.join(path, "site.toml")) and os.path.isfile(os.path.join(path, INDEX_PATH)):
+            sites.append(path)
+    return sites
+
+
+def _build_site(site_dir: str, shared_cache_dir: str, summary: bool = False, upstream: str = "",
+                rate_share: float = 1.0) -> dict:
+    """Process-pool worker: build one site profile inside its own directory.
+
+    The site directory stands in for the repo root — its index.html is the
+    template and every output (including its .cache/ history and
+    build-report.json) lands beside it; style.css, favicons and assets/
+    fall back to the repo's copies. HTTP and font caches are shared.
+    upstream, when set, is passed to use_upstream(); rate_share is this
+    worker's slice of each [rate_limits] rate. Returns {site, ok, ms, log}.
+    """
+    global FONT_CACHE_DIR, GRAVATAR_API_KEY, HTTP_CACHE_DIR, HTTP_CACHE_TTL, RATE_LIMIT_SHARE
+    name = os.path.basename(site_dir)
+    prefix = re.sub(r"\W", "_", name).upper()
+    for var in SITE_SECRET_VARS:
+        if os.environ.get(f"{prefix}_{var}"):
+            os.environ[var] = os.environ[f"{prefix}_{var}"]
+    GRAVATAR_API_KEY = os.environ.get("GRAVATAR_API_KEY", "")
+    HTTP_CACHE_DIR = os.path.join(shared_cache_dir, "http")
+    HTTP_CACHE_TTL = MULTI_SITE_HTTP_TTL
+    FONT_CACHE_DIR = os.path.join(shared_cache_dir, "fonts")
+    RATE_LIMIT_SHARE = rate_share
+
+    import io
+    import traceback
+    log, ok, start = io.StringIO(), True, time.perf_counter()
+    os.chdir(site_dir)
+    with contextlib.redirect_stdout(log):
+        try:
+            config = load_config(os.path.join(site_dir, "site.toml"))
+            if upstream:
+                use_upstream(upstream, config)
+            cmd_build(config, summary=summary)
+        except SystemExit as e:  # over-budget and failed-check builds exit 1
+            ok = not e.code
+        except Exception:
+            ok = False
+            print(traceback.format_exc())
+    return {"site": name, "ok": ok, "ms": (time.perf_counter() - start) * 1000, "log": log.getvalue()}
+
+
+def _build_site_job(args: tuple) -> dict:
+    """Pool.imap_unordered adapter for _build_site."""
+    return _build_site(*args)
+
+
+def cmd_build_sites(sites_dir: str, jobs: int = 0, summary: bool = False, upstream: str = ""):
+    """Build every site profile under sites_dir in a process pool.
+
+    Each site runs in a fresh process (so per-site secrets and REPORT never
+    leak between sites) and prints its log when it finishes. Sites share
+    the repo's .cache/http and .cache/fonts, with GETs cached for
+    MULTI_SITE_HTTP_TTL so enrichment lookups common to several sites are
+    made once. Rate limits are per process, so each worker gets an equal
+    share of every [rate_limits] rate.
+    """
+    import multiprocessing
+
+    sites = discover_sites(sites_dir)
+    if not sites:
+        print(f"⚠  No site profiles (site.toml + {INDEX_PATH}) found under {sites_dir}.")
+        sys.exit(1)
+    jobs = jobs or min(len(sites), MULTI_SITE_MAX_JOBS)
+    shared_cache_dir = os.path.join(_SCRIPT_DIR, CACHE_DIR)
+    rate_share = 1 / min(jobs, len(sites))
+    print(f"Building {len(sites)} site(s) with {jobs} worker(s)…")
+    start = time.perf_counter()
+    results = []
+    # spawn + maxtasksperchild=1: every site gets a fresh interpreter on every platform and Python
+    # version (ProcessPoolExecutor's max_tasks_per_child needs 3.11, and fork would inherit our state).
+    with multiprocessing.get_context("spawn").Pool(jobs, maxtasksperchild=1) as pool:
+        tasks = [(site, shared_cache_dir, summary, upstream, rate_share) for site in sites]
+        for result in pool.imap_unordered(_build_site_job, tasks):
+            results.append(result)
+            print(f"\n── {result['site']} {'─' * max(0, 60 - len(result['site']))}")
+            print(result["log"], end="")
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    print()
+    for result in sorted(results, key=lambda r: r["site"]):
+        print(f"  {'✓' if result['ok'] else '✗'} {result['site']:<24} {result['ms']:>8.0f} ms")
+    serial_ms = sum(r["ms"] for r in results)
+    print(f"{len(results)} site(s) in {wall_ms:.0f} ms wall ({serial_ms:.0f} ms summed across workers)")
+    failed = [r["site"] for r in results if not r["ok"]]
+    if failed:
+        print(f"✗ {len(failed)} site(s) failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+def cmd_serve(port: int = 8000):
+    """Preview the site locally, re-rendering on every edit and live-reloading the browser.
+
+    The page is rendered once from the last build's snapshot (no network),
+    then the watcher re-runs only what an edit affects: style.css swaps the
+    inline <style>, index.html or site.toml re-renders from the snapshot,
+    the favicon font regenerates favicons, other assets just reload, and
+    build.py restarts the server. Nothing is written to index.html, the
+    sitemaps or the build timestamp.
+    """
+    import http.server
+
+    state = {"config": load_config(), "snapshot": load_snapshot(SNAPSHOT_PATH)}
+    page = {"html": b"", "version": 0}
+    changed_cond = threading.Condition()
+
+    def read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def render(full: bool):
+        global REPORT
+        REPORT = BuildReport()  # spans from inject() would otherwise pile up for the whole session
+        css = read(_input_path(STYLE_PATH)) if os.path.exists(_input_path(STYLE_PATH)) else None
+        if full:
+            state["src"] = render_preview(read(INDEX_PATH), state["config"], state["snapshot"], css)
+        elif css is not None:
+            state["src"] = inject(state["src"], _make_pattern("style"), f"  <style>\n{css}  </style>", "style")
+        body = state["src"].replace("</body>", f"{LIVE_RELOAD_SCRIPT}\n</body>", 1)
+        publish(body.encode("utf-8"))
+
+    def publish(body: bytes = None):
+        with changed_cond:
+            if body is not None:
+                page["html"] = body
+            page["version"] += 1
+            changed_cond.notify_all()
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path in ("/", "/index.html"):
+                body = page["html"]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif path == "/__reload":
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                with changed_cond:
+                    seen = page["version"]
+                try:
+                    while True:
+                        with changed_cond:
+                            changed_cond.wait_for(lambda: page["version"] != seen, timeout=15)
+                            reload, seen = page["version"] != seen, page["version"]
+                        self.wfile.write(b"data: reload\n\n" if reload else b": ping\n\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+            else:
+                super().do_GET()
+
+        def end_headers(self):
+            self.send_header("Cache-Control", "no-store")  # static files too — edits must show on reload
+            super().end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    render(full=True)
+    if not state["snapshot"]:
+        print(f"⚠  No {SNAPSHOT_PATH} yet — showing {INDEX_PATH} as last built. Run a full build to fill it.")
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving http://127.0.0.1:{port}/ — watching {INDEX_PATH}, {STYLE_PATH}, site.toml, {ASSETS_DIR}/ (Ctrl-C to stop)")
+
+    mtimes = _watched_mtimes()
+    try:
+        while True:
+            time.sleep(PREVIEW_POLL_INTERVAL)
+            current = _watched_mtimes()
+            changed = {path for path in current.keys() | mtimes.keys() if current.get(path) != mtimes.get(path)}
+            mtimes = current
+            if not changed:
+                continue
+            start = time.perf_counter()
+            names = ", ".join(sorted(os.path.relpath(path) for path in changed))
+            try:
+                if _SCRIPT_PATH in changed:
+                    print(f"  ↻ {names} — restarting…")
+                    server.server_close()
+                    os.execv(sys.executable, [sys.executable, _SCRIPT_PATH, *sys.argv[1:]])
+                if _CONFIG_PATH in changed:
+                    state["config"] = load_config()
+                if changed & {INDEX_PATH, _CONFIG_PATH}:
+                    render(full=True)
+                elif _input_path(STYLE_PATH) in changed:
+                    render(full=False)
+                else:
+                    if os.path.join(ASSETS_DIR, "JetBrainsMono-Bold.ttf") in changed:
+                        cmd_favicons()
+                    publish()
+            except Exception as e:
+                print(f"  ⚠  {names}: {e} — keeping the previous render")
+                continue
+            print(f"  ↻ {names} · {(time.perf_counter() - start) * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
 
 
 def _draw_favicon(size: int) -> "Image.Image":
@@ -1303,36 +3951,123 @@ def cmd_favicons():
 
     print("Generating favicons…")
 
-    img_192 = _draw_favicon(192)
-    img_192.save(FAVICON_192_PATH, "PNG", optimize=True)
-    print(f"  Saved {FAVICON_192_PATH}")
+    import io
 
-    img_48 = _draw_favicon(48)
-    img_48.save(FAVICON_PNG_PATH, "PNG", optimize=True)
-    print(f"  Saved {FAVICON_PNG_PATH}")
+    def save(path: str, img, **params) -> None:
+        buf = io.BytesIO()
+        img.save(buf, **params)
+        print(f"  {'Saved' if write_if_changed(path, buf.getvalue()) else 'Unchanged:'} {path}")
+
+    save(FAVICON_192_PATH, _draw_favicon(192), format="PNG", optimize=True)
+    save(FAVICON_PNG_PATH, _draw_favicon(48), format="PNG", optimize=True)
 
     # Multi-res ICO: pre-render each size for reliable multi-frame output
     ico_48 = _draw_favicon(48)
     ico_32 = _draw_favicon(32)
     ico_16 = _draw_favicon(16)
-    ico_48.save(
-        FAVICON_ICO_PATH,
-        format="ICO",
-        append_images=[ico_32, ico_16],
-        sizes=[(48, 48), (32, 32), (16, 16)],
-    )
-    print(f"  Saved {FAVICON_ICO_PATH}")
+    save(FAVICON_ICO_PATH, ico_48, format="ICO", append_images=[ico_32, ico_16],
+         sizes=[(48, 48), (32, 32), (16, 16)])
 
     print("Favicons generated ✓")
 
 
+def _run_instrumented(fn, profile_path: str = "", trace_memory: bool = False, top: int = 20) -> None:
+    """Run fn under cProfile and/or tracemalloc and print the hottest entries.
+
+    profile_path receives the raw .pstats dump (load it with pstats or
+    snakeviz for the full picture). The printed summary lists the top
+    functions by self time and, with trace_memory, the top allocation sites
+    by size plus the peak traced memory.
+    """
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start(10)
+    if profiler:
+        profiler.enable()
+    try:
+        fn()
+    finally:
+        if profiler:
+            profiler.disable()
+        if trace_memory:
+            # Snapshot before the profile summary so pstats' own allocations are excluded
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if profiler:
+            profiler.dump_stats(profile_path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).strip_dirs().sort_stats("tottime").print_stats(top)
+            print(f"\n── Profile: top {top} functions by self time (full stats in {profile_path}) ──")
+            print(out.getvalue().split("\n", 4)[-1].rstrip())
+        if trace_memory:
+            snapshot = snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ])
+            print(f"\n── Memory: top {top} allocation sites (peak {peak / 1024 / 1024:.1f} MiB) ──")
+            for stat in snapshot.statistics("lineno")[:top]:
+                frame = stat.traceback[0]
+                print(f"  {stat.size / 1024:>9.1f} KiB  {stat.count:>7} blocks  {frame.filename}:{frame.lineno}")
+
+
 def main():
-    if len(sys.argv) > 1 and sys.argv[1] == "auth":
-        cmd_auth()
-    elif len(sys.argv) > 1 and sys.argv[1] == "favicons":
-        cmd_favicons()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build nicsheehan.com.")
+    parser.add_argument("command", nargs="?", default="build", choices=["build", "auth", "favicons", "serve", "check"])
+    parser.add_argument("--summary", action="store_true",
+                        help="print a per-stage timing and per-source request table after the build")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="PATH",
+                        help="run under cProfile and write stats to PATH (default: <command>.pstats)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="run under tracemalloc and print the top allocation sites")
+    parser.add_argument("--profile-top", type=int, default=20, metavar="N",
+                        help="entries to print for --profile / --trace-memory (default: %(default)s)")
+    parser.add_argument("--sites", metavar="DIR",
+                        help="build every site profile in DIR (subdirectories with site.toml + index.html) in parallel")
+    parser.add_argument("--jobs", type=int, default=0, metavar="N",
+                        help="worker processes for --sites (default: one per site, up to 8)")
+    parser.add_argument("--upstream", metavar="URL", default="",
+                        help="fetch from a stand-in server instead of the real services (see benchmarks/fake_upstream.py)")
+    parser.add_argument("--port", type=int, default=8000, metavar="N",
+                        help="port for serve (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "auth":
+        run = cmd_auth
+    elif args.command == "favicons":
+        run = cmd_favicons
+    elif args.command == "check":
+        run = cmd_check
+    elif args.command == "serve":
+        def run():
+            cmd_serve(args.port)
+    elif args.sites:
+        prune_http_cache(os.path.join(_SCRIPT_DIR, HTTP_CACHE_DIR), max(TMDB_CACHE_TTL, IMAGE_CACHE_TTL))
+        prune_http_cache(os.path.join(_SCRIPT_DIR, FONT_CACHE_DIR), FONT_CACHE_TTL)
+
+        def run():
+            cmd_build_sites(args.sites, args.jobs, summary=args.summary, upstream=args.upstream)
     else:
-        cmd_build()
+        config = load_config()
+        prune_http_cache(HTTP_CACHE_DIR, max(TMDB_CACHE_TTL, IMAGE_CACHE_TTL))
+        prune_http_cache(FONT_CACHE_DIR, FONT_CACHE_TTL)
+        if args.upstream:
+            use_upstream(args.upstream, config)
+
+        def run():
+            cmd_build(config, summary=args.summary)
+
+    if args.profile is None and not args.trace_memory:
+        run()
+        return
+    profile_path = (args.profile or f"{args.command}.pstats") if args.profile is not None else ""
+    _run_instrumented(run, profile_path, args.trace_memory, args.profile_top)
 
 
 if __name__ == "__main__":
@@ -36,6 +36,97 @@ class TestOgImageSkip(unittest.TestCase):
             self.assertTrue(_og_inputs_changed("Nicholas", "Dev", "https://example.com", hash_path))
 
 
+try:
+    import PIL  # noqa: F401
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+
+@unittest.skipUnless(HAVE_PIL, "Pillow not installed")
+class TestOgRender(unittest.TestCase):
+    def setUp(self):
+        import build
+        self._tmp = tempfile.TemporaryDirectory()
+        self._og_cache_dir = build.OG_CACHE_DIR
+        build.OG_CACHE_DIR = self._tmp.name
+        build._OG_BASE_CACHE.clear()
+
+    def tearDown(self):
+        import build
+        build.OG_CACHE_DIR = self._og_cache_dir
+        build._OG_BASE_CACHE.clear()
+        self._tmp.cleanup()
+
+    def test_base_layer_persists_across_processes(self):
+        import build
+        build.REPORT = build.BuildReport()
+        drawn, _ = build._og_base_layer()
+        self.assertEqual(len(os.listdir(self._tmp.name)), 1)
+        build._OG_BASE_CACHE.clear()  # as in a fresh process
+        loaded, _ = build._og_base_layer()
+        self.assertEqual(drawn.tobytes(), loaded.tobytes())
+        stats = build.REPORT.sources["og-base"]
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (1, 1))
+
+    def test_theme_fingerprint_ignores_font_mtime(self):
+        from unittest import mock
+        import build
+        font = os.path.join(self._tmp.name, "font.ttf")
+        with open(font, "wb") as f:
+            f.write(b"glyphs")
+        with mock.patch.object(build, "_og_font_paths", lambda bold: [font]):
+            before = build._og_theme_fingerprint()
+            os.utime(font, (1, 1))  # as after a fresh checkout
+            self.assertEqual(build._og_theme_fingerprint(), before)
+            with open(font, "wb") as f:
+                f.write(b"other glyphs")
+            self.assertNotEqual(build._og_theme_fingerprint(), before)
+
+    def test_render_and_encode_are_report_spans(self):
+        import contextlib
+        import io
+        import build
+        from build import Profile, generate_og_image
+        build.REPORT = build.BuildReport()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_og_image(Profile(display_name="Nick"), os.path.join(self._tmp.name, "og.png"))
+        self.assertEqual([s["name"] for s in build.REPORT.spans], ["og-render", "og-encode"])
+
+    def test_base_layer_cached_between_renders(self):
+        from build import _og_base_layer
+        base1, fonts1 = _og_base_layer()
+        base2, fonts2 = _og_base_layer()
+        self.assertIs(base1, base2)
+        self.assertIs(fonts1, fonts2)
+
+    def test_render_does_not_mutate_base_layer(self):
+        from build import Profile, _og_base_layer, generate_og_image
+        base, _ = _og_base_layer()
+        before = base.tobytes()
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "og.png")
+            self.assertTrue(generate_og_image(Profile(display_name="Nick", job_title="Dev"), out))
+            self.assertTrue(os.path.getsize(out) > 0)
+        self.assertEqual(before, base.tobytes())
+
+    def test_palette_encoder_writes_indexed_png(self):
+        from PIL import Image
+        from build import _encode_og_png, _og_base_layer
+        base, _ = _og_base_layer()
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "og.png")
+            _encode_og_png(base, out, encoder="palette", compress_level=6)
+            with Image.open(out) as img:
+                self.assertEqual(img.mode, "P")
+
+    def test_unknown_encoder_rejected(self):
+        from build import _encode_og_png, _og_base_layer
+        base, _ = _og_base_layer()
+        with self.assertRaises(ValueError):
+            _encode_og_png(base, os.devnull, encoder="webp")
+
+
 class TestBotCommitSkip(unittest.TestCase):
     def test_timestamp_only_change_not_detected(self):
         old = "<!-- updated:start -->\nOld timestamp\n<!-- updated:end -->\n<p>Content</p>"
@@ -53,6 +144,932 @@ class TestBotCommitSkip(unittest.TestCase):
         self.assertTrue(_content_changed(old, new))
 
 
+class TestAssetManifest(unittest.TestCase):
+    def test_copies_to_hashed_name(self):
+        from build import build_asset_manifest
+        with tempfile.TemporaryDirectory() as d:
+            src = os.path.join(d, "favicon.png")
+            with open(src, "wb") as f:
+                f.write(b"icon-v1")
+            out = os.path.join(d, "static")
+            manifest = build_asset_manifest([src], out)
+            url = manifest[src]
+            self.assertRegex(url, r"/favicon\.[0-9a-f]{10}\.png$")
+            self.assertEqual(os.listdir(out), [os.path.basename(url)])
+
+    def test_stale_copies_removed_and_unrelated_files_kept(self):
+        from build import build_asset_manifest
+        with tempfile.TemporaryDirectory() as d:
+            src = os.path.join(d, "favicon.png")
+            out = os.path.join(d, "static")
+            os.makedirs(out)
+            with open(os.path.join(out, "other.txt"), "w") as f:
+                f.write("keep me")
+            with open(src, "wb") as f:
+                f.write(b"icon-v1")
+            old_url = build_asset_manifest([src], out)[src]
+            with open(src, "wb") as f:
+                f.write(b"icon-v2")
+            new_url = build_asset_manifest([src], out)[src]
+            self.assertNotEqual(old_url, new_url)
+            self.assertEqual(sorted(os.listdir(out)), sorted([os.path.basename(new_url), "other.txt"]))
+
+    def test_missing_asset_skipped(self):
+        from build import build_asset_manifest
+        with tempfile.TemporaryDirectory() as d:
+            self.assertEqual(build_asset_manifest([os.path.join(d, "nope.png")], os.path.join(d, "static")), {})
+
+    def test_meta_uses_hashed_og_image(self):
+        from build import build_meta_html
+        config = {
+            "site": {"title": "T", "description": "D", "url": "https://example.com"},
+            "social": {"og_type": "website"},
+        }
+        meta = build_meta_html(config, {"og-image.png": "/static/og-image.abc.png"})
+        self.assertIn('content="https://example.com/static/og-image.abc.png"', meta)
+        self.assertIn('content="https://example.com/og-image.png"', build_meta_html(config))
+
+    def test_headers_mark_hashed_assets_immutable(self):
+        from build import build_headers
+        headers = build_headers("static")
+        self.assertIn("/static/*\n  Cache-Control: public, max-age=31536000, immutable", headers)
+        self.assertIn("/index.html\n  Cache-Control: public, max-age=300", headers)
+
+
+class TestResourceHints(unittest.TestCase):
+    SRC = (
+        '<img class="avatar" src="https://0.gravatar.com/avatar/x?s=192">'
+        '<div data-cover="https://i.gr-assets.com/a.jpg"></div>'
+        '<div data-cover="https://i.gr-assets.com/b.jpg"></div>'
+        '<div data-poster="https://image.tmdb.org/t/p/w300/c.jpg"></div>'
+        '<script async src="//gc.zgo.at/count.js"></script>'
+        '<img src="https://www.example.com/local.png">'
+    )
+
+    def test_eager_origins_rank_first(self):
+        from build import collect_hint_origins
+        origins = collect_hint_origins(self.SRC, "https://www.example.com", ["https://worker.example.dev"])
+        self.assertEqual(
+            [o["origin"] for o in origins],
+            ["https://0.gravatar.com", "https://gc.zgo.at", "https://worker.example.dev",
+             "https://i.gr-assets.com", "https://image.tmdb.org"],
+        )
+        self.assertTrue(origins[2]["crossorigin"])
+
+    def test_own_origin_excluded(self):
+        from build import collect_hint_origins
+        origins = collect_hint_origins(self.SRC, "https://www.example.com")
+        self.assertNotIn("https://www.example.com", [o["origin"] for o in origins])
+
+    def test_hints_capped_and_typed(self):
+        from build import build_hints_html, collect_hint_origins
+        hints = build_hints_html(collect_hint_origins(self.SRC, "https://www.example.com"), 3)
+        self.assertEqual(hints.count("<link"), 3)
+        self.assertIn('<link rel="preconnect" href="https://0.gravatar.com">', hints)
+        self.assertIn('<link rel="dns-prefetch" href="https://i.gr-assets.com">', hints)
+
+    def test_goatcounter_beacon_origin_is_eager(self):
+        from build import build_analytics_html, build_hints_html, collect_hint_origins
+        src = self.SRC + build_analytics_html({"analytics": {"goatcounter": "nick"}})
+        origins = {o["origin"]: o for o in collect_hint_origins(src, "https://www.example.com")}
+        self.assertTrue(origins["https://nick.goatcounter.com"]["eager"])
+        self.assertIn('<link rel="preconnect" href="https://nick.goatcounter.com">',
+                      build_hints_html(list(origins.values()), 10))
+
+
+class TestWebFonts(unittest.TestCase):
+    def test_glyphs_include_entities_attributes_and_js_escapes(self):
+        from build import collect_glyphs
+        glyphs = collect_glyphs('<span data-stars="★★½">&mdash;</span><script>t=\' \\xb7 \\u2192\'</script>')
+        for ch in "★½—·→":
+            self.assertIn(ch, glyphs)
+        self.assertIn("~", glyphs)  # printable ASCII always present
+        self.assertNotIn("\n", glyphs)
+
+    def test_fonts_html_falls_back_to_google(self):
+        from build import GOOGLE_FONTS_HTML, build_fonts_html
+        self.assertEqual(build_fonts_html({}), GOOGLE_FONTS_HTML)
+
+    def test_fonts_html_preloads_regular_only(self):
+        from build import build_fonts_html
+        out = build_fonts_html({"Regular": "/static/R.woff2", "Bold": "/static/B.woff2", "Italic": "/static/I.woff2"})
+        self.assertEqual(out.count('rel="preload"'), 1)
+        self.assertIn('href="/static/R.woff2" as="font"', out)
+        self.assertEqual(out.count("font-display: swap"), 3)
+        self.assertIn('font-style: italic; font-weight: 400; font-display: swap; src: url("/static/I.woff2")', out)
+        self.assertNotIn("fonts.googleapis.com", out)
+
+    def test_fonts_html_loads_only_a_missing_italic_from_google(self):
+        from build import GOOGLE_FONTS_ITALIC_HTML, build_fonts_html
+        out = build_fonts_html({"Regular": "/static/R.woff2", "Bold": "/static/B.woff2"})
+        self.assertEqual(out.count("font-style: normal"), 2)
+        self.assertTrue(out.endswith(GOOGLE_FONTS_ITALIC_HTML))
+
+    def test_subset_cache_keeps_every_glyph_set(self):
+        try:
+            import brotli  # noqa: F401
+            import fontTools  # noqa: F401
+        except ImportError:
+            self.skipTest("fontTools/brotli not installed")
+        import build
+        font = os.path.join(os.path.dirname(__file__), "..", "assets", "JetBrainsMono-Regular.ttf")
+        build.REPORT = build.BuildReport()
+        with tempfile.TemporaryDirectory() as d:
+            abc = build.subset_font(font, "abc", d)
+            build.subset_font(font, "xyz", d)  # e.g. another site sharing the cache
+            self.assertEqual(len(os.listdir(d)), 2)
+            self.assertEqual(build.subset_font(font, "abc", d), abc)
+            self.assertEqual(build.prune_http_cache(d, build.FONT_CACHE_TTL), 0)
+        stats = build.REPORT.sources["fonts"]
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (1, 2))
+
+
+class TestServiceWorker(unittest.TestCase):
+    def test_build_id_read_from_updated_block(self):
+        from build import _build_id
+        src = '<!-- updated:start -->\n<span data-built="2026-03-01T22:00:00Z">x</span>\n<!-- updated:end -->'
+        self.assertEqual(_build_id(src), "2026-03-01T22:00:00Z")
+        self.assertEqual(_build_id("<p>no block</p>"), "")
+
+    def test_manifest_and_cache_name_follow_build(self):
+        from build import build_service_worker
+        sw = build_service_worker("2026-03-01T22:00:00Z", ["/static/b.png", "/static/a.png"])
+        self.assertIn('const BUILD_ID = "2026-03-01T22:00:00Z";', sw)
+        self.assertIn('const PRECACHE = ["/static/a.png", "/static/b.png"];', sw)
+        self.assertNotEqual(sw, build_service_worker("2026-03-02T22:00:00Z", ["/static/a.png", "/static/b.png"]))
+
+    def test_sw_never_cached_by_cdn(self):
+        from build import build_headers
+        self.assertIn("/sw.js\n  Cache-Control: no-cache", build_headers("static"))
+
+
+class TestBuildReport(unittest.TestCase):
+    def test_spans_nest(self):
+        from build import BuildReport
+        report = BuildReport()
+        with report.span("outer"):
+            with report.span("inner"):
+                pass
+        with report.span("next"):
+            pass
+        self.assertEqual([s["name"] for s in report.spans], ["outer", "next"])
+        self.assertEqual(report.spans[0]["children"][0]["name"], "inner")
+        self.assertGreaterEqual(report.spans[0]["ms"], report.spans[0]["children"][0]["ms"])
+
+    def test_source_counters_and_json(self):
+        import json
+        from build import BuildReport
+        report = BuildReport()
+        report.record_request("tmdb", 120, retries=1)
+        report.record_request("tmdb", 0, ok=False)
+        report.record_cache("tmdb", hit=True)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "build-report.json")
+            report.write(path)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data["sources"]["tmdb"], {
+            "requests": 2, "bytes": 120, "errors": 1, "retries": 1, "cache_hits": 1, "cache_misses": 0, "rate_wait_ms": 0.0,
+        })
+        self.assertIn("tmdb", report.summary())
+
+    def test_http_fetch_records_bytes(self):
+        import pathlib
+        import build
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "feed.xml")
+            with open(path, "wb") as f:
+                f.write(b"<rss/>")
+            build.REPORT = build.BuildReport()
+            data = build._http_fetch(pathlib.Path(path).as_uri(), "goodreads")
+        self.assertEqual(data, b"<rss/>")
+        self.assertEqual(build.REPORT.sources["goodreads"]["bytes"], 6)
+
+    def test_http_fetch_retries_transient_errors(self):
+        import io
+        import urllib.error
+        from unittest import mock
+        import build
+        calls = []
+
+        def fake_urlopen(req, timeout):
+            calls.append(req)
+            if len(calls) == 1:
+                raise urllib.error.HTTPError(req.full_url, 503, "busy", {}, None)
+            return io.BytesIO(b"ok")
+
+        build.REPORT = build.BuildReport()
+        with mock.patch("urllib.request.urlopen", fake_urlopen), mock.patch.object(build, "HTTP_RETRY_BACKOFF", 0):
+            data = build._http_fetch("https://example.com/", "lastfm")
+        self.assertEqual(data, b"ok")
+        self.assertEqual(build.REPORT.sources["lastfm"]["retries"], 1)
+
+
+class TestRateLimit(unittest.TestCase):
+    def test_bucket_paces_threads_and_tasks(self):
+        import asyncio
+        import threading
+        import time
+        from build import TokenBucket
+        bucket = TokenBucket(rate=200, burst=2)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        async def tasks():
+            await asyncio.gather(*(bucket.acquire_async() for _ in range(4)))
+
+        asyncio.run(tasks())
+        # 2 banked + 8 more at 200/s → at least 40 ms, however the callers interleave
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+    def test_http_fetch_waits_on_host_bucket(self):
+        import io
+        from unittest import mock
+        import build
+        build.REPORT = build.BuildReport()
+        build.configure_rate_limits({"api.example.com": {"rate": 50, "burst": 1}})
+        try:
+            with mock.patch("urllib.request.urlopen", lambda req, timeout: io.BytesIO(b"ok")):
+                for _ in range(3):
+                    build._http_fetch("https://api.example.com/x", "tmdb")
+                build._http_fetch("https://other.example.com/x", "lastfm")
+        finally:
+            build.configure_rate_limits({})
+        self.assertGreater(build.REPORT.sources["tmdb"]["rate_wait_ms"], 30)
+        self.assertEqual(build.REPORT.sources["lastfm"]["rate_wait_ms"], 0)
+
+    def test_invalid_limits_rejected_by_host(self):
+        import build
+        for limit in ({"rate": 0}, {"rate": -1, "burst": 5}, {"burst": 5}, {"rate": "4"}, {"rate": 4, "burst": 0}):
+            with self.subTest(limit=limit), self.assertRaisesRegex(ValueError, "'api.example.com'"):
+                build.configure_rate_limits({"api.example.com": limit})
+        build.configure_rate_limits({})
+
+
+class TestEnrichPipeline(unittest.TestCase):
+    def test_results_keep_input_order_and_queue_is_bounded(self):
+        import random
+        import threading
+        import time
+        from build import enrich_pipeline
+        pending, peak, lock = [0], [0], threading.Lock()
+
+        def parse():
+            for i in range(20):
+                with lock:
+                    pending[0] += 1
+                    peak[0] = max(peak[0], pending[0])
+                yield i
+
+        def enrich(i):
+            time.sleep(random.random() / 200)
+            with lock:
+                pending[0] -= 1
+            return i * 10
+
+        self.assertEqual(enrich_pipeline(parse(), enrich, workers=3, queue_size=4), [i * 10 for i in range(20)])
+        self.assertLessEqual(peak[0], 5)  # 4 slots, plus the item the parser holds while waiting for one
+
+    def test_artist_bio_fetched_once_per_artist(self):
+        import contextlib
+        import io
+        import time
+        from unittest import mock
+        import build
+        calls = []
+
+        def artist_info(artist, api_key):
+            calls.append(artist)
+            time.sleep(0.01)
+            return {"bio": f"{artist} bio"}
+
+        tracks = (build.Track(title=f"T{i}", artist=f"A{i % 2}") for i in range(6))
+        with mock.patch.object(build, "fetch_lastfm_track_info", lambda t, a, k: {"album": f"{t} LP"}), \
+                mock.patch.object(build, "fetch_lastfm_artist_info", artist_info), \
+                contextlib.redirect_stdout(io.StringIO()):
+            out = build.enrich_tracks_with_lastfm(tracks, "key")
+        self.assertEqual([t.title for t in out], [f"T{i}" for i in range(6)])
+        self.assertEqual([t.bio for t in out], ["A0 bio", "A1 bio"] * 3)
+        self.assertEqual(out[0].album, "T0 LP")
+        self.assertEqual(sorted(calls), ["A0", "A1"])
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_smallest_scale_runs(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+        import bench_build
+        results = bench_build.run_benchmarks([3], repeat=1, log=lambda *a: None)
+        self.assertIn("fetch_goodreads[n=3]", results)
+        self.assertIn("build_music_html[n=3]", results)
+        self.assertIn("inject[markers=3]", results)
+
+    def test_compare_flags_regressions_above_noise_floor(self):
+        import contextlib
+        import io
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+        import bench_build
+        baseline = {"slow": {"median_ms": 10.0}, "tiny": {"median_ms": 0.01}}
+        current = {"slow": {"median_ms": 20.0}, "tiny": {"median_ms": 0.05}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(bench_build.compare(current, baseline, 1.25), ["slow"])
+
+    def test_fake_upstream_serves_build_and_injects_faults(self):
+        import contextlib
+        import io
+        import urllib.error
+        from unittest import mock
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+        import build
+        import fake_upstream
+        faults = {"tmdb": {"error_rate": 1.0, "error_status": 404}, "letterboxd": {"truncate_rate": 1.0}}
+        config = build.load_config()
+        rewritten = ("GRAVATAR_API", "INSTAPAPER_API", "LASTFM_API", "TMDB_API", "TMDB_IMG", "GRAVATAR_API_KEY",
+                     "INSTAPAPER_CONSUMER_KEY", "INSTAPAPER_CONSUMER_SECRET", "LASTFM_API_KEY", "TMDB_API_KEY",
+                     "HTTP_CACHE_TTL", "TMDB_CACHE_TTL", "IMAGE_CACHE_TTL", "LASTFM_INFO_CACHE_TTL")
+        saved = {name: getattr(build, name) for name in rewritten}  # use_upstream() rewrites these globals
+        build.REPORT = build.BuildReport()
+        with fake_upstream.FakeUpstream(items=3, faults=faults) as up, mock.patch.multiple(build, **saved), \
+                mock.patch.dict(os.environ), contextlib.redirect_stdout(io.StringIO()):
+            build.use_upstream(up.url, config)
+            self.assertEqual(build.fetch_gravatar("someone").display_name, "Fake someone")
+            self.assertEqual(len(build.fetch_goodreads(config["sources"]["goodreads"]["read_rss"])), 3)
+            self.assertEqual(len(build.fetch_lastfm_top_tracks("someone", build.LASTFM_API_KEY, 3)), 3)
+            with self.assertRaises(Exception):
+                build.fetch_letterboxd(config["sources"]["letterboxd"]["rss"], 3)
+            with self.assertRaises(urllib.error.HTTPError):
+                build.fetch_tmdb_data("Heat", "1995", build.TMDB_API_KEY)
+        self.assertEqual(up.stats["tmdb"]["errors"], 1)
+        self.assertEqual(up.stats["letterboxd"]["truncated"], 1)
+
+
+class TestProfiling(unittest.TestCase):
+    def test_profile_and_memory_summary(self):
+        import contextlib
+        import io
+        import pstats
+        from build import _run_instrumented
+
+        def work():
+            return sorted(str(i) for i in range(20000))
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "build.pstats")
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                _run_instrumented(work, path, trace_memory=True, top=5)
+            self.assertTrue(pstats.Stats(path).total_calls > 0)
+        self.assertIn("top 5 functions by self time", out.getvalue())
+        self.assertIn("allocation sites (peak", out.getvalue())
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_import_has_no_side_effects(self):
+        import shutil
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with tempfile.TemporaryDirectory() as d:
+            shutil.copy(os.path.join(root, "build.py"), d)  # no site.toml alongside
+            code = (
+                "import sys, build\n"
+                "heavy = [m for m in ('tomllib', 'urllib.request', 'xml.etree.ElementTree', 'PIL') if m in sys.modules]\n"
+                "assert not heavy, heavy\n"
+                "assert build._content_changed('a', 'b')\n"
+            )
+            proc = subprocess.run([sys.executable, "-c", code], cwd=d, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+    def test_load_config(self):
+        from build import load_config
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "site.toml")
+            with open(path, "w") as f:
+                f.write('[site]\nurl = "https://example.com"\n')
+            self.assertEqual(load_config(path)["site"]["url"], "https://example.com")
+
+
+class TestHistoryStore(unittest.TestCase):
+    def test_upsert_keeps_first_seen(self):
+        import dataclasses
+        from build import Film, open_history, record_history, query_history
+        films = [Film(title="Alien", year="1979", url="https://letterboxd.com/x/film/alien/"),
+                 Film(title="Heat", year="1995", url="")]
+        with tempfile.TemporaryDirectory() as d:
+            conn = open_history(os.path.join(d, "history.db"))
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(record_history(conn, "letterboxd", films, "2026-01-02T00:00:00Z"), 2)
+            films[0] = dataclasses.replace(films[0], director="Ridley Scott")
+            self.assertEqual(record_history(conn, "letterboxd", films, "2026-02-01T00:00:00Z"), 0)
+            rows = query_history(conn, "letterboxd", since="2026-01-01")
+            conn.close()
+        alien = next(r for r in rows if r["title"] == "Alien")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(alien["first_seen"], "2026-01-02T00:00:00Z")
+        self.assertEqual(alien["last_seen"], "2026-02-01T00:00:00Z")
+        self.assertEqual(alien["director"], "Ridley Scott")
+
+
+class TestRecords(unittest.TestCase):
+    def test_round_trip_ignores_unknown_keys(self):
+        import dataclasses
+        from build import Film, Profile
+        film = Film(title="Heat", year="1995", rating=4.5, guid="g1")
+        self.assertEqual(Film.from_dict({**film.to_dict(), "old_field": 1}), film)
+        self.assertFalse(hasattr(film, "__dict__"))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            film.title = "Alien"
+        profile = Profile.from_dict({"display_name": "Nick", "links": [{"label": "x", "url": "y"}]})
+        self.assertEqual(profile.links, ({"label": "x", "url": "y"},))
+
+    def test_profile_from_gravatar_takes_email_from_contact_info(self):
+        from build import Profile
+        profile = Profile.from_gravatar({"display_name": "Nick", "contact_info": {"email": "n@example.com"}})
+        self.assertEqual(profile.email, "n@example.com")
+
+
+class TestIncrementalFeeds(unittest.TestCase):
+    @staticmethod
+    def _feed(ids):
+        items = "".join(
+            f"<item><guid>g{i}</guid><link>https://letterboxd.com/x/film/f{i}/</link>"
+            f"<letterboxd:filmTitle>Film {i}</letterboxd:filmTitle></item>" for i in ids
+        )
+        return ('<rss xmlns:letterboxd="https://letterboxd.com"><channel>' + items + "</channel></rss>").encode()
+
+    def test_stops_at_high_water_mark_and_merges(self):
+        import pathlib
+        import build
+        with tempfile.TemporaryDirectory() as d:
+            feed = os.path.join(d, "feed.xml")
+            url = pathlib.Path(feed).as_uri()
+            conn = build.open_history(os.path.join(d, "history.db"))
+            with open(feed, "wb") as f:
+                f.write(self._feed([3, 2, 1]))
+            state = build.load_feed_state(conn, "lb", 3, build.Film)
+            films = build.fetch_letterboxd(url, 3, stop_at=state["seen"])
+            build.save_feed_state(conn, "lb", build.merge_feed_items(films, state["items"], 3), state["seen"], "t1")
+
+            with open(feed, "wb") as f:
+                f.write(self._feed([4, 3, 2, 1]))
+            state = build.load_feed_state(conn, "lb", 3, build.Film)
+            self.assertIsInstance(state["items"][0], build.Film)
+            new = build.fetch_letterboxd(url, 3, stop_at=state["seen"])
+            merged = build.merge_feed_items(new, state["items"], 3)
+            # A larger limit than was stored forces a full parse.
+            self.assertEqual(build.load_feed_state(conn, "lb", 10, build.Film)["seen"], frozenset())
+            conn.close()
+        self.assertEqual([f.title for f in new], ["Film 4"])
+        self.assertEqual([f.title for f in merged], ["Film 4", "Film 3", "Film 2"])
+
+
+class TestInstapaperSync(unittest.TestCase):
+    def test_have_delta_merges_new_edited_and_deleted(self):
+        import json
+        import urllib.parse
+        from unittest import mock
+        import build
+        known = [build.Article(title=t, url=f"https://{t.lower()}.example/", guid=str(i), hash=f"h{t.lower()}")
+                 for i, t in enumerate("ABC", 1)]
+        response = {"bookmarks": [
+            {"type": "bookmark", "bookmark_id": 4, "hash": "hd", "title": "D", "url": "https://d.example/"},
+            {"type": "bookmark", "bookmark_id": 2, "hash": "hb2", "title": "B (edited)", "url": "https://b.example/"},
+        ], "delete_ids": "3"}
+        sent = {}
+
+        def fake_fetch(url, source, headers=None, data=None, timeout=15):
+            sent.update(urllib.parse.parse_qs(data.decode()))
+            return json.dumps(response).encode()
+
+        with mock.patch.object(build, "_http_fetch", fake_fetch):
+            articles, changed, unstarred = build.sync_instapaper_starred({"oauth_token": "t", "oauth_token_secret": "s"}, known)
+        self.assertEqual(sent["have"], ["1:ha,2:hb,3:hc"])
+        self.assertEqual([a.title for a in articles], ["D", "A", "B (edited)"])
+        self.assertEqual(changed, 3)
+        self.assertEqual([a.title for a in unstarred], ["C"])
+
+    def test_bookmarks_beyond_the_limit_stay_in_have(self):
+        import json
+        import urllib.parse
+        from unittest import mock
+        import build
+        known = [build.Article(title=f"A{i}", url=f"https://a{i}.example/", guid=str(i), hash=f"h{i}")
+                 for i in range(1, 6)]
+        sent = {}
+
+        def fake_fetch(url, source, headers=None, data=None, timeout=15):
+            sent.update(urllib.parse.parse_qs(data.decode()))
+            return json.dumps({"bookmarks": [], "delete_ids": ""}).encode()
+
+        with mock.patch.object(build, "_http_fetch", fake_fetch):
+            articles, changed, _ = build.sync_instapaper_starred({"oauth_token": "t", "oauth_token_secret": "s"}, known, limit=3)
+            self.assertEqual(len(articles), 5)
+            build.sync_instapaper_starred({"oauth_token": "t", "oauth_token_secret": "s"}, articles, limit=3)
+        self.assertEqual(sent["have"], ["1:h1,2:h2,3:h3,4:h4,5:h5"])
+        self.assertEqual(changed, 0)
+
+    def test_unstarred_bookmarks_leave_the_history_store(self):
+        import build
+        conn = build.open_history(":memory:")
+        a, b, c = (build.Article(title=t, url=f"https://{t.lower()}.example/", guid=str(i)) for i, t in enumerate("ABC", 1))
+        dup = build.Article(title="A again", url=a.url, guid="9")
+        build.record_history(conn, "instapaper", [a, b, c], "2026-01-01")
+        self.assertEqual(build.forget_history(conn, "instapaper", [a, b], keep=[c, dup]), 1)
+        left = conn.execute("SELECT item_id FROM items WHERE source = 'instapaper' ORDER BY item_id").fetchall()
+        self.assertEqual([r[0] for r in left], [a.url, c.url])
+
+
+class TestArchive(unittest.TestCase):
+    def test_pages_render_once_and_only_newest_changes(self):
+        import contextlib
+        import io
+        import build
+        films = [build.Film(title=f"Film {i}", year="2000", rating=4.0, url=f"https://lb.example/{i:03d}/")
+                 for i in range(7)]
+        with tempfile.TemporaryDirectory() as d:
+            conn = build.open_history(os.path.join(d, "history.db"))
+            build.record_history(conn, "letterboxd", films[:5], "2026-01-01T00:00:00Z")
+            out, manifest = os.path.join(d, "archive"), os.path.join(d, "archive.json")
+
+            def run():
+                with contextlib.redirect_stdout(io.StringIO()) as log:
+                    pages = build.build_archive(conn, out, manifest, "https://x.example", "/style.css", page_size=2)
+                return pages, log.getvalue()
+
+            pages, _ = run()
+            self.assertEqual([url for url, _ in pages], ["/archive/films/1/", "/archive/films/2/", "/archive/films/"])
+            with open(os.path.join(out, "films", "index.html"), encoding="utf-8") as f:
+                self.assertIn("Film 4", f.read())
+            self.assertIn("0 rendered", run()[1])
+
+            build.record_history(conn, "letterboxd", films[5:6], "2026-01-02T00:00:00Z")
+            pages, log = run()
+            self.assertIn("1 rendered · 1 written", log)
+            build.record_history(conn, "letterboxd", films[6:], "2026-01-03T00:00:00Z")
+            pages, log = run()  # page 3 fills up and moves to /3/, a new newest page appears
+            self.assertEqual(len(pages), 4)
+            self.assertTrue(os.path.exists(os.path.join(out, "films", "3", "index.html")))
+            conn.close()
+
+            build.write_sitemap_index(os.path.join(d, "sitemap.xml"), "https://x.example",
+                                      [("sitemap-main.xml", "2026-01-03")])
+            with open(os.path.join(d, "sitemap.xml"), encoding="utf-8") as f:
+                self.assertIn("<loc>https://x.example/sitemap-main.xml</loc>", f.read())
+
+    def test_rows_are_plain_links(self):
+        import build
+        films = [build.Film(title="Linked", year="2000", url="https://lb.example/linked/"), build.Film(title="Bare")]
+        page = "".join(build.render_archive_page("films", films, 1, 1, 1, "/style.css", "https://x.example"))
+        self.assertNotIn('role="button"', page)
+        self.assertNotIn("data-modal-type", page)
+        self.assertIn('<a class="panel-row" href="https://lb.example/linked/"', page)
+        self.assertIn('<div class="panel-row">', page)
+        self.assertEqual(build.check_html(page, "archive"), [])
+        self.assertIn('role="button"', build.build_film_html(films))
+
+
+class TestSearchIndex(unittest.TestCase):
+    @staticmethod
+    def _decode(path):
+        import json
+        with open(path, encoding="utf-8") as f:
+            shard = json.load(f)
+        terms, prev = {}, ""
+        for shared, suffix, gaps in shard["terms"]:
+            prev = prev[:shared] + suffix
+            ids, doc_id = [], 0
+            for gap in gaps:
+                doc_id += gap
+                ids.append(doc_id)
+            terms[prev] = [shard["docs"][str(i)][1] for i in ids]
+        return terms
+
+    def test_tokens_fold_case_and_accents(self):
+        from build import search_tokens
+        self.assertEqual(search_tokens("Amélie", "AMELIE's", None), ["amelie", "s"])
+
+    def test_shards_front_coded_and_incremental(self):
+        import contextlib
+        import io
+        import build
+        films = [build.Film(title="Alien", director="Ridley Scott", url="https://lb.example/alien/"),
+                 build.Film(title="Aliens", director="James Cameron", url="https://lb.example/aliens/")]
+        with tempfile.TemporaryDirectory() as d:
+            conn = build.open_history(os.path.join(d, "history.db"))
+            build.record_history(conn, "letterboxd", films, "2026-01-01T00:00:00Z")
+            build.record_history(conn, "goodreads-read", [build.Book(title="Alias Grace", author="Margaret Atwood")],
+                                 "2026-01-02T00:00:00Z")
+            out, cache = os.path.join(d, "static", "search"), os.path.join(d, "search.json")
+
+            def run():
+                with contextlib.redirect_stdout(io.StringIO()) as log:
+                    urls = build.build_search_index(conn, out, cache)
+                return urls, log.getvalue()
+
+            urls, log = run()
+            self.assertIn("3 tokenized", log)
+            files = set(os.listdir(out))
+            a_shard = next(os.path.join(out, n) for n in files if n.startswith("a."))
+            self.assertEqual(self._decode(a_shard), {"alias": ["Alias Grace"], "alien": ["Alien"],
+                                                     "aliens": ["Aliens"], "atwood": ["Alias Grace"]})
+            self.assertTrue(urls["script"].endswith(".js"))
+
+            again, log = run()
+            self.assertEqual(again, urls)
+            self.assertIn("0 tokenized", log)
+            self.assertIn("0 written", log)
+
+            # Doc ids never move, so a new item only rewrites the shards its words land in.
+            build.record_history(conn, "letterboxd", [build.Film(title="Zodiac", director="David Fincher")],
+                                 "2026-01-03T00:00:00Z")
+            new_urls, log = run()
+            changed = set(os.listdir(out)) - files
+            conn.close()
+        self.assertIn("1 tokenized", log)
+        self.assertEqual({n.split(".")[0] for n in changed}, {"z", "d", "f", "index"})
+        self.assertEqual(new_urls["script"], urls["script"])
+
+
+class TestDataFeeds(unittest.TestCase):
+    def test_feeds_mirror_the_page_and_skip_unchanged_writes(self):
+        import gzip
+        import hashlib
+        import json
+        import build
+        config = build.load_config()
+        config["sources"]["instapaper"]["limit"] = 1
+        snapshot = {
+            "letterboxd": [build.Film(title="Heat", year="1995", url="https://lb.example/heat/", synopsis="LA crime.")],
+            "instapaper": [build.Article(title=f"A{i}", url=f"https://a.example/{i}") for i in range(3)],
+            "gravatar": build.Profile(display_name="Nick"),
+        }
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "data")
+            written = build.write_data_feeds(snapshot, config, out)
+            self.assertIn(os.path.join(out, "data.json.gz"), written)
+            with open(os.path.join(out, "data.json"), "rb") as f:
+                raw = f.read()
+            with open(os.path.join(out, "data.json.gz"), "rb") as f:
+                self.assertEqual(gzip.decompress(f.read()), raw)
+            with open(os.path.join(out, "manifest.json"), encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["files"]["data.json"]["sha256"], hashlib.sha256(raw).hexdigest())
+            with open(os.path.join(out, "films.json"), encoding="utf-8") as f:
+                feed = json.load(f)
+            self.assertEqual(build.write_data_feeds(snapshot, config, out), [])
+            self.assertEqual(build.written_feeds(out), ["films", "reads"])
+            meta = build.build_meta_html(config, feeds=build.written_feeds(out))
+        data = json.loads(raw)
+        self.assertEqual(data["version"], build.DATA_VERSION)
+        self.assertEqual(sorted(data["sections"]), ["films", "reads"])
+        self.assertEqual([a["id"] for a in data["sections"]["reads"]], ["https://a.example/0"])  # page limit
+        self.assertEqual(feed["version"], "https://jsonfeed.org/version/1.1")
+        self.assertEqual(feed["items"][0]["id"], "https://lb.example/heat/")
+        self.assertEqual((feed["items"][0]["summary"], feed["items"][0]["content_text"]), ("1995", "LA crime."))
+        self.assertIn('href="/data/films.json"', meta)
+        self.assertNotIn('href="/data/books.json"', meta)  # no data → no file → no link
+
+
+class TestOutputManifest(unittest.TestCase):
+    def test_write_if_changed_skips_identical_bytes(self):
+        from build import write_if_changed
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "sub", "sw.js")
+            self.assertTrue(write_if_changed(path, "a"))
+            os.utime(path, ns=(1, 1))
+            self.assertFalse(write_if_changed(path, b"a"))
+            self.assertEqual(os.stat(path).st_mtime_ns, 1)
+            self.assertTrue(write_if_changed(path, "b"))
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["sw.js"])
+
+    def test_write_stream_hashes_before_writing(self):
+        from unittest import mock
+        from build import _write_stream
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "page", "index.html")
+            digest, written = _write_stream(path, iter(["<p>", "1</p>"]))
+            self.assertTrue(written)
+            with mock.patch("builtins.open", side_effect=AssertionError("no-op must not open a file")):
+                self.assertEqual(_write_stream(path, iter(["<p>", "1</p>"]), unless_hash=digest), (digest, False))
+            self.assertTrue(_write_stream(path, ["<p>2</p>"], unless_hash=digest)[1])
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["index.html"])
+
+    def test_changed_files_since_last_build(self):
+        from build import build_output_manifest, write_if_changed
+        with tempfile.TemporaryDirectory() as d:
+            cwd = os.getcwd()
+            os.chdir(d)
+            try:
+                write_if_changed("index.html", "<p>1</p>")
+                write_if_changed(os.path.join("static", "a.css"), "a{}")
+                manifest = os.path.join(".cache", "outputs.json")
+                files, dirs = ["index.html", "missing.xml"], ["static"]
+                self.assertEqual(build_output_manifest(manifest, files, dirs), ["A index.html", "A static/a.css"])
+                self.assertEqual(build_output_manifest(manifest, files, dirs), [])
+                write_if_changed("index.html", "<p>2</p>")
+                os.remove(os.path.join("static", "a.css"))
+                write_if_changed(os.path.join("static", "b.css"), "b{}")
+                self.assertEqual(build_output_manifest(manifest, files, dirs),
+                                 ["M index.html", "D static/a.css", "A static/b.css"])
+            finally:
+                os.chdir(cwd)
+
+    def test_changes_are_against_the_last_deploy(self):
+        import shutil
+        from build import build_output_manifest, write_if_changed
+        with tempfile.TemporaryDirectory() as d:
+            manifest, deployed = os.path.join(d, "outputs.json"), os.path.join(d, "deployed", "outputs.json")
+            page = os.path.join(d, "index.html")
+            write_if_changed(page, "<p>1</p>")
+            build_output_manifest(manifest, [page], [], deployed)
+            os.makedirs(os.path.dirname(deployed))
+            shutil.copy(manifest, deployed)  # the deploy job saves the manifest it deployed
+            write_if_changed(page, "<p>2</p>")
+            self.assertEqual(build_output_manifest(manifest, [page], [], deployed), [f"M {page}"])
+            # that deploy failed, so deployed/ was not updated: the next build still has something to deploy
+            self.assertEqual(build_output_manifest(manifest, [page], [], deployed), [f"M {page}"])
+            shutil.copy(manifest, deployed)
+            self.assertEqual(build_output_manifest(manifest, [page], [], deployed), [])
+
+
+class TestMultiSite(unittest.TestCase):
+    def test_discover_sites(self):
+        from build import discover_sites
+        with tempfile.TemporaryDirectory() as d:
+            for name, files in (("alice", ("site.toml", "index.html")), ("bob", ("site.toml",)), ("carol", ("site.toml", "index.html"))):
+                os.makedirs(os.path.join(d, name))
+                for f in files:
+                    open(os.path.join(d, name, f), "w").close()
+            self.assertEqual([os.path.basename(p) for p in discover_sites(d)], ["alice", "carol"])
+
+    def test_shared_http_cache(self):
+        import pathlib
+        from unittest import mock
+        import build
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "tmdb.json")
+            with open(path, "w") as f:
+                f.write("first")
+            build.REPORT = build.BuildReport()
+            with mock.patch.object(build, "HTTP_CACHE_DIR", os.path.join(d, "http")):
+                url = pathlib.Path(path).as_uri()
+                self.assertEqual(build._http_fetch(url, "tmdb", cache_ttl=60), b"first")
+                with open(path, "w") as f:
+                    f.write("second")
+                self.assertEqual(build._http_fetch(url, "tmdb", cache_ttl=60), b"first")
+                self.assertEqual(build._http_fetch(url, "tmdb", headers={"Authorization": "x"}, cache_ttl=60), b"second")
+                self.assertEqual(build.prune_http_cache(os.path.join(d, "http"), -1), 2)
+        self.assertEqual(build.REPORT.sources["tmdb"]["cache_hits"], 1)
+        self.assertEqual(build.REPORT.sources["tmdb"]["requests"], 2)
+
+
+class TestFreshness(unittest.TestCase):
+    def test_fresh_fetched_and_stale(self):
+        import contextlib
+        import io
+        from datetime import datetime, timezone
+        import build
+        now = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+        last_good = {"gravatar": "old profile", "fetched_at": {"gravatar": "2026-03-01T09:00:00Z"}}
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return "new profile"
+
+        def fail():
+            raise OSError("timed out")
+
+        build.REPORT = build.BuildReport()
+        self.assertEqual(build.source_data("gravatar", fetch, last_good, 4 * 3600, now), ("old profile", "fresh"))
+        self.assertEqual(calls, [])
+        self.assertEqual(build.source_data("gravatar", fetch, last_good, 2 * 3600, now), ("new profile", "fetched"))
+        self.assertEqual(build.source_data("gravatar", fetch, last_good, 0, now), ("new profile", "fetched"))
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            self.assertEqual(build.source_data("gravatar", fail, last_good, 0, now), ("old profile", "stale"))
+        self.assertIn("last-known-good data from 2026-03-01T09:00:00Z", log.getvalue())
+        with self.assertRaises(OSError):
+            build.source_data("lastfm", fail, last_good, 3600, now)  # nothing to fall back on
+        self.assertEqual(build.REPORT.sources["gravatar"]["cache_hits"], 1)
+
+
+class TestPreview(unittest.TestCase):
+    SRC = ("<html><head>\n<!-- style:start -->\n<style></style>\n<!-- style:end -->\n</head><body>\n"
+           "<!-- instapaper:start -->\nold\n<!-- instapaper:end -->\n"
+           "<!-- music:start -->\nkept\n<!-- music:end -->\n</body></html>")
+
+    def test_snapshot_keeps_sources_missing_from_a_build(self):
+        from build import Article, Profile, Track, load_snapshot, save_snapshot
+        track, profile = Track(title="T", artist="A"), Profile(display_name="Nick", links=({"label": "x"},))
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "snapshot.json")
+            self.assertEqual(load_snapshot(path), {})
+            save_snapshot(path, {"lastfm": [track], "instapaper": [Article(title="A")], "gravatar": profile}, "t1")
+            save_snapshot(path, {"instapaper": [Article(title="B")]}, "t2")
+            self.assertEqual(load_snapshot(path),
+                             {"lastfm": [track], "instapaper": [Article(title="B")], "gravatar": profile,
+                              "fetched_at": {"lastfm": "t1", "instapaper": "t2", "gravatar": "t1"}})
+
+    def test_render_preview_from_snapshot(self):
+        from build import Article, load_config, render_preview
+        config = load_config()
+        config["sources"]["instapaper"]["limit"] = 1
+        articles = [Article(title=f"Article {i}", url=f"https://example.com/{i}", guid=str(i)) for i in range(2)]
+        out = render_preview(self.SRC, config, {"instapaper": articles}, css='a::after { content: "\\2014"; }\n')
+        self.assertIn("Article 0", out)
+        self.assertNotIn("Article 1", out)  # page shows sources.instapaper.limit
+        self.assertIn("kept", out)          # no lastfm data → region left as built
+        self.assertIn('content: "\\2014"', out)
+
+
+class TestPageWeight(unittest.TestCase):
+    SRC = (
+        "<html><head><style>body{color:red}</style></head><body>\n"
+        "<!-- music:start -->\n<div>" + "row " * 200 + "</div>\n<!-- music:end -->\n"
+        "<script>var x=1;</script><script async src=\"//x.example/a.js\"></script>\n"
+        "</body></html>"
+    )
+
+    def test_measures_document_markers_and_inline_assets(self):
+        from build import measure_page_weight
+        weights = measure_page_weight(self.SRC)
+        self.assertEqual(weights["document"]["raw"], len(self.SRC.encode()))
+        self.assertEqual(weights["inline-css"]["raw"], len("body{color:red}"))
+        self.assertEqual(weights["inline-js"]["raw"], len("var x=1;"))
+        self.assertLess(weights["music"]["gzip"], weights["music"]["raw"])
+
+    def test_brotli_only_where_budgeted(self):
+        from build import measure_page_weight
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            self.skipTest("brotli not installed")
+        weights = measure_page_weight(self.SRC, {"brotli": {"music": 100}})
+        self.assertIsNotNone(weights["document"]["brotli"])
+        self.assertIsNotNone(weights["music"]["brotli"])
+        self.assertIsNone(weights["inline-css"]["brotli"])
+        self.assertIsNone(measure_page_weight(self.SRC)["music"]["brotli"])
+
+    def test_budget_violations_reported(self):
+        from build import check_budgets, measure_page_weight
+        weights = measure_page_weight(self.SRC)
+        over = check_budgets(weights, {"raw": {"music": 10, "document": 10**6}, "gzip": {"missing": 1}})
+        self.assertEqual(len(over), 1)
+        self.assertTrue(over[0].startswith("music raw"))
+
+    def test_history_is_capped(self):
+        import json
+        from build import append_weight_history, measure_page_weight
+        weights = measure_page_weight(self.SRC)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "page-weight.jsonl")
+            for i in range(5):
+                append_weight_history(path, f"build-{i}", weights, max_lines=3)
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual([e["built"] for e in lines], ["build-2", "build-3", "build-4"])
+        self.assertIn("music", lines[-1]["gzip"])
+
+
+class TestOutputCheck(unittest.TestCase):
+    def test_template_passes(self):
+        from build import check_html
+        with open(os.path.join(os.path.dirname(__file__), "..", "index.html"), encoding="utf-8") as f:
+            self.assertEqual(check_html(f.read()), [])
+
+    def test_reports_each_kind_of_problem(self):
+        from build import CHECK_DATA_ATTR_MAX, check_html
+        src = ("<html><head><script type=\"application/ld+json\">{\"name\": 1,}</script></head><body>\n"
+               "<nav><a href=\"/x\" target=\"_blank\" rel=\"noreferrer\">x</a></nav>\n"
+               "<!-- books:start -->\n<ul><li id=\"a\">x</li>\n<!-- books:end -->\n</ul>\n"
+               "<p id=\"a\" data-description=\"" + "z" * (CHECK_DATA_ATTR_MAX + 1) + "\"><img src=\"c.jpg\"></p>\n"
+               "<section aria-labelledby=\"missing\"></section>\n"
+               "<!-- films:start -->\n</body></html>")
+        problems = "\n".join(check_html(src, "t.html"))
+        for expected in ("t.html:1: invalid JSON-LD", "t.html:2: <nav> without aria-label",
+                         "t.html:2: target=_blank without rel=noopener", "books region (from line 3) leaves <ul> open",
+                         "duplicate id \"a\" (first on line 4)", "data-description is", "<img> without alt (c.jpg)",
+                         "aria-labelledby=\"missing\" matches no id", "t.html:9: <!-- films:start --> never ended"):
+            self.assertIn(expected, problems)
+
+    def test_check_command_exits_nonzero(self):
+        import contextlib
+        import io
+        import build
+        with tempfile.TemporaryDirectory() as d:
+            cwd = os.getcwd()
+            os.chdir(d)
+            try:
+                with open(build.INDEX_PATH, "w", encoding="utf-8") as f:
+                    f.write("<html><body><div></body></html>")
+                with contextlib.redirect_stdout(io.StringIO()) as log, self.assertRaises(SystemExit):
+                    build.cmd_check()
+            finally:
+                os.chdir(cwd)
+        self.assertIn("index.html:1: <div> from line 1 not closed before </body>", log.getvalue())
+
+
 class TestTmdbHeaderAuth(unittest.TestCase):
     def test_bearer_token_not_in_query_params(self):
         """TMDB search URL must not contain api_key as a query param."""